@@ -0,0 +1,64 @@
+"""
+Micro-benchmark of the InventoryAggregator subtraction: (a - b).clean_empty().get_sorted() vs a.diff_clean(b) and
+a -= b. Measures the time and the memory allocated (peak, via tracemalloc) per operation.
+
+Usage:
+    python benchmarks/inventory_aggregator_arithmetic_bench.py [--accounts N] [--repeat N]
+"""
+import argparse
+import time
+import tracemalloc
+from decimal import Decimal
+
+from beancount.core.amount import Amount
+
+from evbeantools.summator import InventoryAggregator
+
+
+def build_aggregator(num_accounts: int, shift: int) -> InventoryAggregator:
+    inv_agg = InventoryAggregator()
+    
+    for i in range(num_accounts):
+        inv_agg.add_amount(f'Assets:Bank{i}', Amount(Decimal(i + shift) / 100, 'USD'))
+        inv_agg.add_amount(f'Assets:Bank{i}', Amount(Decimal(i), 'EUR'))
+        
+    return inv_agg
+
+
+def measure(name: str, operation, repeat: int):
+    tracemalloc.start()
+    operation()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    start = time.perf_counter()
+    for _ in range(repeat):
+        operation()
+    elapsed = (time.perf_counter() - start) / repeat
+    
+    print(f'{name:<45} {elapsed * 1000:10.3f} ms {peak / 1024:10.1f} KiB peak')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--accounts', type=int, default=1000, help='Number of accounts in the aggregators')
+    parser.add_argument('--repeat', type=int, default=20, help='Number of repetitions for the timing')
+    args = parser.parse_args()
+    
+    inv_agg1 = build_aggregator(args.accounts, 1)
+    inv_agg2 = build_aggregator(args.accounts, 0)
+    
+    # Both aggregators hold the same accounts, so __sub__ does not modify them
+    measure('(a - b).clean_empty().get_sorted()', 
+            lambda: (inv_agg1 - inv_agg2).clean_empty().get_sorted(), args.repeat)
+    measure('a.diff_clean(b)', lambda: inv_agg1.diff_clean(inv_agg2), args.repeat)
+    
+    def isub():
+        inv_agg = inv_agg1.snapshot()
+        inv_agg -= inv_agg2
+    
+    measure('a -= b (on a copy-on-write snapshot)', isub, args.repeat)
+    
+
+if __name__ == '__main__':
+    main()
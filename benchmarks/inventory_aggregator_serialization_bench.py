@@ -0,0 +1,65 @@
+"""
+Benchmark of serializing a large InventoryAggregator (the sum of a synthetic ledger with many accounts) with pickle 
+and with InventoryAggregator.to_bytes / from_bytes. Measures the best time of dumping and loading and the size, as 
+well as the time of loading a single account with from_bytes.
+
+Usage:
+    python benchmarks/inventory_aggregator_serialization_bench.py [--transactions N] [--repeat N]
+"""
+import argparse
+import pickle
+import time
+
+from evbeantools.summator import BeanSummator, InventoryAggregator
+
+from synthetic_ledger import generate_entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--transactions', type=int, default=200000, help='Number of generated transactions')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of repetitions of each measurement')
+    args = parser.parse_args()
+    
+    entries = list(generate_entries(args.transactions))
+    inv_agg = BeanSummator(entries, {}, accounts_re='.*').sum_till_date(entries[-1].date)
+    num_positions = sum(len(inv) for inv in inv_agg.values())
+    
+    print(f'{len(inv_agg)} accounts, {num_positions} positions')
+    
+    methods = {'pickle': (lambda: pickle.dumps(inv_agg, protocol=pickle.HIGHEST_PROTOCOL), pickle.loads),
+               'to_bytes': (inv_agg.to_bytes, InventoryAggregator.from_bytes)}
+    
+    for name, (dump, load) in methods.items():
+        dump_time, data = measure(dump, args.repeat)
+        load_time, loaded_inv_agg = measure(lambda: load(data), args.repeat)
+        
+        assert loaded_inv_agg == inv_agg
+        
+        print(f'{name:<10} dump {dump_time * 1000:8.3f} ms, load {load_time * 1000:8.3f} ms, {len(data):>10} bytes')
+        
+    # The account with the fewest positions, e.g. a bank account (the broker account holds most of the lots)
+    account = min(inv_agg, key=lambda account: len(inv_agg[account]))
+    load_time, loaded_inv_agg = measure(lambda: InventoryAggregator.from_bytes(data, accounts=[account]), args.repeat)
+    
+    assert loaded_inv_agg == {account: inv_agg[account]}
+    
+    print(f'{"1 account":<10} load {load_time * 1000:8.3f} ms')
+    
+
+def measure(function, repeat: int):
+    """
+    Returns the best time of calling the function and its result
+    """
+    best_time = float('inf')
+    
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best_time = min(best_time, time.perf_counter() - start)
+        
+    return best_time, result
+
+
+if __name__ == '__main__':
+    main()
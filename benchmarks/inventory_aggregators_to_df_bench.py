@@ -0,0 +1,58 @@
+"""
+Benchmark of converting daily snapshots of a BeanSummator into a DataFrame: with a loop over the accounts and the 
+positions of each snapshot, followed by convert_columns_to_float, and with inventory_aggregators_to_df. The time of
+balances_at_dates_df, which sums the entries itself, is shown too (the time of the summation is not included in the
+other two).
+
+Usage:
+    python benchmarks/inventory_aggregators_to_df_bench.py [--transactions N]
+"""
+import argparse
+import datetime
+import time
+
+import pandas as pd
+
+from evbeantools.summator import BeanSummator
+from evbeantools.juptools import inventory_aggregators_to_df, balances_at_dates_df, convert_columns_to_float
+
+from synthetic_ledger import generate_entries
+
+
+def loop_to_df(snapshots) -> pd.DataFrame:
+    rows = {}
+    for date, inv_agg in snapshots:
+        row = {}
+        for account, account_inventory in inv_agg.items():
+            for pos in account_inventory:
+                key = (account, pos.units.currency)
+                row[key] = row.get(key, 0) + pos.units.number
+        rows[date] = row
+        
+    return convert_columns_to_float(pd.DataFrame.from_dict(rows, orient='index').fillna(0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--transactions', type=int, default=200000, help='Number of generated transactions')
+    args = parser.parse_args()
+    
+    entries = list(generate_entries(args.transactions))
+    dates = [entries[0].date + datetime.timedelta(days=day) for day in range((entries[-1].date - entries[0].date).days + 1)]
+    
+    snapshots = list(BeanSummator(entries, {}, accounts_re='.*').sum_at_dates(dates))
+    
+    print(f'{len(snapshots)} snapshots')
+    
+    for name, to_df in [('loop', loop_to_df), ('inventory_aggregators_to_df', inventory_aggregators_to_df)]:
+        start = time.perf_counter()
+        df = to_df(snapshots)
+        print(f'{name:<30} {time.perf_counter() - start:8.3f} s, {df.shape[1]} columns')
+        
+    start = time.perf_counter()
+    df = balances_at_dates_df(entries, {}, '.*', dates)
+    print(f'{"balances_at_dates_df":<30} {time.perf_counter() - start:8.3f} s, {df.shape[1]} columns')
+        
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Benchmark of the ParallelBeanSummator with 1, 2, 4 and 8 worker processes. Measures the time of summing all entries 
+(the 1st sum, which calculates all checkpoints in parallel) and checks, that the result is identical to the one of 
+the serial BeanSummator. The speedup is bounded by the number of CPUs, which is printed first.
+
+Usage:
+    python benchmarks/parallel_summator_scaling_bench.py [--transactions N] [--chunks-per-worker N]
+"""
+import argparse
+import os
+import time
+
+from evbeantools.summator import BeanSummator, ParallelBeanSummator
+
+from synthetic_ledger import generate_entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--transactions', type=int, default=400000, help='Number of generated transactions')
+    parser.add_argument('--chunks-per-worker', type=int, default=4, help='Number of chunks per worker process')
+    args = parser.parse_args()
+    
+    entries = list(generate_entries(args.transactions))
+    
+    print(f'{len(entries)} entries, {os.cpu_count()} CPUs')
+    last_date = entries[-1].date
+    
+    start = time.perf_counter()
+    expected = BeanSummator(entries, {}, accounts_re='.*').sum_till_date(last_date)
+    serial_time = time.perf_counter() - start
+    
+    print(f'{"serial":<12} {serial_time:8.3f} s')
+    
+    for num_workers in [1, 2, 4, 8]:
+        checkpoint_every = -(-len(entries) // (num_workers * args.chunks_per_worker))
+        
+        start = time.perf_counter()
+        result = ParallelBeanSummator(entries, {}, accounts_re='.*', checkpoint_every=checkpoint_every, 
+                                      num_workers=num_workers).sum_till_date(last_date)
+        parallel_time = time.perf_counter() - start
+        
+        assert result == expected
+        
+        print(f'{num_workers:>2} workers   {parallel_time:8.3f} s, speedup {serial_time / parallel_time:5.2f}')
+        
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark of the copying of the input entries by the conversion to a single currency. Previously
+get_equiv_sing_curr_entries deep-copied all entries (and convert_transaction_to_new_currency each transaction once
+again) before converting them, now the input entries are shared and only the changed entries and meta dicts are new.
+
+The time and the peak memory (tracemalloc) of the conversion of the entries (get_needed_converted_entries) are
+measured with and without these deep copies.
+
+Usage:
+    python benchmarks/sing_curr_conv_copy_bench.py [--transactions N]
+"""
+import argparse
+import copy
+import time
+import tracemalloc
+from decimal import Decimal
+
+from beancount.core import data
+from beancount.core.amount import Amount
+from beancount.core.prices import build_price_map
+from beancount.parser.options import OPTIONS_DEFAULTS
+
+from evbeantools.sing_curr_conv import get_needed_converted_entries, build_currency_introduction_map
+from evbeantools.sing_curr_conv import UNREAL_GAINES_P_AND_L_ACC
+
+from synthetic_ledger import generate_entries, CURRENCIES
+
+TARGET_CURRENCY = 'USD'
+
+
+def generate_entries_with_prices(num_transactions: int) -> list:
+    """
+    Synthetic transactions with daily prices of all their currencies in the target currency
+    """
+    meta = data.new_metadata('<synthetic>', 0)
+    price_currencies = [currency for currency in CURRENCIES if currency != TARGET_CURRENCY] + ['IVV']
+
+    entries = []
+    previous_date = None
+    for transaction in generate_entries(num_transactions):
+        if transaction.date != previous_date:
+            for currency_num, currency in enumerate(price_currencies):
+                number = Decimal(100 + (transaction.date.toordinal() + currency_num) % 7).scaleb(-2)
+                entries.append(data.Price(meta, transaction.date, currency, Amount(number, TARGET_CURRENCY)))
+            previous_date = transaction.date
+        entries.append(transaction)
+
+    return data.sorted(entries)
+
+
+def convert(entries: list, deep_copy: bool):
+    if deep_copy:
+        # The copies, which have been made before: of all entries and once again of each converted transaction
+        entries = copy.deepcopy(entries)
+        _ = [copy.deepcopy(entry) for entry in entries if isinstance(entry, data.Transaction)]
+
+    price_map = build_price_map(entries)
+
+    return get_needed_converted_entries(entries, price_map, build_currency_introduction_map(entries), OPTIONS_DEFAULTS,
+                                        TARGET_CURRENCY, entries[0].date, entries[-1].date,
+                                        account_for_price_diff=UNREAL_GAINES_P_AND_L_ACC,
+                                        unconvertable_commodities=set())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--transactions', type=int, default=50000, help='Number of generated transactions')
+    args = parser.parse_args()
+
+    entries = generate_entries_with_prices(args.transactions)
+
+    print(f'{len(entries)} entries')
+
+    for name, deep_copy in [('with deep copies', True), ('without copies', False)]:
+        tracemalloc.start()
+        start = time.perf_counter()
+        convert(entries, deep_copy)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(f'{name:<20} {elapsed:8.3f} s {peak / 2**20:10.1f} MiB peak')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Benchmark of the BeanSummator with the InventoryAggregator and with the CompactInventoryAggregator as the running sum 
+(see the aggregator_class parameter). Measures the time per posting of summing all entries and the time of returning 
+a sum.
+
+Usage:
+    python benchmarks/summator_aggregator_class_bench.py [--transactions N]
+"""
+import argparse
+import datetime
+import time
+
+from evbeantools.summator import BeanSummator, InventoryAggregator, CompactInventoryAggregator
+
+from synthetic_ledger import generate_entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--transactions', type=int, default=200000, help='Number of generated transactions')
+    args = parser.parse_args()
+    
+    entries = list(generate_entries(args.transactions))
+    num_postings = sum(len(entry.postings) for entry in entries)
+    last_date = entries[-1].date
+    
+    results = {}
+    
+    for aggregator_class in [InventoryAggregator, CompactInventoryAggregator]:
+        bean_summator = BeanSummator(entries, {}, accounts_re='.*', aggregator_class=aggregator_class)
+        
+        start = time.perf_counter()
+        bean_summator._advance_to(last_date)
+        summing_time = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        results[aggregator_class] = bean_summator.sum_till_date(last_date + datetime.timedelta(days=1))
+        snapshot_time = time.perf_counter() - start
+        
+        print(f'{aggregator_class.__name__:<30} {summing_time / num_postings * 1e6:8.3f} us per posting, '
+              f'{snapshot_time * 1000:8.3f} ms per returned sum')
+        
+    assert results[InventoryAggregator] == results[CompactInventoryAggregator]
+    
+
+if __name__ == '__main__':
+    main()
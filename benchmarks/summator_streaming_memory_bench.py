@@ -0,0 +1,95 @@
+"""
+Memory benchmark of the BeanSummator with list input vs streamed input. 
+
+The entries are written to a temporary file as pickled chunks. With the list input all of them are loaded into 
+memory first, with the streamed input a generator reads them chunk by chunk while the BeanSummator consumes them. 
+The peak memory is measured with tracemalloc while the sums at the end of each month are calculated.
+
+Usage:
+    python benchmarks/summator_streaming_memory_bench.py [--transactions N] [--chunk-size N]
+"""
+import argparse
+import datetime
+import pickle
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from evbeantools.summator import BeanSummator
+
+from synthetic_ledger import generate_entries
+
+
+def write_chunks(entries, path: Path, chunk_size: int):
+    with open(path, 'wb') as file:
+        chunk = []
+        for entry in entries:
+            chunk.append(entry)
+            if len(chunk) == chunk_size:
+                pickle.dump(chunk, file)
+                chunk = []
+        if chunk:
+            pickle.dump(chunk, file)
+            
+
+def read_chunks(path: Path):
+    """
+    Generator, which yields the entries, reading one pickled chunk at a time
+    """
+    with open(path, 'rb') as file:
+        while True:
+            try:
+                chunk = pickle.load(file)
+            except EOFError:
+                return
+            yield from chunk
+            
+
+def month_ends(first_date: datetime.date, last_date: datetime.date):
+    date = first_date.replace(day=1)
+    while date <= last_date:
+        next_month = (date + datetime.timedelta(days=32)).replace(day=1)
+        yield next_month - datetime.timedelta(days=1)
+        date = next_month
+
+
+def measure(name: str, get_entries, dates):
+    tracemalloc.start()
+    start = time.perf_counter()
+    
+    bean_summator = BeanSummator(get_entries(), {}, accounts_re='^Assets')
+    for _, month_end_sum in bean_summator.sum_at_dates(dates):
+        pass
+    
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    print(f'{name:<20} {elapsed:8.2f} s {peak / 1024**2:10.1f} MiB peak')
+    
+    return month_end_sum
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--transactions', type=int, default=200000, help='Number of generated transactions')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='Number of entries in a pickled chunk')
+    args = parser.parse_args()
+    
+    first_date = next(generate_entries(1)).date
+    last_date = first_date + datetime.timedelta(days=args.transactions // 20)
+    dates = list(month_ends(first_date, last_date))
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / 'entries.pickle'
+        write_chunks(generate_entries(args.transactions), path, args.chunk_size)
+        
+        list_sum = measure('list input', lambda: list(read_chunks(path)), dates)
+        streamed_sum = measure('streamed input', lambda: read_chunks(path), dates)
+        
+    assert list_sum == streamed_sum
+    
+
+if __name__ == '__main__':
+    main()
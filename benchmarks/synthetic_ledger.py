@@ -0,0 +1,43 @@
+"""
+Generates synthetic beancount entries for the benchmarks in this directory
+"""
+import datetime
+import random
+from decimal import Decimal
+
+from beancount.core import data
+from beancount.core.amount import Amount
+from beancount.core.position import Cost
+
+ACCOUNTS = [f'Assets:Bank{i}' for i in range(20)] + [f'Expenses:Category{i}' for i in range(50)] 
+CURRENCIES = ['USD', 'EUR', 'CHF', 'GBP']
+
+
+def generate_entries(num_transactions: int, seed: int = 0, start_date: datetime.date = datetime.date(2000, 1, 1),
+                     transactions_per_day: int = 20):
+    """
+    Generator of balanced 2 posting transactions (1 in 10 of them buying a stock at cost), sorted by date
+    """
+    rng = random.Random(seed)
+    
+    for i in range(num_transactions):
+        date = start_date + datetime.timedelta(days=i // transactions_per_day)
+        currency = rng.choice(CURRENCIES)
+        number = Decimal(rng.randint(1, 1000000)).scaleb(-2)
+        account = rng.choice(ACCOUNTS)
+        
+        if i % 10 == 0:
+            units = Amount(Decimal(rng.randint(1, 10)), 'IVV')
+            cost = Cost(number, currency, None, None)
+            other_units = Amount(-units.number * number, currency)
+            account = 'Assets:Broker'
+        else:
+            units = Amount(number, currency)
+            cost = None
+            other_units = Amount(-number, currency)
+            
+        postings = [data.Posting(account, units, cost, None, None, None), 
+                    data.Posting('Assets:Bank0', other_units, None, None, None, None)]
+        
+        yield data.Transaction(data.new_metadata('<synthetic>', i), date, '*', None, f'Transaction {i}', 
+                               data.EMPTY_SET, data.EMPTY_SET, postings)
@@ -0,0 +1,77 @@
+"""
+Benchmark of InventoryAggregator.is_small and clean_small on a diff of many accounts (as in the self-testing mode of
+get_equiv_sing_curr_entries): Inventory.is_small per account vs a Tolerance object, prepared once. Both a single
+tolerance and a dict of tolerances per currency are measured. All positions of the diff are small, so is_small
+checks every position.
+
+Usage:
+    python benchmarks/tolerance_bench.py [--accounts N] [--repeat N]
+"""
+import argparse
+import time
+from decimal import Decimal
+
+from beancount.core.amount import Amount
+
+from evbeantools.summator import InventoryAggregator, Tolerance
+
+
+def build_diff(num_accounts: int) -> InventoryAggregator:
+    inv_agg = InventoryAggregator()
+
+    for i in range(num_accounts):
+        inv_agg.add_amount(f'Assets:Bank{i}', Amount(Decimal(i % 7 - 3) / 10**6, 'USD'))
+        inv_agg.add_amount(f'Assets:Bank{i}', Amount(Decimal(i % 5 - 2) / 10**6, 'EUR'))
+
+    return inv_agg
+
+
+def is_small_per_inventory(inv_agg: InventoryAggregator, tolerance) -> bool:
+    return all(inv.is_small(tolerance) for inv in inv_agg.values())
+
+
+def clean_small_per_inventory(inv_agg: InventoryAggregator, tolerance) -> InventoryAggregator:
+    result = InventoryAggregator()
+
+    for account, inv in inv_agg.items():
+        if not inv.is_small(tolerance):
+            result[account] = inv
+
+    return result
+
+
+def measure(name: str, operation, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        operation()
+    elapsed = (time.perf_counter() - start) / repeat
+
+    print(f'{name:<55} {elapsed * 1000:10.3f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--accounts', type=int, default=10000, help='Number of accounts in the diff')
+    parser.add_argument('--repeat', type=int, default=20, help='Number of repetitions for the timing')
+    args = parser.parse_args()
+
+    inv_agg = build_diff(args.accounts)
+
+    for tolerance_name, tolerance in [('single tolerance', Decimal('0.001')),
+                                      ('tolerance per currency', {'USD': Decimal('0.001'), 'EUR': Decimal('0.01')})]:
+        prepared_tolerance = Tolerance(tolerance)
+
+        assert is_small_per_inventory(inv_agg, tolerance) and inv_agg.is_small(prepared_tolerance)
+        assert clean_small_per_inventory(inv_agg, tolerance) == inv_agg.clean_small(prepared_tolerance)
+
+        print(f'{tolerance_name}, {args.accounts} accounts:')
+        measure('  is_small: Inventory.is_small per account', lambda: is_small_per_inventory(inv_agg, tolerance),
+                args.repeat)
+        measure('  is_small: prepared Tolerance', lambda: inv_agg.is_small(prepared_tolerance), args.repeat)
+        measure('  clean_small: Inventory.is_small per account', lambda: clean_small_per_inventory(inv_agg, tolerance),
+                args.repeat)
+        measure('  clean_small: prepared Tolerance', lambda: inv_agg.clean_small(prepared_tolerance), args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,397 @@
+"""
+Implementation of the ColumnarBeanSummator class, an alternative balance engine to the BeanSummator, based on numpy,
+and of the DailyBalanceCube class, which holds the balances of all accounts on every day of a date range
+"""
+from __future__ import annotations
+import datetime
+import re
+import json
+import logging
+from collections.abc import Iterable
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+
+from beancount.core.data import Transaction, Currency
+from beancount.core.amount import Amount
+from beancount.core.position import Cost
+from beancount.core.account import root, Account
+
+from evbeantools.summator import InventoryAggregator
+from evbeantools.scaled_int import get_exponent, to_scaled_int, from_scaled_int, INT64_MAX
+
+logger = logging.getLogger(__name__)
+
+# Used to combine a (account, lot) pair id and a date ordinal into a single sortable integer key
+_DATE_ORDINAL_LIMIT = datetime.date.max.toordinal() + 1
+
+# A lot is a key, under which units are held in a beancount Inventory, i.e. a (currency, cost) pair
+Lot = tuple[Currency, Cost | None]
+
+
+class ColumnarBeanSummator():
+    """
+    Calculates the same sums as the BeanSummator (beanquery SUM of positions per root(n, account) up to a date), but
+    instead of processing entries one by one for every requested date, it converts the filtered postings once into
+    numpy arrays:
+        - date ordinal
+        - interned account id
+        - interned currency id and interned lot (currency, cost) id
+        - amount as a scaled integer (with an exponent per currency, so that the results are exact)
+
+    Cumulative sums per (account, lot) pair are precomputed, so the balance at any date is a searchsorted and a gather.
+    Dates can be requested in any order and balances for many dates are calculated in a vectorized way.
+
+    Unlike the BeanSummator, accounts with a zero balance are not included in the returned sums (as if clean_empty
+    was called on them).
+    """
+    def __init__(self, entries: Iterable, options, accounts_re: str, num_acc_components_from_root: int = 100):
+        """
+        Parameters:
+            entries (Iterable): beancount entries, sorted by date. They are only read once during initialization.
+            options (dict): Options from the beancount file for processing.
+            accounts_re (str): Regular expression pattern to filter accounts for summing.
+            num_acc_components_from_root (int): Number of account hierarchy levels to retain in the account name.
+                                                This is similar to the n in the root(n, account) function in the beanquery.
+        """
+        logger.debug(f'Creating ColumnarBeanSummator with accounts_re={accounts_re} and num_acc_components_from_root={num_acc_components_from_root}')
+
+        self.options = options
+        self.accounts_re = accounts_re
+        self.num_acc_components_from_root = num_acc_components_from_root
+
+        # Interned tables. Ids are the indexes in these lists
+        self.accounts: list[Account] = []
+        self.currencies: list[Currency] = []
+        self.lots: list[Lot] = []
+
+        self._build_arrays(entries)
+
+    def _build_arrays(self, entries: Iterable):
+        """
+        Converts the postings of the entries, which match the accounts_re to numpy arrays and precomputes the cumulative
+        sums per (account, lot) pair
+        """
+        accounts_re_compiled = re.compile(self.accounts_re)
+
+        # Maps an account of a posting to the id of the shortened account or to None, if the account is not summed
+        resolved_accounts: dict[Account, int | None] = {}
+        account_ids: dict[Account, int] = {}
+        currency_ids: dict[Currency, int] = {}
+        lot_ids: dict[Lot, int] = {}
+
+        posting_dates = []
+        posting_account_ids = []
+        posting_lot_ids = []
+        posting_numbers = []
+
+        for entry in entries:
+            if not isinstance(entry, Transaction):
+                continue
+
+            date_ordinal = entry.date.toordinal()
+
+            for posting in entry.postings:
+                if posting.account not in resolved_accounts:
+                    account_id = None
+                    if accounts_re_compiled.search(posting.account):
+                        shortened_account = root(self.num_acc_components_from_root, posting.account)
+                        account_id = account_ids.setdefault(shortened_account, len(account_ids))
+                    resolved_accounts[posting.account] = account_id
+
+                account_id = resolved_accounts[posting.account]
+                if account_id is None:
+                    continue
+
+                lot = (posting.units.currency, posting.cost)
+                if lot not in lot_ids:
+                    lot_ids[lot] = len(lot_ids)
+                    currency_ids.setdefault(posting.units.currency, len(currency_ids))
+
+                posting_dates.append(date_ordinal)
+                posting_account_ids.append(account_id)
+                posting_lot_ids.append(lot_ids[lot])
+                posting_numbers.append(posting.units.number)
+
+        self.accounts = list(account_ids)
+        self.currencies = list(currency_ids)
+        self.lots = list(lot_ids)
+
+        # All amounts in the same currency are scaled with the same exponent, which is big enough to represent each
+        # of them exactly
+        lot_currency_ids = [currency_ids[currency] for currency, _ in self.lots]
+
+        currency_exponents = [0] * len(self.currencies)
+        for lot_id, number in zip(posting_lot_ids, posting_numbers):
+            currency_id = lot_currency_ids[lot_id]
+            currency_exponents[currency_id] = max(currency_exponents[currency_id], get_exponent(number))
+
+        scaled_numbers = [to_scaled_int(number, currency_exponents[lot_currency_ids[lot_id]])
+                          for lot_id, number in zip(posting_lot_ids, posting_numbers)]
+
+        self.currency_exponents = np.array(currency_exponents, dtype=np.int64)
+
+        # The cumulative sums fit into int64 if the sum of absolute values does. Otherwise Python ints are used,
+        # which is slower, but still exact
+        amounts_dtype = np.int64
+        if sum(abs(number) for number in scaled_numbers) > INT64_MAX:
+            logger.debug('Scaled amounts do not fit into int64, Python integers are used')
+            amounts_dtype = object
+
+        self.lot_currency_ids = np.array(lot_currency_ids, dtype=np.int64)
+
+        self.dates = np.array(posting_dates, dtype=np.int64)
+        self.account_ids = np.array(posting_account_ids, dtype=np.int64)
+        self.lot_ids = np.array(posting_lot_ids, dtype=np.int64)
+        self.currency_ids = self.lot_currency_ids[self.lot_ids]
+        self.amounts = np.array(scaled_numbers, dtype=amounts_dtype)
+
+        # Interning (account, lot) pairs, for which the cumulative sums are calculated
+        pair_keys = self.account_ids * max(len(self.lots), 1) + self.lot_ids
+        unique_pair_keys, posting_pair_ids = np.unique(pair_keys, return_inverse=True)
+        self.pair_account_ids = unique_pair_keys // max(len(self.lots), 1)
+        self.pair_lot_ids = unique_pair_keys % max(len(self.lots), 1)
+        self.pair_currency_ids = self.lot_currency_ids[self.pair_lot_ids]
+
+        # Sorting postings by (pair, date). The sort is stable, so the original order within a date is preserved
+        order = np.lexsort((self.dates, posting_pair_ids))
+        self._sorted_keys = posting_pair_ids[order] * _DATE_ORDINAL_LIMIT + self.dates[order]
+
+        # Cumulative sums within each pair are calculated as a global cumulative sum minus the cumulative sum before
+        # the 1st posting of the pair
+        sorted_amounts = self.amounts[order]
+        cumulative_sums = np.cumsum(sorted_amounts)
+        sorted_pair_ids = posting_pair_ids[order]
+        pair_starts = np.searchsorted(sorted_pair_ids, np.arange(len(unique_pair_keys)), side='left')
+        offsets = (cumulative_sums - sorted_amounts)[pair_starts]
+        self._pair_cumulative_sums = cumulative_sums - offsets[sorted_pair_ids]
+
+        logger.debug(f'ColumnarBeanSummator is built with {len(self.dates)} postings and {len(unique_pair_keys)} (account, lot) pairs')
+
+    def balances_at_dates(self, dates: Iterable[datetime.date]) -> np.ndarray:
+        """
+        Returns the balances of all (account, lot) pairs at the end of each of the dates (in any order).
+
+        Returns:
+            A 2D array with the shape (number of dates, number of pairs) of scaled integers. The account, the lot and
+            the currency of the pair i are self.accounts[self.pair_account_ids[i]], self.lots[self.pair_lot_ids[i]] and
+            self.currencies[self.pair_currency_ids[i]], the exponent is self.currency_exponents[self.pair_currency_ids[i]]
+        """
+        date_ordinals = np.array([date.toordinal() for date in dates], dtype=np.int64)
+        pair_ids = np.arange(len(self.pair_account_ids), dtype=np.int64)
+
+        if not len(self._sorted_keys):
+            return np.zeros((len(date_ordinals), 0), dtype=self.amounts.dtype)
+
+        # For each (date, pair) finding the last posting of the pair on or before the date
+        query_keys = pair_ids[np.newaxis, :] * _DATE_ORDINAL_LIMIT + date_ordinals[:, np.newaxis]
+        positions = np.searchsorted(self._sorted_keys, query_keys, side='right') - 1
+
+        # If the found posting belongs to the previous pair, the pair has no postings on or before the date
+        clipped_positions = np.clip(positions, 0, None)
+        found = (positions >= 0) & (self._sorted_keys[clipped_positions] // _DATE_ORDINAL_LIMIT == pair_ids[np.newaxis, :])
+
+        return np.where(found, self._pair_cumulative_sums[clipped_positions], 0)
+
+    def totals_at_dates(self, dates: Iterable[datetime.date]) -> np.ndarray:
+        """
+        Returns the total balance of all summed accounts per lot at the end of each of the dates (e.g. a net worth
+        if the accounts_re selects balance sheet accounts)
+
+        Returns:
+            A 2D array with the shape (number of dates, number of lots) of scaled integers. The lot of the column i is
+            self.lots[i], its exponent is self.currency_exponents[self.lot_currency_ids[i]]
+        """
+        balances = self.balances_at_dates(dates)
+
+        result = np.zeros((balances.shape[0], len(self.lots)), dtype=balances.dtype)
+        np.add.at(result.T, self.pair_lot_ids, balances.T)
+
+        return result
+
+    def sum_till_date(self, date: datetime.date) -> InventoryAggregator:
+        """
+        Sums the balances of transactions for accounts matching the accounts_re regular expression pattern up and
+        including to the specified date. Unlike BeanSummator.sum_till_date, dates can be requested in any order.
+        """
+        assert isinstance(date, datetime.date)
+
+        balances = self.balances_at_dates([date])[0]
+
+        result = InventoryAggregator()
+
+        for pair_id in np.flatnonzero(balances):
+            currency, cost = self.lots[self.pair_lot_ids[pair_id]]
+            exponent = int(self.currency_exponents[self.pair_currency_ids[pair_id]])
+            units = Amount(from_scaled_int(balances[pair_id], exponent), currency)
+            result.add_amount(self.accounts[self.pair_account_ids[pair_id]], units, cost)
+
+        return result
+
+    def daily_balance_cube(self, start_date: datetime.date, end_date: datetime.date) -> DailyBalanceCube:
+        """
+        Returns the balances of all accounts in all currencies (summed over the lots, i.e. ignoring the cost) at the end
+        of each day from the start_date to the end_date (including). The postings are added to the cube in a single
+        vectorized pass and accumulated along the dates, so no Inventory objects are created.
+        """
+        num_days = (end_date - start_date).days + 1
+        if num_days < 1:
+            raise ValueError(f'End date {end_date} is before the start date {start_date}')
+
+        # The postings before the start_date are included in the balance of the first day
+        day_indexes = np.clip(self.dates - start_date.toordinal(), 0, None)
+        in_range = day_indexes < num_days
+
+        balances = np.zeros((num_days, len(self.accounts), len(self.currencies)), dtype=self.amounts.dtype)
+        np.add.at(balances, (day_indexes[in_range], self.account_ids[in_range], self.currency_ids[in_range]),
+                  self.amounts[in_range])
+        np.cumsum(balances, axis=0, out=balances)
+
+        return DailyBalanceCube(start_date, balances, list(self.accounts), list(self.currencies),
+                                self.currency_exponents.copy())
+
+
+class DailyBalanceCube():
+    """
+    Balances of accounts in currencies at the end of each day of a date range, as a dense 3D numpy array of scaled
+    integers with the shape (number of days, number of accounts, number of currencies). The balances are the units,
+    summed over all lots of the currency (i.e. ignoring the cost).
+
+    balances[d, a, c] is the balance of the account accounts[a] in the currency currencies[c] at the end of the day
+    start_date + d days, scaled by 10**currency_exponents[c].
+
+    The cube can be saved to a .npz file (see save_npz) or to a directory, from which the balances are memory-mapped
+    (see save_memmap and load_memmap), so that slicing a large cube in a later session does not read all of it.
+    """
+    BALANCES_FILE_NAME = 'balances.npy'
+    META_FILE_NAME = 'meta.json'
+
+    def __init__(self, start_date: datetime.date, balances: np.ndarray, accounts: list[Account],
+                 currencies: list[Currency], currency_exponents: np.ndarray):
+        assert balances.shape[1:] == (len(accounts), len(currencies))
+
+        self.start_date = start_date
+        self.balances = balances
+        self.accounts = accounts
+        self.currencies = currencies
+        self.currency_exponents = currency_exponents
+
+        self.account_ids = {account: account_id for account_id, account in enumerate(accounts)}
+        self.currency_ids = {currency: currency_id for currency_id, currency in enumerate(currencies)}
+
+    @property
+    def end_date(self) -> datetime.date:
+        return self.start_date + datetime.timedelta(days=self.balances.shape[0] - 1)
+
+    def get_day_index(self, date: datetime.date) -> int:
+        """
+        Returns the index of the date along the 1st axis of the balances
+
+        Raises:
+            ValueError: If the date is outside of the date range of the cube
+        """
+        if not self.start_date <= date <= self.end_date:
+            raise ValueError(f'Date {date} is outside of the range of the cube {self.start_date} - {self.end_date}')
+
+        return (date - self.start_date).days
+
+    def get_balance(self, date: datetime.date, account: Account, currency: Currency) -> Decimal:
+        """
+        Returns the balance of the account in the currency at the end of the date. Zero if the account or the currency
+        is not in the cube
+        """
+        day_index = self.get_day_index(date)
+
+        if account not in self.account_ids or currency not in self.currency_ids:
+            return Decimal(0)
+
+        currency_id = self.currency_ids[currency]
+
+        return from_scaled_int(self.balances[day_index, self.account_ids[account], currency_id],
+                               int(self.currency_exponents[currency_id]))
+
+    def at_date(self, date: datetime.date) -> InventoryAggregator:
+        """
+        Returns the non-zero balances at the end of the date as an InventoryAggregator (with positions without cost)
+        """
+        day_balances = self.balances[self.get_day_index(date)]
+
+        result = InventoryAggregator()
+
+        for account_id, currency_id in zip(*np.nonzero(day_balances)):
+            currency = self.currencies[currency_id]
+            number = from_scaled_int(day_balances[account_id, currency_id], int(self.currency_exponents[currency_id]))
+            result.add_amount(self.accounts[account_id], Amount(number, currency))
+
+        return result
+
+    def _get_meta(self) -> dict:
+        return {'start_date': self.start_date.isoformat(),
+                'accounts': self.accounts,
+                'currencies': self.currencies,
+                'currency_exponents': self.currency_exponents.tolist()}
+
+    @classmethod
+    def _from_meta(cls, meta: dict, balances: np.ndarray) -> DailyBalanceCube:
+        return cls(datetime.date.fromisoformat(meta['start_date']), balances, list(meta['accounts']),
+                   list(meta['currencies']), np.array(meta['currency_exponents'], dtype=np.int64))
+
+    def save_npz(self, path: str | Path):
+        """
+        Saves the cube to a single compressed .npz file. No array is pickled (see load_npz): the labels are saved as
+        string arrays and the balances, which are Python integers (see ColumnarBeanSummator), as decimal strings
+        """
+        balances = self.balances.astype(str) if self.balances.dtype == object else self.balances
+
+        np.savez_compressed(path, balances=balances, start_date=np.array(self.start_date.isoformat()),
+                            accounts=np.array(self.accounts, dtype=str), currencies=np.array(self.currencies, dtype=str),
+                            currency_exponents=self.currency_exponents)
+
+    @classmethod
+    def load_npz(cls, path: str | Path) -> DailyBalanceCube:
+        """
+        Loads the cube, saved by save_npz. Pickled arrays are not loaded, so loading a file from an untrusted source
+        cannot execute code
+
+        Raises:
+            ValueError: If the file contains a pickled (object) array
+        """
+        with np.load(path, allow_pickle=False) as npz_file:
+            balances = npz_file['balances']
+            if balances.dtype.kind == 'U':
+                balances = np.array([int(balance) for balance in balances.ravel().tolist()],
+                                    dtype=object).reshape(balances.shape)
+
+            return cls(datetime.date.fromisoformat(str(npz_file['start_date'])), balances,
+                       npz_file['accounts'].tolist(), npz_file['currencies'].tolist(),
+                       npz_file['currency_exponents'].astype(np.int64))
+
+    def save_memmap(self, directory: str | Path):
+        """
+        Saves the cube to the directory as a .npy file with the balances and a .json file with the rest of the data
+
+        Raises:
+            ValueError: If the balances are not int64 (i.e. Python integers, which cannot be memory-mapped)
+        """
+        if self.balances.dtype != np.int64:
+            raise ValueError(f'Only int64 balances can be memory-mapped, the balances are {self.balances.dtype}')
+
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        np.save(directory / self.BALANCES_FILE_NAME, self.balances)
+        (directory / self.META_FILE_NAME).write_text(json.dumps(self._get_meta()), encoding='utf-8')
+
+    @classmethod
+    def load_memmap(cls, directory: str | Path, mode: str = 'r') -> DailyBalanceCube:
+        """
+        Loads the cube, saved by save_memmap. The balances are memory-mapped with the mode (see numpy.load), i.e. are
+        read from the disk only when they are accessed
+        """
+        directory = Path(directory)
+
+        balances = np.load(directory / cls.BALANCES_FILE_NAME, mmap_mode=mode)
+        meta = json.loads((directory / cls.META_FILE_NAME).read_text(encoding='utf-8'))
+
+        return cls._from_meta(meta, balances)
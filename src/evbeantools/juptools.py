@@ -1,5 +1,9 @@
 """
 Set of tools to work with beancount in Jupyter notebooks environment
+
+Balances of accounts over time (e.g. for plotting) are built directly from the sums of the BeanSummator by 
+inventory_aggregators_to_df and balances_at_dates_df, without object columns. beanquery2df is for the results of 
+arbitrary beanquery queries, which are not balances per account, currency and date.
 """
 
 from decimal import Decimal
@@ -12,10 +16,12 @@ import pandas as pd
 import numpy as np
 
 from beancount.core.prices import PriceMap, build_price_map
+from beancount.core import inventory
 from beanquery.query import run_query
 
 
 from evbeantools.summator import BeanSummator, InventoryAggregator
+from evbeantools.scaled_int import get_exponent, to_scaled_int, INT64_MAX
 
 
 def convert_columns_to_float(df: pd.DataFrame) -> pd.DataFrame:
@@ -94,6 +100,11 @@ def add_total(df: pd.DataFrame,
 
 
 def beanquery2df(entries: list, opts: dict,  query: str) -> pd.DataFrame:
+    """
+    Runs the beanquery query and returns the result as a DataFrame, with the Decimal columns converted to float 
+    (see convert_columns_to_float). For balances at many dates use balances_at_dates_df instead, which does not run 
+    a query per date and does not create object columns.
+    """
     
     # print("Running my_run_query")
     
@@ -105,3 +116,168 @@ def beanquery2df(entries: list, opts: dict,  query: str) -> pd.DataFrame:
 
     return df
 
+
+
+
+def inventory_aggregators_to_df(snapshots: Iterable[tuple[datetime.date, InventoryAggregator]], 
+                                scaled: bool = False) -> pd.DataFrame:
+    """
+    Converts a series of InventoryAggregator snapshots (e.g. as yielded by BeanSummator.sum_at_dates) into a 
+    DataFrame with a row per date and a column per (account, currency) pair. The values are the units, summed over 
+    all positions in the currency (i.e. the cost is ignored), and 0 where the account does not hold the currency.
+    
+    The snapshots of the BeanSummator share the Inventories of the accounts, which have not changed, so only the 
+    changed Inventories are converted and the rest is forward filled by numpy. No object columns are created, so 
+    tens of thousands of snapshots can be converted.
+    
+    Note: an Inventory is considered unchanged if it is the same object as in the previous snapshot, hence the 
+    snapshots must not be modified in place. Pass InventoryAggregator.snapshot() (or a copy) of a running sum at each 
+    date, not the running sum itself.
+    
+    Args:
+        snapshots (Iterable[tuple[datetime.date, InventoryAggregator]]): dates and the snapshots at these dates
+        scaled (bool): If False, the values are float64. If True, they are exact int64 scaled integers and the 
+                       exponent of each currency is in df.attrs['exponents'], i.e. the number is value / 10**exponent
+
+    Returns:
+        pd.DataFrame: dataframe with the dates as the index and the (account, currency) MultiIndex as the columns
+        
+    Raises:
+        ValueError: If scaled is True and a value does not fit into int64 or if the same InventoryAggregator object is 
+                    passed for consecutive dates (i.e. it is modified in place)
+    """
+    changes = _ValueChanges()
+    
+    # The Inventory of each account in the previous snapshot and its units per currency
+    previous: dict[str, tuple[inventory.Inventory, dict[str, Decimal]]] = {}
+    previous_inv_agg = None
+    
+    for row, (date, inv_agg) in enumerate(snapshots):
+        if inv_agg is previous_inv_agg:
+            raise ValueError(f'The same InventoryAggregator object is passed for the dates {changes.dates[-1]} and {date}, '
+                             f'pass a snapshot (see InventoryAggregator.snapshot) for each date')
+        previous_inv_agg = inv_agg
+        
+        changes.dates.append(date)
+        
+        for account, account_inventory in inv_agg.items():
+            previous_inventory, previous_units = previous.get(account, (None, {}))
+            if account_inventory is previous_inventory:
+                continue
+            
+            units: dict[str, Decimal] = {}
+            for pos in account_inventory:
+                units[pos.units.currency] = units.get(pos.units.currency, Decimal(0)) + pos.units.number
+                
+            for currency in previous_units.keys() - units.keys():
+                changes.add(row, account, currency, Decimal(0))
+            for currency, number in units.items():
+                if previous_units.get(currency) != number:
+                    changes.add(row, account, currency, number)
+                
+            previous[account] = (account_inventory, units)
+            
+        for account in previous.keys() - inv_agg.keys():
+            for currency in previous.pop(account)[1]:
+                changes.add(row, account, currency, Decimal(0))
+                
+    return changes.to_df(scaled)
+
+
+def balances_at_dates_df(entries: list, opts: dict, accounts_re: str, dates: Iterable[datetime.date], 
+                         num_acc_components_from_root: int = 100, scaled: bool = False) -> pd.DataFrame:
+    """
+    Returns the balances of the accounts, matching accounts_re, at the end of each of the dates as a DataFrame, 
+    see inventory_aggregators_to_df. 
+    
+    The entries are summed in a single pass by the BeanSummator, but instead of the full sums, only the changes 
+    between the dates are converted (see BeanSummator.deltas_since_last), so the time does not depend on the number of 
+    accounts and lots held at each date.
+    
+    Args:
+        entries (list): beancount entries
+        opts (dict): beancount options
+        accounts_re (str): regular expression pattern of the accounts, see BeanSummator
+        dates (Iterable[datetime.date]): dates, sorted in the ascending order
+        num_acc_components_from_root (int): see BeanSummator
+        scaled (bool): see inventory_aggregators_to_df
+    """
+    bean_summator = BeanSummator(entries, opts, accounts_re, num_acc_components_from_root)
+    
+    changes = _ValueChanges()
+    balances: dict[tuple[str, str], Decimal] = {}
+    
+    for row, date in enumerate(dates):
+        changes.dates.append(date)
+        
+        changed_balances = {}
+        for account, account_inventory in bean_summator.deltas_since_last(date).items():
+            for pos in account_inventory:
+                key = (account, pos.units.currency)
+                changed_balances[key] = balances[key] = balances.get(key, Decimal(0)) + pos.units.number
+                
+        for (account, currency), number in changed_balances.items():
+            changes.add(row, account, currency, number)
+    
+    return changes.to_df(scaled)
+
+
+class _ValueChanges():
+    """
+    Collects the changes of the values of a DataFrame with a row per date and a column per (account, currency) and 
+    builds the DataFrame, where the values, which have not changed in a row, are forward filled
+    """
+    def __init__(self):
+        self.dates: list[datetime.date] = []
+        self.column_ids: dict[tuple[str, str], int] = {}
+        
+        # The changed values: the row, the column id and the new value
+        self.rows: list[int] = []
+        self.value_column_ids: list[int] = []
+        self.numbers: list[Decimal] = []
+        
+    def add(self, row: int, account: str, currency: str, number: Decimal):
+        self.rows.append(row)
+        self.value_column_ids.append(self.column_ids.setdefault((account, currency), len(self.column_ids)))
+        self.numbers.append(number)
+        
+    def to_df(self, scaled: bool) -> pd.DataFrame:
+        columns = list(self.column_ids)
+        exponents: dict[str, int] = {}
+        
+        if scaled:
+            for column_id, number in zip(self.value_column_ids, self.numbers):
+                currency = columns[column_id][1]
+                exponents[currency] = max(exponents.get(currency, 0), get_exponent(number))
+                
+            values = [to_scaled_int(number, exponents[columns[column_id][1]]) 
+                      for column_id, number in zip(self.value_column_ids, self.numbers)]
+            
+            if any(abs(value) > INT64_MAX for value in values):
+                raise ValueError('Scaled values do not fit into int64, use scaled=False')
+            
+            dtype = np.int64
+        else:
+            values = [float(number) for number in self.numbers]
+            dtype = np.float64
+        
+        matrix = np.zeros((len(self.dates), len(columns)), dtype=dtype)
+        matrix[self.rows, self.value_column_ids] = values
+        
+        # Each value is taken from the last row, where it has been changed (or from the 1st row, which is 0 otherwise)
+        is_changed = np.zeros(matrix.shape, dtype=bool)
+        is_changed[self.rows, self.value_column_ids] = True
+        
+        source_rows = np.where(is_changed, np.arange(len(self.dates))[:, np.newaxis], 0)
+        np.maximum.accumulate(source_rows, axis=0, out=source_rows)
+        matrix = np.take_along_axis(matrix, source_rows, axis=0)
+        
+        df = pd.DataFrame(matrix, 
+                          index=pd.DatetimeIndex(self.dates, name='date'),
+                          columns=pd.MultiIndex.from_tuples(columns, names=['account', 'currency']))
+        df = df.sort_index(axis=1)
+        
+        if scaled:
+            df.attrs['exponents'] = exponents
+        
+        return df
@@ -0,0 +1,175 @@
+"""
+Implementation of the PostingFilter class, which selects the postings, summed by the BeanSummator, by the properties of
+their transactions (tags, links, payee, narration, flag, metadata) and of their accounts (see the posting_filter
+parameter of the BeanSummator)
+"""
+from __future__ import annotations
+import re
+from collections.abc import Callable, Iterable
+
+from beancount.core.data import Transaction
+from beancount.core.account import Account
+
+
+class PostingFilter():
+    """
+    Predicate over the postings of transactions, which is compiled once into two lists of checks:
+        - entry checks (tags, links, payee, narration, flag, metadata and entry_predicate), which depend only on the
+          transaction and are evaluated once per transaction (see matches_entry)
+        - account checks (account_re, exclude_account_re and account_predicate), which depend only on the account
+          and are evaluated once per account, as the BeanSummator caches their result (see matches_account)
+
+    A posting passes the filter if its transaction passes all entry checks and its account passes all account checks.
+    Parameters, which are None, are not checked.
+
+    Only the parameters are pickled (e.g. when the filter is sent to the workers of the ParallelBeanSummator), the
+    checks are compiled again when it is unpickled. Hence entry_predicate and account_predicate must be picklable
+    (e.g. module level functions, not lambdas) for the filter to be picklable.
+
+    Example:
+        PostingFilter(tags={'trip'}, payee_re='^Airline', meta={'category': 'travel'})
+    """
+    def __init__(self, tags: Iterable[str] | None = None, exclude_tags: Iterable[str] | None = None,
+                 links: Iterable[str] | None = None, payee_re: str | None = None, narration_re: str | None = None,
+                 flags: Iterable[str] | None = None, meta: dict | None = None,
+                 entry_predicate: Callable[[Transaction], bool] | None = None,
+                 account_re: str | None = None, exclude_account_re: str | None = None,
+                 account_predicate: Callable[[Account], bool] | None = None):
+        """
+        Parameters:
+            tags (Iterable[str] | None): The transaction must have at least one of these tags.
+            exclude_tags (Iterable[str] | None): The transaction must have none of these tags.
+            links (Iterable[str] | None): The transaction must have at least one of these links.
+            payee_re (str | None): Regular expression, which must be found in the payee (a missing payee is "").
+            narration_re (str | None): Regular expression, which must be found in the narration.
+            flags (Iterable[str] | None): The flag of the transaction must be one of these, e.g. {'*'}.
+            meta (dict | None): Each key must be in the metadata of the transaction with the given value.
+            entry_predicate (Callable | None): Any other check of the transaction.
+            account_re (str | None): Regular expression, which must be found in the account of the posting.
+            exclude_account_re (str | None): Regular expression, which must not be found in the account.
+            account_predicate (Callable | None): Any other check of the account of the posting.
+        """
+        self.tags = None if tags is None else frozenset(tags)
+        self.exclude_tags = None if exclude_tags is None else frozenset(exclude_tags)
+        self.links = None if links is None else frozenset(links)
+        self.payee_re = payee_re
+        self.narration_re = narration_re
+        self.flags = None if flags is None else frozenset(flags)
+        self.meta = None if meta is None else dict(meta)
+        self.entry_predicate = entry_predicate
+        self.account_re = account_re
+        self.exclude_account_re = exclude_account_re
+        self.account_predicate = account_predicate
+
+        self._entry_checks = self._compile_entry_checks()
+        self._account_checks = self._compile_account_checks()
+
+    def _compile_entry_checks(self) -> list[Callable[[Transaction], bool]]:
+        checks = []
+
+        # The cheapest checks go first, as the evaluation stops at the first failed one
+        if self.flags is not None:
+            flags = self.flags
+            checks.append(lambda entry: entry.flag in flags)
+
+        if self.tags is not None:
+            tags = self.tags
+            checks.append(lambda entry: not tags.isdisjoint(entry.tags or ()))
+
+        if self.exclude_tags is not None:
+            exclude_tags = self.exclude_tags
+            checks.append(lambda entry: exclude_tags.isdisjoint(entry.tags or ()))
+
+        if self.links is not None:
+            links = self.links
+            checks.append(lambda entry: not links.isdisjoint(entry.links or ()))
+
+        if self.meta is not None:
+            meta_items = tuple(self.meta.items())
+            checks.append(lambda entry: all(key in entry.meta and entry.meta[key] == value for key, value in meta_items))
+
+        if self.payee_re is not None:
+            search_payee = re.compile(self.payee_re).search
+            checks.append(lambda entry: search_payee(entry.payee or '') is not None)
+
+        if self.narration_re is not None:
+            search_narration = re.compile(self.narration_re).search
+            checks.append(lambda entry: search_narration(entry.narration or '') is not None)
+
+        if self.entry_predicate is not None:
+            checks.append(self.entry_predicate)
+
+        return checks
+
+    def _compile_account_checks(self) -> list[Callable[[Account], bool]]:
+        checks = []
+
+        if self.account_re is not None:
+            search_account = re.compile(self.account_re).search
+            checks.append(lambda account: search_account(account) is not None)
+
+        if self.exclude_account_re is not None:
+            search_excluded_account = re.compile(self.exclude_account_re).search
+            checks.append(lambda account: search_excluded_account(account) is None)
+
+        if self.account_predicate is not None:
+            checks.append(self.account_predicate)
+
+        return checks
+
+    def matches_entry(self, entry: Transaction) -> bool:
+        """
+        Returns True if the transaction passes all entry checks
+        """
+        for check in self._entry_checks:
+            if not check(entry):
+                return False
+
+        return True
+
+    def matches_account(self, account: Account) -> bool:
+        """
+        Returns True if the account passes all account checks
+        """
+        for check in self._account_checks:
+            if not check(account):
+                return False
+
+        return True
+
+    def _get_params(self) -> tuple:
+        return (sorted(self.tags) if self.tags is not None else None,
+                sorted(self.exclude_tags) if self.exclude_tags is not None else None,
+                sorted(self.links) if self.links is not None else None,
+                self.payee_re, self.narration_re,
+                sorted(self.flags) if self.flags is not None else None,
+                sorted(self.meta.items(), key=repr) if self.meta is not None else None,
+                self.entry_predicate, self.account_re, self.exclude_account_re, self.account_predicate)
+
+    def __getstate__(self) -> dict:
+        # The compiled checks are local lambdas, which cannot be pickled
+        state = self.__dict__.copy()
+        del state['_entry_checks']
+        del state['_account_checks']
+
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+
+        self._entry_checks = self._compile_entry_checks()
+        self._account_checks = self._compile_account_checks()
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, PostingFilter):
+            return NotImplemented
+
+        return self._get_params() == other._get_params()
+
+    def __hash__(self) -> int:
+        return hash(repr(self))
+
+    def __repr__(self) -> str:
+        # The repr is a part of the snapshot cache key (see BeanSummator). The repr of a function includes its
+        # address, so the sums, filtered by a predicate, are never reused by another process
+        return f'{self.__class__.__name__}{self._get_params()!r}'
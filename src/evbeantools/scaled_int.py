@@ -0,0 +1,56 @@
+"""
+Helpers to represent Decimal numbers exactly as scaled integers, e.g. Decimal("12.34") with the exponent 2 is 1234.
+
+Scaled integers are used where a large number of amounts has to be stored or summed efficiently (e.g. in numpy
+arrays), while keeping the results exact.
+"""
+from __future__ import annotations
+from decimal import Decimal
+
+# Limits of the numpy int64 type
+INT64_MAX = 2**63 - 1
+
+
+def get_exponent(number: Decimal) -> int:
+    """
+    Returns the number of digits after the decimal point of the number, which is the minimal exponent, needed to
+    represent the number as a scaled integer exactly. E.g. 2 for Decimal("12.34") and 0 for Decimal("1E+2")
+
+    Raises:
+        ValueError: If the number is not finite
+    """
+    exponent = number.as_tuple().exponent
+    if not isinstance(exponent, int):
+        raise ValueError(f'Number {number} cannot be represented as a scaled integer')
+
+    return max(0, -exponent)
+
+
+def to_scaled_int(number: Decimal, exponent: int) -> int:
+    """
+    Converts the number to an integer, scaled by 10**exponent. The conversion is exact, no context rounding is applied.
+
+    Raises:
+        ValueError: If the number has more digits after the decimal point than the exponent allows
+    """
+    sign, digits, number_exponent = number.as_tuple()
+    if not isinstance(number_exponent, int):
+        raise ValueError(f'Number {number} cannot be represented as a scaled integer')
+
+    shift = number_exponent + exponent
+    if shift < 0:
+        raise ValueError(f'Number {number} cannot be represented exactly as a scaled integer with the exponent {exponent}')
+
+    result = int(''.join(map(str, digits)) or '0') * 10**shift
+
+    return -result if sign else result
+
+
+def from_scaled_int(value: int, exponent: int) -> Decimal:
+    """
+    Converts the integer, scaled by 10**exponent back to a Decimal. The conversion is exact, no context rounding is
+    applied.
+    """
+    sign, digits, _ = Decimal(int(value)).as_tuple()
+
+    return Decimal((sign, digits, -exponent))
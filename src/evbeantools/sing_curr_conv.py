@@ -15,7 +15,6 @@ import argparse
 import io
 from typing import NamedTuple
 import os
-import copy
 
 from beanquery.query import run_query
 import beanquery
@@ -41,7 +40,8 @@ import beanquery.shell
 
 # from pydantic import ValidationError, validate_call
 
-from evbeantools.summator import BeanSummator, InventoryAggregator
+from evbeantools.summator import BeanSummator, InventoryAggregator, ConversionRateCache
+from evbeantools.summator_stats import SummatorStats
 from evbeantools.sing_curr_conv_utils import check_vs_beanquery
 
 # This is to make sure, that the module can be run as beancount plugin
@@ -611,8 +611,8 @@ def convert_transaction_to_new_currency(original_transaction: Transaction,
         beancount.core.data.Transaction: The converted transaction.
     """
     
-    original_transaction = copy.deepcopy(original_transaction)
-    
+    # The original transaction is not modified. The converted transaction shares its meta and the postings, which do 
+    # not need to be converted. The converted postings get a copy of the original posting meta
     unconvertable_commodities_to_return: Commodities = unconvertable_commodities.copy()
     
     converted_transaction = data.Transaction(meta=original_transaction.meta, 
@@ -632,8 +632,6 @@ def convert_transaction_to_new_currency(original_transaction: Transaction,
         # logger.debug(f"Converting posting:\n {pformat(original_posting)}")
         
         new_units = None
-
-        new_meta = original_posting.meta if original_posting.meta else {}
         
         first_date_of_price = get_fist_date_of_price(price_map, (original_posting.units.currency, target_currency))
     
@@ -646,6 +644,8 @@ def convert_transaction_to_new_currency(original_transaction: Transaction,
             
             at_least_one_posting_converted = True
             
+            new_meta = dict(original_posting.meta) if original_posting.meta else {}
+            
             # In this case we just only effectively remove cost and price, no conversion is needed
             if original_posting.units.currency == target_currency:
                 new_units = original_posting.units
@@ -923,9 +923,6 @@ def get_needed_converted_entries(entries, price_map,
             
             entry_to_return = None
             
-            # TODO: @Ev2geny: Check if this is needed, but now leaving just in case
-            entry = copy.copy(entry)
-            
             entry_date = entry.date
             
             # Dropping all entries, which are after the end_date
@@ -942,7 +939,7 @@ def get_needed_converted_entries(entries, price_map,
             if isinstance(entry, Open):
                 if entry.currencies:
                 
-                    new_meta = copy.deepcopy(entry.meta) if entry.meta else {}
+                    new_meta = dict(entry.meta) if entry.meta else {}
                     new_meta[SINGLE_CURENCY_CONVERTER_MSG_META] = f"Converted from original Open entry by removing currencies {entry.currencies}"
                     
                     entry_to_return = data.Open(new_meta, entry.date, entry.account, None, None)
@@ -1118,7 +1115,20 @@ def get_unrealized_gains_transactions(net_worth_calculator: BeanSummator,
     
     result = []
     
-    for date, daily_price_changes in price_changes_map.items():
+    # Net worth at the start of each day with price changes, which is equivalent to the net worth at the end of the 
+    # previous day. The dates in the price_changes_map are sorted, so all of them are calculated in a single pass
+    net_worth_start_of_days = net_worth_calculator.sum_at_dates(date-datetime.timedelta(days=1) for date in price_changes_map)
+    
+    # Conversion rates are shared between all conversions below, as the rate of the previous day for one price change
+    # is often the rate of the same day for another one
+    rate_cache = ConversionRateCache(price_map)
+    
+    for (date, daily_price_changes), (_, net_worth_start_of_day_multicurr) in zip(price_changes_map.items(), 
+                                                                                 net_worth_start_of_days):
+        
+        # This is just a type hint, no functionality
+        net_worth_start_of_day_multicurr: InventoryAggregator
+        
         for daily_price_change in daily_price_changes:
             
             # These are just a type hints, no functionality
@@ -1140,26 +1150,23 @@ def get_unrealized_gains_transactions(net_worth_calculator: BeanSummator,
                 
                 raise UnconvertableCommBecomesConvertibleErr(error_str)
             
-            # getting net worth at the start of the day, which is equivalent to the net worth at the end of the 
-            # previous day
-            net_worth_start_of_day_multicurr: InventoryAggregator = net_worth_calculator.sum_till_date(date-datetime.timedelta(days=1)).clean_empty()
-            
-            # Extracting net worth part, which is contributed by the changed currency
+            # Extracting net worth part, which is contributed by the changed currency. This uses the currency index of 
+            # the sum (built once per day, on the first changed currency), so only the accounts holding the currency 
+            # are looked at
             net_worth_start_of_day_in_changed_curr: InventoryAggregator = net_worth_start_of_day_multicurr.get_currency_positions(currency_targetCurrency_pair[0])
             
             # Calculating net worth beginning of the day in the target currency with the exchange rate as it was before the price change
             # The exchange rate as it was before the price change is the exchange rate, the way it was on the previous day
-            net_worth_start_of_day_in_target_curr_prev_rate: InventoryAggregator = net_worth_start_of_day_in_changed_curr.convert(target_currency, price_map, date-datetime.timedelta(days=1))
+            net_worth_start_of_day_in_target_curr_prev_rate: InventoryAggregator = net_worth_start_of_day_in_changed_curr.convert(target_currency, price_map, date-datetime.timedelta(days=1), rate_cache)
             logger.debug(f"net_worth_start_of_day_in_target_curr_prev_rate:\n{pformat(net_worth_start_of_day_in_target_curr_prev_rate)}")
             
             # Now calculating net worth in the target currency with the exchange rate on that date
-            net_worth_start_of_day_target_curr_new_rate: InventoryAggregator = net_worth_start_of_day_in_changed_curr.convert(target_currency, price_map, date)
+            net_worth_start_of_day_target_curr_new_rate: InventoryAggregator = net_worth_start_of_day_in_changed_curr.convert(target_currency, price_map, date, rate_cache)
             logger.debug(f"net_worth_start_of_day_target_curr_new_rate:\n{pformat(net_worth_start_of_day_target_curr_new_rate)}")
             
             # getting difference between net worth beginning of the day in the target currency and the net worth beginning of the day in the target currency, 
             # but with the exchange rate as it was before the price change
-            unrealized_gains_inv_agg: InventoryAggregator = net_worth_start_of_day_target_curr_new_rate - net_worth_start_of_day_in_target_curr_prev_rate
-            unrealized_gains_inv_agg = unrealized_gains_inv_agg.clean_empty().get_sorted()
+            unrealized_gains_inv_agg: InventoryAggregator = net_worth_start_of_day_target_curr_new_rate.diff_clean(net_worth_start_of_day_in_target_curr_prev_rate)
             
             if unrealized_gains_inv_agg.is_empty():
                 logger.debug(f"No unrealized gains on the date {date}")
@@ -1249,7 +1256,8 @@ def get_equiv_sing_curr_entries(entries: list[NamedTuple],
                                 tolerance: str = TOLERANCE_DEF,
                                 group_p_l_acc_tr=False,
                                 shell_mode: bool = False,
-                                debug_mode: bool = False) -> tuple[list[NamedTuple], list[NamedTuple], dict]:
+                                debug_mode: bool = False,
+                                print_stats: bool = False) -> tuple[list[NamedTuple], list[NamedTuple], dict]:
     """
     Convert all ledger entries to a single target currency while calculating unrealized gains.
 
@@ -1297,6 +1305,9 @@ def get_equiv_sing_curr_entries(entries: list[NamedTuple],
             
         debug_mode (bool, optional): If True, debug logging is enabled. Defaults to False. Debug log is created in 
             the default temporary directory of the OS(e.g. on Windows c:\temp, on Linux /tmp). 
+            
+        print_stats (bool, optional): If True, the counters and the timings of the net worth summation (see 
+            SummatorStats) are printed at the end of the run. Defaults to False.
 
     Returns:
         tuple: A tuple containing:
@@ -1308,27 +1319,29 @@ def get_equiv_sing_curr_entries(entries: list[NamedTuple],
     if debug_mode:
         initilize_logging()
 
-    # Making sure that we will not mess up with the original entries and options
-    entries = copy.deepcopy(entries)
-    options = copy.deepcopy(options)
+    # The original entries and options are not copied, they are treated as immutable. The conversion creates new 
+    # entries, postings and meta dicts only where something changes, the unchanged ones are shared with the input 
+    # (the result is read back from its printed form anyway, see pass_entries_through_file)
 
-    start_log_message = textwrap.dedent(f"""
-        get_equiv_sing_curr_entries is called with the following parameters:
+    # Formatting all entries takes longer than the conversion itself, so it is done only if it is logged
+    if logger.isEnabledFor(logging.DEBUG):
+        start_log_message = textwrap.dedent(f"""
+            get_equiv_sing_curr_entries is called with the following parameters:
         
-        Entries:
-        {pformat(entries)}
+            Entries:
+            {pformat(entries)}
         
-        Options: 
-        {pformat(options)}
+            Options: 
+            {pformat(options)}
         
-        target_currency: {target_currency}
-        start_date: {start_date}
-        end_date: {end_date}
-        unreal_gains_p_l_acc: {unreal_gains_p_l_acc}
-        self_testing_mode: {self_testing_mode}
-        """)
+            target_currency: {target_currency}
+            start_date: {start_date}
+            end_date: {end_date}
+            unreal_gains_p_l_acc: {unreal_gains_p_l_acc}
+            self_testing_mode: {self_testing_mode}
+            """)
     
-    logger.debug(start_log_message)
+        logger.debug(start_log_message)
 
     if isinstance(start_date, str):
             start_date = datetime.datetime.strptime(start_date, "%Y-%m-%d").date()
@@ -1387,7 +1400,8 @@ def get_equiv_sing_curr_entries(entries: list[NamedTuple],
   
     net_worth_calculator = BeanSummator(entries=entries, 
                                         options=options, 
-                                        accounts_re=accounts_re)
+                                        accounts_re=accounts_re,
+                                        stats=SummatorStats() if print_stats else None)
   
     eqv_starting_transaction, eqv_starting_unconv_comm = create_equivalent_starting_transaction(net_worth_calculator,
                                                                                                 options,
@@ -1442,6 +1456,9 @@ def get_equiv_sing_curr_entries(entries: list[NamedTuple],
     
     entries_to_return, errors_to_return, options_to_return = pass_entries_through_file(entries_to_return, options)
     
+    if print_stats:
+        print(net_worth_calculator.stats)
+    
     return entries_to_return, errors_to_return, options_to_return 
 
 
@@ -1555,6 +1572,8 @@ def main():
                                  Otherwise (if this argument is not provided) there will be a P&L account posting for each Bal Sheet account, which has unrealized gains. 
                                  Usage of this argument causes more compact unrealized gains transactions, but such
                                  posting will not have the {UNREALIZED_GAINS_BAL_S_ACC_META_NAME} meta""")
+    parser.add_argument('-S', '--print_stats', action='store_true', dest='print_stats', 
+                        help='Print the counters and the timings of the net worth summation at the end of the run')
     
     
     args = parser.parse_args()
@@ -1574,7 +1593,8 @@ def main():
                                                                         self_testing_mode = args.self_testing_mode,
                                                                         tolerance=args.tolerance,
                                                                         group_p_l_acc_tr=args.group_p_l_acc_tr,
-                                                                        shell_mode=True)
+                                                                        shell_mode=True,
+                                                                        print_stats=args.print_stats)
     if args.output == "_bq_":
         # Opening a temporary file to write the converted ledger
         with tempfile.NamedTemporaryFile("w", delete=True, encoding="utf-8", delete_on_close=False) as f:
@@ -18,7 +18,7 @@ from beancount.core.inventory import Inventory
 
 from beanquery import query
 
-from evbeantools.summator import InventoryAggregator
+from evbeantools.summator import InventoryAggregator, Tolerance
 
 
 logger = logging.getLogger()
@@ -312,7 +312,8 @@ def check_vs_beanquery(get_equiv_sing_curr_entries_func):
         unreal_gains_p_l_acc = kwargs.get("unreal_gains_p_l_acc", UNREAL_GAINES_P_AND_L_ACC)
         account_for_price_diff = kwargs.get("account_for_price_diff", ACC_FOR_PRICE_DIFF)
         self_testng_mode = kwargs.get("self_testing_mode", False)
-        tolerance = D(kwargs.get("tolerance", TOLERANCE_DEF))
+        # The tolerance is prepared once for all checks below
+        tolerance = Tolerance(D(kwargs.get("tolerance", TOLERANCE_DEF)))
         
         logger.debug(f"tolerance_wrapper: {tolerance}") 
             
@@ -425,7 +426,7 @@ def check_vs_beanquery(get_equiv_sing_curr_entries_func):
         
         diff_in_net_worth_diff_inv: Inventory = -p_and_l_calc_via_beanq_eqv_ent_inv + net_worth_change_diff_inv
                 
-        if not diff_in_net_worth_diff_inv.is_small(tolerance):
+        if not tolerance.is_small(diff_in_net_worth_diff_inv):
             raise RuntimeError(f"Net worth change calculated via P&L query on the converted entries is different from the difference in net worth, calculated on the original entries. \n \
             Calculated on converted entries: {pformat(p_and_l_calc_via_beanq_eqv_ent_inv)} \n \
             The difference in net worth is {pformat(net_worth_change_diff_inv)} \n \
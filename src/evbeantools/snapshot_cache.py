@@ -0,0 +1,118 @@
+"""
+Implementation of the SnapshotCache class, an on-disk cache of balance snapshots, which is used by the BeanSummator
+to resume the summation from the latest snapshot of a previous run (see the snapshot_cache parameter of the BeanSummator)
+"""
+from __future__ import annotations
+import datetime
+import logging
+import os
+import pickle
+import tempfile
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotCache():
+    """
+    Directory of pickled objects (snapshots), stored under string keys (e.g. content hashes).
+
+    The snapshots, which have not been used (saved or loaded) for longer than max_age, are evicted. If the total size
+    of the snapshots exceeds max_size, the least recently used ones are evicted. Eviction is done after each save.
+
+    Note: the snapshots are unpickled, so the cache directory must be trusted as much as the code itself.
+    """
+    SUFFIX = '.pickle'
+
+    def __init__(self, cache_dir: str | Path, max_size: int | None = None, max_age: datetime.timedelta | None = None):
+        """
+        Parameters:
+            cache_dir (str | Path): Directory, where the snapshots are stored. It is created if it does not exist.
+            max_size (int | None): Maximum total size of the snapshots in bytes. None means no limit.
+            max_age (datetime.timedelta | None): Maximum time since the last use of a snapshot. None means no limit.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_size = max_size
+        self.max_age = max_age
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _get_path(self, key: str) -> Path:
+        return self.cache_dir / f'{key}{self.SUFFIX}'
+
+    def __contains__(self, key: str) -> bool:
+        return self._get_path(key).exists()
+
+    def load(self, key: str):
+        """
+        Returns the snapshot, stored under the key, or None if there is no such snapshot or it cannot be read
+        """
+        path = self._get_path(key)
+
+        try:
+            with open(path, 'rb') as file:
+                snapshot = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError) as error:
+            logger.warning(f'Snapshot {path} cannot be read and is ignored: {error}')
+            return None
+
+        # Marking the snapshot as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return snapshot
+
+    def save(self, key: str, snapshot):
+        """
+        Stores the snapshot under the key and evicts the snapshots, which exceed the limits
+        """
+        # The snapshot is written to a temporary file first, so that a concurrent reader never sees a partial file
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'wb') as file:
+                pickle.dump(snapshot, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self._get_path(key))
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+
+        logger.debug(f'Snapshot {key} is saved')
+
+        self.evict()
+
+    def evict(self):
+        """
+        Removes the snapshots, which exceed the max_age and the max_size limits
+        """
+        if self.max_size is None and self.max_age is None:
+            return
+
+        # (last use time, size, path) of the snapshots, the most recently used first
+        snapshots = []
+        for path in self.cache_dir.glob(f'*{self.SUFFIX}'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            snapshots.append((stat.st_mtime, stat.st_size, path))
+
+        snapshots.sort(reverse=True)
+
+        now = time.time()
+        total_size = 0
+
+        for last_use_time, size, path in snapshots:
+            total_size += size
+
+            too_old = self.max_age is not None and now - last_use_time > self.max_age.total_seconds()
+            too_big = self.max_size is not None and total_size > self.max_size
+
+            if too_old or too_big:
+                logger.debug(f'Evicting snapshot {path}')
+                path.unlink(missing_ok=True)
+                total_size -= size
@@ -4,25 +4,50 @@ Implementation of the InventoryAggregator and BeanSummator classes
 from __future__ import annotations
 import datetime
 import re
-from collections import defaultdict
+import bisect
+import hashlib
+import itertools
+import json
+import math
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+import time
+from collections import defaultdict, deque
 from pprint import pprint
 import copy
 import logging
+from decimal import Decimal
 from pprint import pformat
+from concurrent.futures import ProcessPoolExecutor
+from collections.abc import Iterable, Iterator, Sequence
+from typing import TYPE_CHECKING
 
 
+# numpy is only needed by InventoryAggregator.to_bytes and from_bytes, it is imported there
+if TYPE_CHECKING:
+    import numpy as np
+
 from beancount.core.data import Transaction, Currency
-from beancount.core.number import D
-from beancount.core.position import Cost
+from beancount.core.number import D, ZERO
+from beancount.core.amount import Amount
+from beancount.core.position import Cost, Position
 from beancount.core.prices import PriceMap
 from beancount.core import inventory
 from beancount.loader import load_file
 # importing beancount printer
 from beancount.parser import printer
-from beancount.core.account import root, Account
-from beancount.core.convert import convert_amount, convert_position
+from beancount.core.account import root, Account, parents
+from beancount.core.convert import convert_amount, get_cost
+
+from beancount.core.prices import build_price_map, PriceMap, get_price
 
-from beancount.core.prices import build_price_map, PriceMap
+from evbeantools.scaled_int import from_scaled_int, INT64_MAX
+from evbeantools.snapshot_cache import SnapshotCache
+from evbeantools.posting_filter import PostingFilter
+from evbeantools.summator_stats import SummatorStats
 
 
 # from pydantic import ValidationError, validate_call
@@ -33,6 +58,198 @@ from beancount.core.prices import build_price_map, PriceMap
 
 logger = logging.getLogger(__name__)
 
+# Exponent, which encodes None (e.g. a missing number of a cost) in InventoryAggregator.to_bytes
+_NONE_EXPONENT = -2**15
+
+class ConversionRateCache():
+    """
+    Memoizes conversion rates, looked up in a price map, so that each distinct (currency, target currency, date) 
+    conversion is looked up only once. 
+    
+    The rates are derived the same way as in the beancount convert_position function: directly or, if there is no 
+    direct rate, via the cost currency of the position. 
+    
+    A single instance can be shared between several calls of InventoryAggregator.convert, which use the same price map.
+    """
+    def __init__(self, price_map: PriceMap):
+        self.price_map = price_map
+        
+        # Maps (currency, target currency, date, via currency) to the tuple of rates, which need to be applied one 
+        # after another, or to None, if the conversion is not possible
+        self._rates: dict[tuple[Currency, Currency, datetime.date | None, Currency | None], tuple[Decimal, ...] | None] = {}
+        
+    def get_rates(self, currency: Currency, target_currency: Currency, date: datetime.date | None, 
+                  via_currency: Currency | None = None) -> tuple[Decimal, ...] | None:
+        """
+        Returns the rates, by which the number of units in the currency shall be multiplied (one after another) to 
+        convert it to the target currency or None, if the conversion is not possible.
+        
+        Args:
+            via_currency: The currency (e.g. the cost currency of a position), via which the conversion is attempted 
+                          if there is no direct rate 
+        """
+        key = (currency, target_currency, date, via_currency)
+        
+        if key not in self._rates:
+            self._rates[key] = self._look_up_rates(currency, target_currency, date, via_currency)
+            
+        return self._rates[key]
+    
+    def _look_up_rates(self, currency: Currency, target_currency: Currency, date: datetime.date | None, 
+                       via_currency: Currency | None) -> tuple[Decimal, ...] | None:
+        """
+        Follows the logic of the beancount convert_amount function
+        """
+        _, rate = get_price(self.price_map, (currency, target_currency), date)
+        if rate is not None:
+            return (rate,)
+        
+        if via_currency is None or via_currency == target_currency:
+            return None
+        
+        _, rate1 = get_price(self.price_map, (currency, via_currency), date)
+        if rate1 is None:
+            return None
+        
+        _, rate2 = get_price(self.price_map, (via_currency, target_currency), date)
+        if rate2 is None:
+            return None
+        
+        return (rate1, rate2)
+    
+    def convert_amount(self, units: Amount, target_currency: Currency, date: datetime.date | None, 
+                       via_currency: Currency | None = None) -> Amount:
+        """
+        Returns the units converted to the target currency, or the units unmodified, if the conversion is not possible.
+        The result is identical to the one of the beancount convert_amount function.
+        """
+        rates = self.get_rates(units.currency, target_currency, date, via_currency)
+        
+        if rates is None:
+            return units
+        
+        number = units.number
+        for rate in rates:
+            number = number * rate
+            
+        return Amount(number, target_currency)
+    
+
+class Tolerance():
+    """
+    Tolerance, under which the units of a position are considered small (the same way as in Inventory.is_small), 
+    prepared once for repeated checks of many Inventories (see InventoryAggregator.is_small and clean_small). 
+    
+    The bounds are calculated once (per currency for a dict of tolerances), so that each position is checked by a 
+    pair of comparisons without creating its absolute value and without looking up the type of the tolerance again.
+    """
+    def __init__(self, tolerance: Decimal | dict[Currency, Decimal]):
+        """
+        Args:
+          tolerance: A Decimal, the small number of units under which a position is considered small, or a dict of 
+            currency to such epsilon precision. The currencies, which are not in the dict, have a zero tolerance.
+        """
+        self.tolerance = tolerance
+        
+        # (lower bound, upper bound) of the units for all currencies or None, if the tolerance is per currency
+        self._bounds: tuple[Decimal, Decimal] | None = None
+        self._currency_bounds: dict[Currency, tuple[Decimal, Decimal]] = {}
+        
+        if isinstance(tolerance, dict):
+            self._currency_bounds = {currency: (-currency_tolerance, currency_tolerance) 
+                                     for currency, currency_tolerance in tolerance.items()}
+        else:
+            self._bounds = (-tolerance, tolerance)
+            
+    @classmethod
+    def prepare(cls, tolerance: Tolerance | Decimal | dict[Currency, Decimal]) -> Tolerance:
+        """
+        Returns the tolerance, if it is already prepared, or a new Tolerance object otherwise
+        """
+        return tolerance if isinstance(tolerance, Tolerance) else cls(tolerance)
+    
+    def is_small(self, inv: inventory.Inventory) -> bool:
+        """
+        Returns True if all positions of the Inventory are small, same as inv.is_small(self.tolerance)
+        """
+        return self.are_small((inv,))
+    
+    def are_small(self, inventories: Iterable[inventory.Inventory]) -> bool:
+        """
+        Returns True if all positions of all Inventories are small. The positions of all Inventories are checked in 
+        a single loop, which stops at the first position, which is not small
+        """
+        if self._bounds is not None:
+            lower_bound, upper_bound = self._bounds
+            for inv in inventories:
+                for pos in inv.values():
+                    number = pos.units.number
+                    if number > upper_bound or number < lower_bound:
+                        return False
+        else:
+            currency_bounds = self._currency_bounds
+            zero_bounds = (ZERO, ZERO)
+            for inv in inventories:
+                for pos in inv.values():
+                    number, currency = pos.units
+                    lower_bound, upper_bound = currency_bounds.get(currency, zero_bounds)
+                    if number > upper_bound or number < lower_bound:
+                        return False
+                    
+        return True
+    
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self.tolerance!r})'
+
+
+def _encode_numbers(numbers: list[Decimal | None]) -> tuple[list[int], list[int], list[str | None] | None]:
+    """
+    Splits the numbers into the coefficients (scaled integers) and the exponents, such that number = coefficient * 
+    10**-exponent (see InventoryAggregator.to_bytes). None is encoded as the exponent _NONE_EXPONENT. If a coefficient 
+    does not fit into int64, all coefficients are returned as strings in the 3rd element instead (and as zeros in the 1st)
+    """
+    coefficients = []
+    exponents = []
+    
+    for number in numbers:
+        if number is None:
+            coefficients.append(0)
+            exponents.append(_NONE_EXPONENT)
+            continue
+        
+        sign, digits, exponent = number.as_tuple()
+        if not isinstance(exponent, int):
+            raise ValueError(f'Number {number} cannot be serialized')
+        
+        # The exponents are stored as int16, whose minimum encodes None
+        if not _NONE_EXPONENT < -exponent < 2**15:
+            raise ValueError(f'Number {number} cannot be serialized, its exponent does not fit into int16')
+        
+        coefficient = int(''.join(map(str, digits)) or '0')
+        coefficients.append(-coefficient if sign else coefficient)
+        exponents.append(-exponent)
+        
+    if any(abs(coefficient) > INT64_MAX for coefficient in coefficients):
+        return [0] * len(coefficients), exponents, [str(coefficient) for coefficient in coefficients]
+    
+    return coefficients, exponents, None
+
+
+def _decode_numbers(coefficients: np.ndarray, exponents: np.ndarray, big_coefficients: list[str] | None) -> list[Decimal | None]:
+    """
+    Reverts _encode_numbers
+    """
+    exponents = exponents.tolist()
+    
+    if big_coefficients is not None:
+        return [None if exponent == _NONE_EXPONENT else from_scaled_int(int(coefficient), exponent) 
+                for coefficient, exponent in zip(big_coefficients, exponents)]
+    
+    # Coefficients of int64 have fewer digits than the precision of the decimal context, so scaleb is exact
+    return [None if exponent == _NONE_EXPONENT else Decimal(coefficient).scaleb(-exponent) 
+            for coefficient, exponent in zip(coefficients.tolist(), exponents)]
+
+
 class InventoryAggregator(defaultdict):
     """
     Class which inherits from defaultdict and is used to hold account to inventory pairs
@@ -40,6 +257,10 @@ class InventoryAggregator(defaultdict):
     
     This is somehow similar to beancount Inventory class, but works with account to inventory pairs
     """
+    # See to_bytes
+    _BYTES_MAGIC = b'EVIA'
+    _BYTES_VERSION = 1
+    
     def __init__(self, initiation_dict: None | dict[Account, str] = None):
         """
         Args:
@@ -49,6 +270,19 @@ class InventoryAggregator(defaultdict):
         """
         super().__init__(inventory.Inventory)
         
+        # Accounts, which Inventory objects are owned by this object, i.e. are not shared with any snapshot and hence 
+        # can be modified in place by the add_amount method. See the snapshot method
+        self._owned_accounts: set[Account] = set()
+        
+        # Reverse index, which maps a currency to the accounts, which hold positions in this currency. It is built on 
+        # the first use (see _get_currency_index) and then kept up to date by add_amount, __setitem__ and __delitem__.
+        # So a running sum (e.g. of the BeanSummator), which is not queried itself, does not pay for the index, its 
+        # snapshots build their own index, when they are queried.
+        # Like the Inventories, the sets of accounts are shared with snapshots and are copied before they are modified.
+        # _owned_index_currencies contains the currencies, which sets of accounts are owned by this object
+        self._currency_index: dict[Currency, set[Account]] | None = None
+        self._owned_index_currencies: set[Currency] = set()
+        
         if initiation_dict:
             self._from_dict(initiation_dict)
         
@@ -80,15 +314,211 @@ class InventoryAggregator(defaultdict):
             
         return result
     
+    def __iadd__(self, other: InventoryAggregator) -> InventoryAggregator:
+        """
+        Adds other to self in place. Unlike __add__ of the Inventory, no intermediate Inventory objects are created 
+        """
+        for acc, inv in other.items():
+            for pos in inv:
+                self.add_amount(acc, pos.units, pos.cost)
+                
+        return self
+    
+    def __isub__(self, other: InventoryAggregator) -> InventoryAggregator:
+        """
+        Subtracts other from self in place. Unlike __sub__, neither other nor its Inventories are negated into new 
+        objects
+        """
+        for acc, inv in other.items():
+            for pos in inv:
+                self.add_amount(acc, -pos.units, pos.cost)
+                
+        return self
+    
+    def diff_clean(self, other: InventoryAggregator) -> InventoryAggregator:
+        """
+        Returns the same result as (self - other).clean_empty().get_sorted(), but without creating the intermediate 
+        InventoryAggregator objects and without adding missing accounts to self and other (which __sub__ does as 
+        a side effect of the defaultdict)
+        """
+        result = InventoryAggregator()
+        
+        for acc in sorted(self.keys() | other.keys()):
+            # Positions are added in the same order as in __sub__, so that the result is identical
+            diff_inv = inventory.Inventory()
+            
+            for pos in other.get(acc, ()):
+                diff_inv.add_amount(-pos.units, pos.cost)
+            
+            for pos in self.get(acc, ()):
+                diff_inv.add_amount(pos.units, pos.cost)
+                
+            if diff_inv.is_empty():
+                continue
+            
+            result[acc] = diff_inv
+            result._owned_accounts.add(acc)
+            
+        return result
+    
     def __copy__(self) -> InventoryAggregator:
         
-        result = InventoryAggregator()
+        result = self.__class__()
         
         for key, value in self.items():
             result[key] = copy.copy(value)
+        
+        result._owned_accounts = set(result.keys())
             
         return result
     
+    def __reduce__(self):
+        # The defaultdict implementation would pass the default factory to __init__, which expects an initiation_dict
+        return (self.__class__, (), None, None, iter(self.items()))
+    
+    def snapshot(self) -> InventoryAggregator:
+        """
+        Returns a copy-on-write copy of itself. 
+        
+        Unlike copy.copy, the Inventory objects are not copied, but are shared between the original and the snapshot,
+        so creating a snapshot does not depend on the size of the Inventories. After the snapshot is taken, the 
+        add_amount method copies the Inventory of an account before it is modified for the first time. Hence the cost of 
+        taking a snapshot is paid only for the accounts, which are changed afterwards.
+        
+        Note: the shared Inventories must not be modified directly (e.g. snapshot[account].add_amount(...)), as this 
+        would change the original as well. Use the add_amount method of the InventoryAggregator instead or copy.copy 
+        the snapshot. 
+        """
+        result = self.__class__()
+        dict.update(result, self)
+        
+        # All Inventories are shared with the snapshot from now on. The currency index is shared only if it has been 
+        # built already, otherwise the snapshot builds it on its first query (see _get_currency_index)
+        self._owned_accounts = set()
+        
+        if self._currency_index is not None:
+            result._currency_index = dict(self._currency_index)
+            self._owned_index_currencies = set()
+        
+        return result
+    
+    def add_amount(self, account: Account, units: Amount, cost: Cost | None = None):
+        """
+        Adds the units (with optional cost) to the Inventory of the account, the same way as Inventory.add_amount does.
+        If the Inventory is shared with a snapshot (see the snapshot method), it is copied before it is modified
+        """
+        if account not in self._owned_accounts:
+            original_inventory = self.get(account)
+            # The copy holds the same currencies, so the currency index does not need to be updated
+            dict.__setitem__(self, account, inventory.Inventory() if original_inventory is None else copy.copy(original_inventory))
+            self._owned_accounts.add(account)
+        
+        account_inventory = self[account]
+        account_inventory.add_amount(units, cost)
+        
+        if self._currency_index is not None:
+            # The index needs to be updated only if the position has disappeared or the account is a new holder 
+            if (units.currency, cost) not in account_inventory or account not in self._currency_index.get(units.currency, ()):
+                self._update_currency_index(account, units.currency)
+    
+    def __setitem__(self, account: Account, account_inventory: inventory.Inventory):
+        # The assigned Inventory may be shared with the caller (e.g. taken from a snapshot), so it is not owned
+        self._owned_accounts.discard(account)
+        
+        if self._currency_index is None:
+            super().__setitem__(account, account_inventory)
+            return
+        
+        original_inventory = self.get(account)
+        original_currencies = set() if original_inventory is None else original_inventory.currencies()
+        
+        super().__setitem__(account, account_inventory)
+        
+        for currency in original_currencies | account_inventory.currencies():
+            self._update_currency_index(account, currency)
+            
+    def __delitem__(self, account: Account):
+        original_inventory = self[account]
+        
+        super().__delitem__(account)
+        self._owned_accounts.discard(account)
+        
+        if self._currency_index is not None:
+            for currency in original_inventory.currencies():
+                self._update_currency_index(account, currency)
+    
+    # The below dict methods modify the object without calling __setitem__ or __delitem__, therefore they drop the 
+    # currency index, which will be rebuilt on the next use, and remove the changed accounts from the owned ones
+    def pop(self, account: Account, *args):
+        self._drop_currency_index()
+        self._owned_accounts.discard(account)
+        return super().pop(account, *args)
+    
+    def popitem(self):
+        self._drop_currency_index()
+        account, account_inventory = super().popitem()
+        self._owned_accounts.discard(account)
+        return account, account_inventory
+    
+    def clear(self):
+        self._drop_currency_index()
+        self._owned_accounts = set()
+        return super().clear()
+    
+    def update(self, *args, **kwargs):
+        self._drop_currency_index()
+        new_items = dict(*args, **kwargs)
+        self._owned_accounts.difference_update(new_items)
+        return super().update(new_items)
+    
+    def setdefault(self, *args):
+        self._drop_currency_index()
+        return super().setdefault(*args)
+            
+    def _get_currency_index(self) -> dict[Currency, set[Account]]:
+        """
+        Returns the currency index (see __init__), builds it if it is not yet built
+        
+        Note: the currency index is kept up to date only if the Inventories are modified via methods of the 
+        InventoryAggregator (e.g. add_amount) and not directly
+        """
+        if self._currency_index is None:
+            currency_index = defaultdict(set)
+            for account, account_inventory in self.items():
+                for currency, _ in account_inventory.keys():
+                    currency_index[currency].add(account)
+            
+            self._currency_index = dict(currency_index)
+            self._owned_index_currencies = set(self._currency_index)
+            
+        return self._currency_index
+    
+    def _update_currency_index(self, account: Account, currency: Currency):
+        """
+        Updates the currency index for the account and the currency after the Inventory of the account has been changed
+        """
+        account_inventory = dict.get(self, account)
+        holds_currency = account_inventory is not None and any(position_currency == currency 
+                                                               for position_currency, _ in account_inventory.keys())
+        
+        accounts = self._currency_index.get(currency)
+        if holds_currency == (accounts is not None and account in accounts):
+            return
+        
+        if currency not in self._owned_index_currencies:
+            accounts = set() if accounts is None else set(accounts)
+            self._currency_index[currency] = accounts
+            self._owned_index_currencies.add(currency)
+            
+        if holds_currency:
+            accounts.add(account)
+        else:
+            accounts.discard(account)
+            
+    def _drop_currency_index(self):
+        self._currency_index = None
+        self._owned_index_currencies = set()
+    
     def clean_empty(self) -> InventoryAggregator:
         """
         Removes all Account to Inventory pairs which have empty Inventory and 
@@ -113,10 +543,18 @@ class InventoryAggregator(defaultdict):
         return True
     
     # @validate_call
-    def convert(self, target_currency: Currency, price_map: PriceMap, date: datetime.date | None = None) -> InventoryAggregator:
+    def convert(self, target_currency: Currency, price_map: PriceMap, date: datetime.date | None = None, 
+                rate_cache: ConversionRateCache | None = None) -> InventoryAggregator:
         """
         Converts all Inventories in the Account to Inventory pairs to the target_currency
         
+        Conversion rates are looked up once per currency (see ConversionRateCache) and all positions in this currency
+        are multiplied by the same rate.
+        
+        Args:
+            rate_cache: A ConversionRateCache for the price_map, which can be shared between several calls. 
+                        If not provided, a new one is used for this call only
+        
         returns:
                 a new InventoryAggregator object with the result 
         """
@@ -124,9 +562,15 @@ class InventoryAggregator(defaultdict):
         assert isinstance(price_map, PriceMap)
         assert isinstance(date, datetime.date) or date is None
         
+        if rate_cache is None:
+            rate_cache = ConversionRateCache(price_map)
+        
+        assert rate_cache.price_map is price_map, 'rate_cache must be created for the same price_map'
+        
         result = InventoryAggregator()
         
-        logger.debug(f'self.items = \n{pformat(self.items())}')
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'self.items = \n{pformat(self.items())}')
         
         
         for acc, inv in self.items():
@@ -141,10 +585,13 @@ class InventoryAggregator(defaultdict):
                 # So in a fact this acts more like a flag, that the position was tracked at cost, but the cost information was removed
                 # Having the cost information identical for all such positions, will allow us to add and extract them from each other
                 dummy_cost = None
+                via_currency = None
                 if pos.cost is not None:
                     dummy_cost = Cost(D("1"), "REMOVEDCOST", None, None)
+                    # Same as in convert_position, the conversion via the cost currency is attempted
+                    via_currency = pos.cost.currency
                 
-                result[acc].add_amount(convert_position(pos, target_currency, price_map, date), dummy_cost)
+                result.add_amount(acc, rate_cache.convert_amount(pos.units, target_currency, date, via_currency), dummy_cost)
             
         return result
 
@@ -153,31 +600,27 @@ class InventoryAggregator(defaultdict):
         """
         Returns a set of all currencies in the InventoryAggregator object
         """
-        result = set()
-        
-        for inv in self.values():
-            result |= inv.currencies()
-        
-        return result
+        return {currency for currency, accounts in self._get_currency_index().items() if accounts}
     
     def get_currency_positions(self, currency: Currency) -> InventoryAggregator:
         """
         Returns a new InventoryAggregator object with the same account to inventory pairs as the original object,
         but with only the currency specified in the currency parameter
         Removes Account to Inventory pairs which do not have the specified currency
+        
+        Only the accounts, which hold the currency, are looked at (see the currency index in __init__). The accounts 
+        in the result are sorted.
         """
         result = InventoryAggregator()
         
-        for acc, inv in self.items():
+        for acc in sorted(self._get_currency_index().get(currency, ())):
             one_acc_result_inv = inventory.Inventory()
-            for pos in inv:
+            for pos in self[acc]:
                 if pos.units.currency == currency:
                     one_acc_result_inv.add_amount(pos.units, pos.cost)
             # one_acc_result_inv.add_amount(inv.get_currency_units(currency))
             result[acc] = one_acc_result_inv
         
-        result = result.clean_empty()
-        
         return result
     
     def get_sorted(self):
@@ -195,6 +638,166 @@ class InventoryAggregator(defaultdict):
             
         return result
 
+    def to_bytes(self) -> bytes:
+        """
+        Serializes the object into a compact binary form, which can be loaded with from_bytes faster than a pickle.
+        
+        The form consists of a JSON header with the tables of the accounts and currencies, followed by numpy arrays 
+        with a row per position (the number as a scaled integer and its exponent, the ids of the account, the currency 
+        and the cost) and a row per distinct cost. The numbers are restored exactly, incl. the number of digits after 
+        the decimal point.
+        
+        Raises:
+            ValueError: If a key is not an account name, a number is not finite or the exponent of a number does not 
+                        fit into int16 (e.g. 1E+40000)
+        """
+        import numpy as np
+        
+        accounts = list(self.keys())
+        if not all(isinstance(account, str) for account in accounts):
+            raise ValueError('Only an InventoryAggregator with account names as keys can be serialized')
+        
+        currency_ids: dict[Currency, int] = {}
+        cost_ids: dict[Cost, int] = {}
+        
+        position_account_ids = []
+        position_currency_ids = []
+        position_cost_ids = []
+        position_numbers = []
+        
+        for account_id, account_inventory in enumerate(self.values()):
+            for pos in account_inventory:
+                position_account_ids.append(account_id)
+                position_currency_ids.append(currency_ids.setdefault(pos.units.currency, len(currency_ids)))
+                position_cost_ids.append(-1 if pos.cost is None else cost_ids.setdefault(pos.cost, len(cost_ids)))
+                position_numbers.append(pos.units.number)
+                
+        costs = list(cost_ids)
+        cost_currency_ids = [currency_ids.setdefault(cost.currency, len(currency_ids)) for cost in costs]
+        
+        position_coefficients, position_exponents, position_big_coefficients = _encode_numbers(position_numbers)
+        cost_coefficients, cost_exponents, cost_big_coefficients = _encode_numbers([cost.number for cost in costs])
+        
+        header = {'accounts': accounts,
+                  'currencies': list(currency_ids),
+                  'num_positions': len(position_numbers),
+                  'num_costs': len(costs),
+                  'big_coefficients': [position_big_coefficients, cost_big_coefficients],
+                  # Labels are rare, so only the ones, which are not None, are stored
+                  'cost_labels': {cost_id: cost.label for cost_id, cost in enumerate(costs) if cost.label is not None}}
+        
+        header_bytes = json.dumps(header).encode('utf-8')
+        # The header is padded with spaces, so that the arrays are aligned (this allows zero-copy loading)
+        header_bytes += b' ' * (-len(header_bytes) % 8)
+        
+        arrays = [np.array(position_coefficients, dtype='<i8'), 
+                  np.array(cost_coefficients, dtype='<i8'),
+                  np.array(position_account_ids, dtype='<i4'),
+                  np.array(position_currency_ids, dtype='<i4'),
+                  np.array(position_cost_ids, dtype='<i4'),
+                  np.array(cost_currency_ids, dtype='<i4'),
+                  np.array([0 if cost.date is None else cost.date.toordinal() for cost in costs], dtype='<i4'),
+                  np.array(position_exponents, dtype='<i2'),
+                  np.array(cost_exponents, dtype='<i2')]
+        
+        return b''.join([self._BYTES_MAGIC, struct.pack('<IQ', self._BYTES_VERSION, len(header_bytes)), header_bytes] + 
+                        [array.tobytes() for array in arrays])
+    
+    @classmethod
+    def from_bytes(cls, data: bytes | memoryview | mmap.mmap, accounts: Iterable[Account] | None = None) -> InventoryAggregator:
+        """
+        Loads an object, serialized by to_bytes. The data can be any buffer, e.g. a memory-mapped file, the arrays are 
+        read from it without copying.
+        
+        Parameters:
+            data: The serialized object
+            accounts (Iterable[Account] | None): If provided, only these accounts are loaded (the ones, which are not 
+                                                 in the data, are ignored), so a part of a large snapshot is loaded 
+                                                 in the time proportional to the size of this part.
+        
+        Raises:
+            ValueError: If the data is not created by to_bytes
+        """
+        import numpy as np
+        
+        buffer = memoryview(data)
+        
+        if bytes(buffer[:len(cls._BYTES_MAGIC)]) != cls._BYTES_MAGIC:
+            raise ValueError('The data is not a serialized InventoryAggregator')
+        
+        version, header_length = struct.unpack_from('<IQ', buffer, len(cls._BYTES_MAGIC))
+        if version != cls._BYTES_VERSION:
+            raise ValueError(f'Version {version} of the serialized InventoryAggregator is not supported')
+        
+        offset = len(cls._BYTES_MAGIC) + struct.calcsize('<IQ')
+        header = json.loads(bytes(buffer[offset:offset + header_length]))
+        offset += header_length
+        
+        num_positions = header['num_positions']
+        num_costs = header['num_costs']
+        
+        arrays = []
+        for dtype, count in [('<i8', num_positions), ('<i8', num_costs), ('<i4', num_positions), ('<i4', num_positions), 
+                             ('<i4', num_positions), ('<i4', num_costs), ('<i4', num_costs), ('<i2', num_positions), 
+                             ('<i2', num_costs)]:
+            arrays.append(np.frombuffer(buffer, dtype=dtype, count=count, offset=offset))
+            offset += np.dtype(dtype).itemsize * count
+            
+        (position_coefficients, cost_coefficients, position_account_ids, position_currency_ids, position_cost_ids, 
+         cost_currency_ids, cost_dates, position_exponents, cost_exponents) = arrays
+        position_big_coefficients, cost_big_coefficients = header['big_coefficients']
+        
+        account_names = header['accounts']
+        currencies = header['currencies']
+        
+        # The ids of the accounts to load, in the order of the serialized object
+        account_ids = range(len(account_names))
+        if accounts is not None:
+            accounts = set(accounts)
+            account_ids = [account_id for account_id, account in enumerate(account_names) if account in accounts]
+            
+            selected = np.isin(position_account_ids, account_ids)
+            if position_big_coefficients is not None:
+                position_big_coefficients = [coefficient for coefficient, is_selected 
+                                             in zip(position_big_coefficients, selected) if is_selected]
+            position_coefficients, position_account_ids, position_currency_ids, position_cost_ids, position_exponents = (
+                array[selected] for array in (position_coefficients, position_account_ids, position_currency_ids, 
+                                              position_cost_ids, position_exponents))
+        
+        # Only the costs of the loaded positions are decoded
+        cost_ids = np.unique(position_cost_ids[position_cost_ids >= 0]) if accounts is not None else np.arange(num_costs)
+        if cost_big_coefficients is not None:
+            cost_big_coefficients = [cost_big_coefficients[cost_id] for cost_id in cost_ids.tolist()]
+        
+        cost_labels = {int(cost_id): label for cost_id, label in header['cost_labels'].items()}
+        costs = {cost_id: Cost(number, currencies[currency_id], None if date == 0 else datetime.date.fromordinal(date), 
+                               cost_labels.get(cost_id))
+                 for cost_id, number, currency_id, date in zip(
+                     cost_ids.tolist(),
+                     _decode_numbers(cost_coefficients[cost_ids], cost_exponents[cost_ids], cost_big_coefficients), 
+                     cost_currency_ids[cost_ids].tolist(), cost_dates[cost_ids].tolist())}
+        
+        inventories = {account_id: inventory.Inventory() for account_id in account_ids}
+        
+        for number, account_id, currency_id, cost_id in zip(
+                _decode_numbers(position_coefficients, position_exponents, position_big_coefficients), 
+                position_account_ids.tolist(), position_currency_ids.tolist(), position_cost_ids.tolist()):
+            currency = currencies[currency_id]
+            cost = None if cost_id < 0 else costs[cost_id]
+            # The positions come from Inventories, so they have different (currency, cost) keys and do not need to be 
+            # merged by Inventory.add_amount
+            dict.__setitem__(inventories[account_id], (currency, cost), Position(Amount(number, currency), cost))
+            
+        result = cls()
+        
+        for account_id, account_inventory in inventories.items():
+            result[account_names[account_id]] = account_inventory
+        
+        # The Inventories are new, so they can be modified in place
+        result._owned_accounts = set(result.keys())
+        
+        return result
+    
     def _from_dict(self, input: dict):
         
         """
@@ -209,128 +812,935 @@ class InventoryAggregator(defaultdict):
             assert not account in self, f'Something went wrong. The Account {account} is already in the InventoryAggregator object'
             
             self[account] = inventory.from_string(inventory_str)
+            self._owned_accounts.add(account)
 
-    def is_small(self, tolerance) -> bool:
+    def is_small(self, tolerance: Tolerance | Decimal | dict[Currency, Decimal]) -> bool:
         """ Returns True if all Inventories in the Account to Inventory pairs as defined, by Inventory.is_small method
         
         Args:
           tolerances: A Decimal, the small number of units under which a position
-            is considered small, or a dict of currency to such epsilon precision.
+            is considered small, or a dict of currency to such epsilon precision. For repeated checks pass a 
+            Tolerance object, so that the tolerance is prepared only once.
         
         Returns:
           A boolean.
         """
-        for inv in self.values():
-            if not inv.is_small(tolerance):
-                return False
-        return True
+        return Tolerance.prepare(tolerance).are_small(self.values())
     
-    def clean_small(self, tolerance) -> InventoryAggregator:
+    def clean_small(self, tolerance: Tolerance | Decimal | dict[Currency, Decimal]) -> InventoryAggregator:
         """ Removes all Account to Inventory pairs which have small Inventories
         
         Args:
           tolerances: A Decimal, the small number of units under which a position
-            is considered small, or a dict of currency to such epsilon precision.
+            is considered small, or a dict of currency to such epsilon precision. For repeated checks pass a 
+            Tolerance object, so that the tolerance is prepared only once.
         
         Returns:
           A new InventoryAggregator object with the result
         """
+        is_small = Tolerance.prepare(tolerance).is_small
         
         result = InventoryAggregator()
         
         for acc, inv in self.items():
-            if not inv.is_small(tolerance):
+            if not is_small(inv):
                 result[acc] = inv
         
         return result   
     
 
-class BeanSummator():
+class CompactInventoryAggregator():
     """
-       Simulates a beanquery SUM command for aggregating transaction amounts by account up to a specified 
-       date as used in the below beanquetry query: 
-
-        SELECT root(n, account) as shortened_acc, sum(position)
-        WHERE date <= {date} AND account ~ "accounts_re"
-        GROUP BY shortened_acc
-        
-        This class enhances efficiency by remembering the last sum calculated and the date for which it was calculated.
-        It ensures that subsequent sums are requested for the same or later dates, allowing reuse of previous calculations.
-        This approach speeds up the calculation process, especially beneficial when determining net worth across multiple dates.
+    Compact alternative to the InventoryAggregator, which can be used by the BeanSummator to hold the running sum 
+    (see the aggregator_class parameter of the BeanSummator). 
+    
+    Instead of an Inventory of Decimal positions per account, each (account, currency, cost) balance is stored as 
+    a single integer, scaled by 10**exponent, where the exponent is the same for all balances in the currency and is 
+    big enough to represent every added number exactly. Adding an amount is hence an integer addition, no Position, 
+    Amount or Inventory objects are created. 
+    
+    The balances are converted back to Inventories only at the API boundary (see the snapshot method). As this 
+    conversion is proportional to the number of balances, the class pays off, when many postings are summed per 
+    returned sum (e.g. sums at month ends of a long ledger). The results are
+    exact and equal to the ones of the InventoryAggregator, but the numbers have the number of digits after the decimal 
+    point of the currency (e.g. 5.00 USD instead of 5.0 USD, if another USD amount had 2 digits). Unlike the Decimal 
+    arithmetic, the integer one is not limited by the precision of the decimal context.
     """
-    def __init__(self, entries, options, accounts_re: str, num_acc_components_from_root: int = 100):
-        """
-        Initializes the BeanSummator with a set of entries, options, an account name pattern, and the number of account 
-        levels to include.
+    __slots__ = ('_balances', '_exponents', '_multipliers')
+    
+    def __init__(self):
+        # Maps (account, currency, cost) to the balance, scaled by 10**exponent of the currency
+        self._balances: dict[tuple[Account, Currency, Cost | None], int] = {}
         
-        Parameters:
-            entries (list): A list of beancount entries to process.
-            options (dict): Options from the beancount file for processing.
-            accounts_re (str): Regular expression pattern to filter accounts for summing.
-            num_acc_components_from_root (int): Number of account hierarchy levels to retain in the account name.
-                                                This is similar to the n in the root(n, account) function in the beanquery.
+        # Maps a currency to its exponent
+        self._exponents: dict[Currency, int] = {}
+        
+        # Maps (currency, denominator) to the multiplier, which converts a number, represented as a 
+        # numerator / denominator ratio (see Decimal.as_integer_ratio) to the scaled integer: numerator * multiplier
+        self._multipliers: dict[tuple[Currency, int], int] = {}
+        
+    def add_amount(self, account: Account, units: Amount, cost: Cost | None = None):
+        """
+        Adds the units (with optional cost) to the balance of the account, same as InventoryAggregator.add_amount
         """
+        numerator, denominator = units.number.as_integer_ratio()
+        currency = units.currency
         
-        logger.debug(f'Creating BeanSummator with accounts_re={accounts_re} and num_acc_components_from_root={num_acc_components_from_root}')
+        # This is a hot path, therefore the cache is looked up directly
+        try:
+            multiplier = self._multipliers[currency, denominator]
+        except KeyError:
+            multiplier = self._get_multiplier(currency, denominator)
         
-        self.entries = entries
-        self.options = options
-        # self.current_sum = AccountsWithSum(inventory.Inventory)
-        self.current_sum = InventoryAggregator()
-        self.last_processed_date = datetime.date(1, 1, 1)
-        self.entries_iter = iter(entries)
-        self.unprocessed_entry_from_last_run = None
-        self.accounts_re = accounts_re
-        self.num_acc_components_from_root = num_acc_components_from_root
+        key = (account, currency, cost)
+        self._balances[key] = self._balances.get(key, 0) + numerator * multiplier
         
-    def _get_copy_current_sum(self) -> InventoryAggregator:
-        """
-        Returns a copy of the current sum
+    def _get_multiplier(self, currency: Currency, denominator: int) -> int:
         """
-        return copy.copy(self.current_sum)
-    
-    def sum_till_date(self, date: datetime.date) -> InventoryAggregator:
+        Returns the multiplier for the (currency, denominator) pair (see __init__). If the exponent of the currency is 
+        not big enough to represent numbers with this denominator exactly, the balances in the currency are rescaled
         """
-        Sums the balances of transactions for accounts matching the accounts_re regular expression pattern up and 
-        including to the specified date.
+        # The denominator of a Decimal is 2**a * 5**b, hence it divides 10**max(a, b)
+        required_exponent = 0
+        while 10**required_exponent % denominator:
+            required_exponent += 1
         
-        Parameters:
-            date (datetime.date): The date up to and including which to sum transactions.
+        exponent = self._exponents.get(currency, 0)
+        if required_exponent > exponent:
+            self._rescale(currency, required_exponent)
+            exponent = required_exponent
+        else:
+            self._exponents[currency] = exponent
         
-        Returns:
-            AccountsWithInventories: The sum of transactions grouped by account up to the specified date.
+        multiplier = 10**exponent // denominator
+        self._multipliers[currency, denominator] = multiplier
         
-        Raises:
-            ValueError: If the requested date is before the last processed date.
+        return multiplier
+        
+    def _rescale(self, currency: Currency, exponent: int):
         """
+        Increases the exponent of the currency and rescales all balances in this currency accordingly
+        """
+        factor = 10**(exponent - self._exponents.get(currency, 0))
         
-        logger.debug(f'Calculating sum for date {date}')
+        for key, value in self._balances.items():
+            if key[1] == currency:
+                self._balances[key] = value * factor
+                
+        self._exponents[currency] = exponent
+        self._multipliers = {(multiplier_currency, denominator): multiplier 
+                             for (multiplier_currency, denominator), multiplier in self._multipliers.items()
+                             if multiplier_currency != currency}
         
-        assert isinstance(date, datetime.date)
+    def __copy__(self) -> CompactInventoryAggregator:
+        result = CompactInventoryAggregator()
+        result._balances = dict(self._balances)
+        result._exponents = dict(self._exponents)
+        result._multipliers = dict(self._multipliers)
         
-        if date < self.last_processed_date:
-            raise ValueError(f'Date {date} is in the past of the last date the summation was requested for {self.last_processed_date}')
+        return result
+    
+    def snapshot(self) -> InventoryAggregator:
+        """
+        Returns the balances as a new InventoryAggregator. Same as in the InventoryAggregator, the accounts, which 
+        balances add up to zero, are included with an empty Inventory
+        """
+        result = InventoryAggregator()
         
-        if self.unprocessed_entry_from_last_run:
-            # If there is an unprocessed entry from the last run, we must process it first
-            # but only if it is before or equal to the requested date
-            if self.unprocessed_entry_from_last_run.date <= date:
-                logger.debug(f'Processing unprocessed entry from the last run')
-                self._process_entry(self.unprocessed_entry_from_last_run)
-                self.unprocessed_entry_from_last_run = None
+        for (account, currency, cost), value in self._balances.items():
+            if value:
+                result.add_amount(account, Amount(from_scaled_int(value, self._exponents[currency]), currency), cost)
+            elif account not in result:
+                result[account] = inventory.Inventory()
                 
-            else:
+        return result
+    
+
+class _AccountTree():
+    """
+    Structure of the accounts (ancestors, children and depths), which have been added to an AccountTreeAggregator. 
+    It only grows and is shared between the snapshots of the aggregator, so it can contain accounts, which a snapshot 
+    does not hold
+    """
+    def __init__(self):
+        # Maps an account to itself and all its ancestors, e.g. "Assets:Bank:Checking" -> 
+        # ("Assets:Bank:Checking", "Assets:Bank", "Assets")
+        self.ancestors: dict[Account, tuple[Account, ...]] = {}
+        
+        # Maps a node to its children. Dictionaries are used as ordered sets
+        self.children: dict[Account, dict[Account, None]] = defaultdict(dict)
+        
+        # Maps a depth (number of components) to the nodes of this depth
+        self.nodes_by_depth: dict[int, dict[Account, None]] = defaultdict(dict)
+        
+    def get_ancestors(self, account: Account) -> tuple[Account, ...]:
+        try:
+            return self.ancestors[account]
+        except KeyError:
+            pass
+        
+        ancestors = tuple(parents(account))
+        self.ancestors[account] = ancestors
+        
+        for depth, node in enumerate(reversed(ancestors), start=1):
+            self.nodes_by_depth[depth][node] = None
+            
+        for child, parent in zip(ancestors, ancestors[1:]):
+            self.children[parent][child] = None
+            
+        return ancestors
+    
+
+class AccountTreeAggregator(InventoryAggregator):
+    """
+    InventoryAggregator, which in addition to the Inventories of the accounts maintains the totals of every node of 
+    the account tree, i.e. of each account together with all its sub-accounts. E.g. the node "Assets:Bank" holds the 
+    sum of "Assets:Bank", "Assets:Bank:Checking" and "Assets:Bank:Savings".
+    
+    The totals are updated incrementally, when an amount is added (each posting is added to the account and to all 
+    its ancestors), so the total of any node is a dictionary lookup (see the total method) and the totals at a depth 
+    (see at_depth) do not need any summation. The class can be used by the BeanSummator (see aggregator_class), 
+    then a single summator provides the sums at all depths. 
+    
+    The keys must be account names. The returned Inventories are shared with the aggregator and shall be treated as 
+    read-only.
+    """
+    def __init__(self, initiation_dict: None | dict[Account, str] = None):
+        # Totals of the nodes. None means, that the totals need to be rebuilt (see _get_totals)
+        self._totals: InventoryAggregator | None = InventoryAggregator()
+        self._tree = _AccountTree()
+        
+        super().__init__(initiation_dict)
+        
+    def add_amount(self, account: Account, units: Amount, cost: Cost | None = None):
+        """
+        Same as InventoryAggregator.add_amount, but also adds the units to the totals of the account and its ancestors
+        """
+        super().add_amount(account, units, cost)
+        
+        if self._totals is None:
+            return
+        
+        for node in self._tree.get_ancestors(account):
+            self._totals.add_amount(node, units, cost)
+            
+    def __setitem__(self, account: Account, account_inventory: inventory.Inventory):
+        original_inventory = self.get(account)
+        
+        super().__setitem__(account, account_inventory)
+        
+        if self._totals is None:
+            return
+        
+        for node in self._tree.get_ancestors(account):
+            # The node is added even if the Inventory is empty, same as by add_amount of amounts adding up to zero
+            if node not in self._totals:
+                self._totals[node] = inventory.Inventory()
+            if original_inventory is not None:
+                for pos in original_inventory:
+                    self._totals.add_amount(node, -pos.units, pos.cost)
+            for pos in account_inventory:
+                self._totals.add_amount(node, pos.units, pos.cost)
+                
+    def __delitem__(self, account: Account):
+        original_inventory = self[account]
+        
+        super().__delitem__(account)
+        
+        if self._totals is None:
+            return
+        
+        for node in self._tree.get_ancestors(account):
+            for pos in original_inventory:
+                self._totals.add_amount(node, -pos.units, pos.cost)
+                
+        # A node has a total as long as it or one of its sub-accounts is held, so the totals of the nodes, which hold no 
+        # accounts any more, are removed (from the account up to the first node, which still holds one)
+        for node in self._tree.get_ancestors(account):
+            if node in self or any(child in self._totals for child in self._tree.children.get(node, ())):
+                break
+            del self._totals[node]
+                
+    def _drop_currency_index(self):
+        # This is called by the dict methods, which modify the object without calling __setitem__ or __delitem__, 
+        # they also invalidate the totals
+        super()._drop_currency_index()
+        self._totals = None
+        
+    def _get_totals(self) -> InventoryAggregator:
+        """
+        Returns the totals of the nodes, rebuilds them if they have been dropped
+        """
+        if self._totals is None:
+            totals = InventoryAggregator()
+            for account, account_inventory in self.items():
+                for node in self._tree.get_ancestors(account):
+                    if node not in totals:
+                        totals[node] = inventory.Inventory()
+                    for pos in account_inventory:
+                        totals.add_amount(node, pos.units, pos.cost)
+            self._totals = totals
+            
+        return self._totals
+    
+    def snapshot(self) -> AccountTreeAggregator:
+        """
+        Same as InventoryAggregator.snapshot, the totals are copy-on-write as well
+        """
+        result = super().snapshot()
+        result._totals = self._get_totals().snapshot()
+        result._tree = self._tree
+        
+        return result
+    
+    def total(self, node: Account) -> inventory.Inventory:
+        """
+        Returns the total of the node, i.e. the sum of the account and all its sub-accounts. 
+        """
+        totals = self._get_totals()
+        
+        if node in totals:
+            return totals[node]
+        
+        return inventory.Inventory()
+    
+    def sum_all(self) -> inventory.Inventory:
+        """
+        Same as InventoryAggregator.sum_all, but sums only the totals of the root accounts
+        """
+        result = inventory.Inventory()
+        
+        for inv in self.at_depth(1).values():
+            result.add_inventory(inv)
+            
+        return result
+    
+    def at_depth(self, depth: int) -> InventoryAggregator:
+        """
+        Returns the sums, grouped by root(depth, account), i.e. the same result as the BeanSummator with 
+        num_acc_components_from_root=depth would return. The nodes at the depth are taken from the totals, the accounts 
+        with fewer components (which root(depth, account) leaves unchanged) with their own Inventories.
+        """
+        if depth < 1:
+            raise ValueError(f'Depth must be a positive integer, got {depth}')
+        
+        totals = self._get_totals()
+        
+        result = InventoryAggregator()
+        
+        for node_depth in range(1, depth):
+            for account in self._tree.nodes_by_depth.get(node_depth, ()):
+                if account in self:
+                    result[account] = self[account]
+                    
+        for node in self._tree.nodes_by_depth.get(depth, ()):
+            if node in totals:
+                result[node] = totals[node]
+                
+        return result
+    
+    def subtree(self, node: Account) -> InventoryAggregator:
+        """
+        Returns the Inventories of the node and all its sub-accounts, which hold Inventories
+        """
+        result = InventoryAggregator()
+        
+        nodes_to_visit = [node]
+        while nodes_to_visit:
+            current_node = nodes_to_visit.pop()
+            if current_node in self:
+                result[current_node] = self[current_node]
+            nodes_to_visit.extend(reversed(self._tree.children.get(current_node, {})))
+            
+        return result
+    
+
+class CostBasisAggregator(InventoryAggregator):
+    """
+    InventoryAggregator, which in addition to the Inventories of the accounts maintains the cost basis (book value) 
+    of every account, i.e. the sum of the costs of its positions (units times the per-unit cost, in the cost currency). 
+    Positions without cost are included in the cost basis with their units. 
+    
+    The cost basis is updated incrementally, when an amount is added, so when the class is used by the BeanSummator 
+    (see aggregator_class), the book value and the market value (see convert) at a date are both available after a 
+    single pass over the entries, without rebuilding the positions from the lots. See unrealized_gains.
+    
+    The returned Inventories are shared with the aggregator and shall be treated as read-only.
+    """
+    def __init__(self, initiation_dict: None | dict[Account, str] = None):
+        # Cost basis of the accounts. None means, that the cost basis needs to be rebuilt (see get_cost_basis)
+        self._cost_basis: InventoryAggregator | None = InventoryAggregator()
+        
+        super().__init__(initiation_dict)
+        
+    def add_amount(self, account: Account, units: Amount, cost: Cost | None = None):
+        """
+        Same as InventoryAggregator.add_amount, but also adds the cost of the units to the cost basis of the account
+        """
+        super().add_amount(account, units, cost)
+        
+        if self._cost_basis is not None:
+            self._cost_basis.add_amount(account, units if cost is None else Amount(units.number * cost.number, cost.currency))
+            
+    def __setitem__(self, account: Account, account_inventory: inventory.Inventory):
+        original_inventory = self.get(account)
+        
+        super().__setitem__(account, account_inventory)
+        
+        if self._cost_basis is None:
+            return
+        
+        if original_inventory is not None:
+            for pos in original_inventory:
+                self._cost_basis.add_amount(account, -get_cost(pos))
+        for pos in account_inventory:
+            self._cost_basis.add_amount(account, get_cost(pos))
+            
+    def __delitem__(self, account: Account):
+        super().__delitem__(account)
+        
+        if self._cost_basis is not None and account in self._cost_basis:
+            del self._cost_basis[account]
+            
+    def _drop_currency_index(self):
+        # This is called by the dict methods, which modify the object without calling __setitem__ or __delitem__, 
+        # they also invalidate the cost basis
+        super()._drop_currency_index()
+        self._cost_basis = None
+        
+    def get_cost_basis(self) -> InventoryAggregator:
+        """
+        Returns the cost basis of the accounts (an Inventory of the cost currencies per account), rebuilds it if it 
+        has been dropped. The result is shared with the aggregator and shall be treated as read-only.
+        """
+        if self._cost_basis is None:
+            cost_basis = InventoryAggregator()
+            for account, account_inventory in self.items():
+                for pos in account_inventory:
+                    cost_basis.add_amount(account, get_cost(pos))
+            self._cost_basis = cost_basis
+            
+        return self._cost_basis
+    
+    def snapshot(self) -> CostBasisAggregator:
+        """
+        Same as InventoryAggregator.snapshot, the cost basis is copy-on-write as well
+        """
+        result = super().snapshot()
+        result._cost_basis = self.get_cost_basis().snapshot()
+        
+        return result
+    
+    def unrealized_gains(self, target_currency: Currency, price_map: PriceMap, date: datetime.date | None = None, 
+                         rate_cache: ConversionRateCache | None = None) -> InventoryAggregator:
+        """
+        Returns the market value minus the book value (the cost basis) of each account, both converted to the 
+        target_currency at the prices of the date (the positions are converted the same way as by the convert method). 
+        Accounts without unrealized gains are not included.
+        
+        Note: if the cost currency is not the target_currency, the book value is converted at the price of the date, 
+        not at the historical one, so the result does not include the gains from the change of the cost currency rate.
+        """
+        if rate_cache is None:
+            rate_cache = ConversionRateCache(price_map)
+        
+        assert rate_cache.price_map is price_map, 'rate_cache must be created for the same price_map'
+        
+        cost_basis = self.get_cost_basis()
+        
+        result = InventoryAggregator()
+        
+        for account, account_inventory in self.items():
+            gains_inventory = inventory.Inventory()
+            
+            for pos in account_inventory:
+                via_currency = None if pos.cost is None else pos.cost.currency
+                gains_inventory.add_amount(rate_cache.convert_amount(pos.units, target_currency, date, via_currency))
+                
+            for pos in cost_basis.get(account, ()):
+                gains_inventory.add_amount(-rate_cache.convert_amount(pos.units, target_currency, date, None))
+                
+            if not gains_inventory.is_empty():
+                result[account] = gains_inventory
+                
+        return result
+    
+
+class BeanSummator():
+    """
+       Simulates a beanquery SUM command for aggregating transaction amounts by account up to a specified 
+       date as used in the below beanquetry query: 
+
+        SELECT root(n, account) as shortened_acc, sum(position)
+        WHERE date <= {date} AND account ~ "accounts_re"
+        GROUP BY shortened_acc
+        
+        This class enhances efficiency by remembering the last sum calculated and the date for which it was calculated.
+        It ensures that subsequent sums are requested for the same or later dates, allowing reuse of previous calculations.
+        This approach speeds up the calculation process, especially beneficial when determining net worth across multiple dates.
+        
+        Optionally (see checkpoint_every) the class can store copies of the running sum (checkpoints) while moving 
+        forward. In this random-access mode sums can also be requested for dates in the past of the last processed date.
+        Such a request is answered by restoring the latest checkpoint, which is not after the requested date, and 
+        processing only the entries after it.
+        
+        New entries can be appended with the extend method and the state of the summation can be saved and restored 
+        (see get_state and set_state), so that a growing ledger does not need to be summed from the first entry again.
+        
+        The entries can be provided as a sequence (e.g. the list, returned by the beancount loader) or as any iterable,
+        e.g. a generator, which reads entries from disk. In the latter case no reference to the entries is kept, each 
+        entry is read only once and the memory used is bounded by the running sum and a single entry. In both cases 
+        the entries must be sorted by date (as the beancount loader returns them), which is checked when they are read.
+        
+        Optionally (see snapshot_cache) the sums at the end of each month are stored on disk, keyed by a content hash 
+        of the entries up to that month end. A later run over the same or an extended ledger then resumes from the 
+        latest stored month end instead of summing from the first entry.
+        
+        Optionally (see undo_log_size) the class keeps a bounded log of the last processed entries. Then a sum for a date 
+        shortly before the last processed date is calculated by subtracting the postings of the entries after that date
+        (see rewind_to), so short moves backwards cost as much as short moves forward.
+        
+        Optionally (see posting_filter) the postings can also be filtered by the tags, links, payee, flag or metadata 
+        of their transactions. The filter is applied within the same single pass, so the entries do not need to be 
+        pre-filtered into a copy.
+        
+        Optionally (see stats) the class counts the work it does, e.g. the scanned entries and the copied snapshots.
+    """
+    def __init__(self, entries, options, accounts_re: str, num_acc_components_from_root: int = 100,
+                 checkpoint_every: int | None = None, 
+                 aggregator_class: type[InventoryAggregator | CompactInventoryAggregator] = InventoryAggregator,
+                 snapshot_cache: SnapshotCache | None = None, undo_log_size: int | None = None,
+                 posting_filter: PostingFilter | None = None, stats: SummatorStats | None = None):
+        """
+        Initializes the BeanSummator with a set of entries, options, an account name pattern, and the number of account 
+        levels to include.
+        
+        Parameters:
+            entries (Iterable): beancount entries to process, sorted by date. A sequence (e.g. a list) or any other 
+                                iterable (e.g. a generator), which is then consumed as the sums are requested.
+            options (dict): Options from the beancount file for processing.
+            accounts_re (str): Regular expression pattern to filter accounts for summing.
+            num_acc_components_from_root (int): Number of account hierarchy levels to retain in the account name.
+                                                This is similar to the n in the root(n, account) function in the beanquery.
+            checkpoint_every (int | None): If provided, a checkpoint (a copy of the running sum) is stored after every
+                                           checkpoint_every processed entries. This enables the random-access mode, 
+                                           where sum_till_date accepts dates in any order. Requires entries to be a 
+                                           sequence (e.g. a list), as entries after a checkpoint are re-read from it.
+            aggregator_class (type): The class, which holds the running sum. CompactInventoryAggregator can be used 
+                                     to speed up the summation. The sums are returned as InventoryAggregator 
+                                     objects in any case. With CostBasisAggregator the sums also hold the cost 
+                                     basis of each account, with AccountTreeAggregator the totals of each node.
+            snapshot_cache (SnapshotCache | None): If provided, the month end sums are stored in and resumed from 
+                                                   this cache. Requires entries to be a sequence (e.g. a list), as the 
+                                                   entries before a stored month end are hashed, but not processed.
+            undo_log_size (int | None): If provided, the last undo_log_size processed entries are kept, so that 
+                                        sum_till_date (and rewind_to) can move back to a date, as long as the entries 
+                                        after it are in the log. Requires aggregator_class to be InventoryAggregator 
+                                        or its subclass.
+            posting_filter (PostingFilter | None): If provided, only the postings, which pass this filter (in addition 
+                                                   to accounts_re), are summed.
+            stats (SummatorStats | None): If provided, the counters and the timings of the summation are added to it.
+        """
+        
+        logger.debug(f'Creating BeanSummator with accounts_re={accounts_re} and num_acc_components_from_root={num_acc_components_from_root}')
+        
+        if checkpoint_every is not None and not isinstance(entries, Sequence):
+            raise ValueError('checkpoint_every requires entries to be a sequence (e.g. a list)')
+        
+        if undo_log_size is not None and undo_log_size < 1:
+            raise ValueError(f'undo_log_size must be a positive integer, got {undo_log_size}')
+        
+        if undo_log_size is not None and not issubclass(aggregator_class, InventoryAggregator):
+            raise ValueError(f'undo_log_size requires aggregator_class to be InventoryAggregator or its subclass, got {aggregator_class.__name__}')
+        
+        if snapshot_cache is not None and not isinstance(entries, Sequence):
+            raise ValueError('snapshot_cache requires entries to be a sequence (e.g. a list)')
+        
+        # A reference to the entries is only kept if they can be re-read, i.e. are a sequence. Otherwise an entry is 
+        # only referenced until it is processed
+        self.entries: Sequence | None = entries if isinstance(entries, Sequence) else None
+        # Whether the entries is a list, created by this object (see extend), rather than the one provided by the caller
+        self._owns_entries = False
+        self.options = options
+        # self.current_sum = AccountsWithSum(inventory.Inventory)
+        self.aggregator_class = aggregator_class
+        self.current_sum = aggregator_class()
+        self.last_processed_date = datetime.date(1, 1, 1)
+        self.entries_iter = iter(entries)
+        self.unprocessed_entry_from_last_run = None
+        # Date of the last entry, read from entries_iter, used to check, that the entries are sorted by date
+        self._last_read_date = self.last_processed_date
+        self.accounts_re = accounts_re
+        self.num_acc_components_from_root = num_acc_components_from_root
+        self.posting_filter = posting_filter
+        self.stats = stats
+        
+        self._accounts_re_compiled = re.compile(accounts_re)
+        
+        # Cache, which maps each account seen in the postings to the shortened account, the posting is summed to, or
+        # to None, if the account does not match accounts_re. See _resolve_account
+        self._resolved_accounts: dict[Account, Account | None] = {}
+        
+        # If not None, all postings, which are added to the current_sum, are also added here. See deltas_since_last
+        self._delta_sum: InventoryAggregator | None = None
+        
+        # Number of entries, which have been processed and are included in the current_sum
+        self._num_processed_entries = 0
+        
+        if checkpoint_every is not None and checkpoint_every < 1:
+            raise ValueError(f'checkpoint_every must be a positive integer, got {checkpoint_every}')
+        
+        self.checkpoint_every = checkpoint_every
+        
+        # Checkpoints are stored in 2 parallel lists, sorted by the number of processed entries (and hence by date):
+        #  - _checkpoint_dates: the date of the last entry, included in the checkpoint (used for bisecting)
+        #  - _checkpoints: tuples (number of processed entries, copy of the sum after processing them)
+        # The first checkpoint is the initial empty sum
+        self._checkpoint_dates: list[datetime.date] = [self.last_processed_date]
+        self._checkpoints: list[tuple[int, InventoryAggregator | CompactInventoryAggregator]] = [(0, aggregator_class())]
+        
+        self.snapshot_cache = snapshot_cache
+        
+        # Rolling hash of the config and the content of the entries, which have been hashed so far (the first 
+        # _num_hashed_entries entries). See _hash_next_entry
+        self._prefix_hash = hashlib.sha256(repr((self._get_config(), aggregator_class.__name__)).encode())
+        self._num_hashed_entries = 0
+        self._last_hashed_date: datetime.date | None = None
+        
+        # Maps the index of the first entry of a month to the cache key and the date of the month end sum, which is 
+        # the sum of the entries before this index. The month end sum is stored when the entry is read
+        self._month_end_keys: dict[int, tuple[str, datetime.date]] = {}
+        
+        # Whether the latest month end sum has already been looked up in the snapshot_cache
+        self._is_resumed_from_snapshot_cache = False
+        
+        # Undo log of the last processed entries: tuples (entry, number of keys in the current_sum before the entry was 
+        # processed). As the keys are only added to the end of the current_sum, the keys after this number are the ones, 
+        # which have been created by the entry or by the later ones. See rewind_to
+        self._undo_log: deque[tuple[object, int]] | None = None if undo_log_size is None else deque(maxlen=undo_log_size)
+        
+        # The date of the sum, to which all entries in the undo log are added, i.e. the earliest date the summation 
+        # can be rewound to
+        self._undo_log_base_date = self.last_processed_date
+        
+    def _get_copy_current_sum(self) -> InventoryAggregator:
+        """
+        Returns a copy of the current sum. This is a copy-on-write snapshot (see InventoryAggregator.snapshot), so 
+        the returned object shall be treated as read-only
+        """
+        result = self.current_sum.snapshot()
+        
+        if self.stats is not None:
+            self._count_copy(result)
+            
+        return result
+    
+    def _copy_sum(self, aggregator: InventoryAggregator | CompactInventoryAggregator) -> InventoryAggregator | CompactInventoryAggregator:
+        """
+        Returns a copy of the running sum of the same class, which can be updated independently (used for checkpoints)
+        """
+        if isinstance(aggregator, InventoryAggregator):
+            result = aggregator.snapshot()
+        else:
+            result = copy.copy(aggregator)
+        
+        if self.stats is not None:
+            self._count_copy(result)
+        
+        return result
+    
+    def _count_copy(self, copied_sum: InventoryAggregator | CompactInventoryAggregator):
+        """
+        Adds the copy of the sum to the stats. Only the containers are counted, as the Inventories are shared between 
+        the copy-on-write snapshots
+        """
+        self.stats.snapshots_copied += 1
+        
+        if isinstance(copied_sum, InventoryAggregator):
+            self.stats.bytes_copied += sys.getsizeof(copied_sum) + sys.getsizeof(copied_sum._currency_index or {})
+        else:
+            self.stats.bytes_copied += sum(map(sys.getsizeof, (copied_sum._balances, copied_sum._exponents, 
+                                                               copied_sum._multipliers)))
+    
+    def sum_till_date(self, date: datetime.date) -> InventoryAggregator:
+        """
+        Sums the balances of transactions for accounts matching the accounts_re regular expression pattern up and 
+        including to the specified date.
+        
+        Parameters:
+            date (datetime.date): The date up to and including which to sum transactions.
+        
+        Returns:
+            AccountsWithInventories: The sum of transactions grouped by account up to the specified date. 
+                                     This is a copy-on-write snapshot (see InventoryAggregator.snapshot): its 
+                                     Inventories are shared with the running sum of the summator and must not be 
+                                     modified directly (e.g. result[account].add_amount(...)), as this would change the 
+                                     sums returned later. result.add_amount(...) is safe, as it copies the Inventory 
+                                     first, use copy.copy(result) to get independent Inventories.
+        
+        Raises:
+            ValueError: If the requested date is before the last processed date (and cannot be reached via
+                        the undo log or a checkpoint).
+        """
+        
+        logger.debug(f'Calculating sum for date {date}')
+        
+        self._advance_to(date)
+        
+        result = self._get_copy_current_sum()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'Calculated sum is \n {pformat(result)}')
+        return result
+    
+    def sum_at_dates(self, dates: Iterable[datetime.date]) -> Iterator[tuple[datetime.date, InventoryAggregator]]:
+        """
+        Generator, which walks through the entries once and yields the sum (see sum_till_date) at each of the dates.
+        As the sums are yielded one by one, the memory, needed by a consumer, which processes them as a stream, is 
+        bounded by a single sum.
+        
+        Parameters:
+            dates (Iterable[datetime.date]): Dates, sorted in the ascending order. Can also be a generator.
+            
+        Yields:
+            tuple[datetime.date, InventoryAggregator]: The date and the sum up to and including this date. The sum is a 
+                                                       copy-on-write snapshot, which shall be treated as read-only.
+            
+        Raises:
+            ValueError: If the dates are not sorted or if the first date is before the last processed date.
+        """
+        previous_date = None
+        
+        for date in dates:
+            if previous_date is not None and date < previous_date:
+                raise ValueError(f'Dates must be sorted, but date {date} follows the date {previous_date}')
+            previous_date = date
+            
+            yield date, self.sum_till_date(date)
+    
+    def sum_between(self, start_date: datetime.date, end_date: datetime.date) -> InventoryAggregator:
+        """
+        Returns the change of the sum between the start_date and the end_date, i.e. the sum of transactions, which are 
+        after the start_date and up to and including the end_date. This is equal to 
+        sum_till_date(end_date) - sum_till_date(start_date), but only the accounts, which have postings in this 
+        interval, are returned and no snapshots of the full sum are created. 
+        
+        Note: the Inventory of an account, which has postings, that cancel each other out, is returned empty.
+        
+        Raises:
+            ValueError: If the start_date is before the last processed date (and cannot be restored from a checkpoint) 
+                        or if the end_date is before the start_date.
+        """
+        if end_date < start_date:
+            raise ValueError(f'End date {end_date} is before the start date {start_date}')
+        
+        self._advance_to(start_date)
+        
+        return self.deltas_since_last(end_date)
+    
+    def deltas_since_last(self, date: datetime.date) -> InventoryAggregator:
+        """
+        Moves the summation forward to the date (including) and returns only the changes of the sum, caused by the 
+        transactions after the last processed date. The cost is proportional to the number of postings in this 
+        interval and not to the number of accounts in the sum.
+        
+        Note: the Inventory of an account, which has postings, that cancel each other out, is returned empty.
+        
+        Raises:
+            ValueError: If the requested date is before the last processed date.
+        """
+        # The deltas can be calculated backwards only via the undo log, not from a checkpoint
+        if date < self.last_processed_date and not self._can_rewind_to(date):
+            raise ValueError(f'Date {date} is in the past of the last date the summation was requested for {self.last_processed_date}')
+        
+        self._delta_sum = InventoryAggregator()
+        try:
+            self._advance_to(date)
+            result = self._delta_sum
+        finally:
+            self._delta_sum = None
+            
+        return result
+        
+    def extend(self, new_entries: Iterable):
+        """
+        Appends entries, which follow the entries the summator was created with, so that a long-lived summator (or one, 
+        restored with set_state) continues the summation without processing the already seen entries again. The cost is 
+        proportional to the number of the new entries.
+        
+        Parameters:
+            new_entries (Iterable): beancount entries, sorted by date
+            
+        Raises:
+            ValueError: If a new entry is dated before the last processed date or before the last already known entry.
+                        For an iterator of the new entries the error is raised when the entry is reached.
+        """
+        min_date = self.last_processed_date
+        if self.unprocessed_entry_from_last_run is not None:
+            min_date = max(min_date, self.unprocessed_entry_from_last_run.date)
+        
+        if not isinstance(self.entries, Sequence):
+            self.entries_iter = itertools.chain(self.entries_iter, self._check_appended_entries(new_entries, min_date))
+            return
+        
+        if self.entries:
+            min_date = max(min_date, self.entries[-1].date)
+        
+        # The new entries are checked before anything is changed, so that a refused call has no effect
+        new_entries = list(self._check_appended_entries(new_entries, min_date))
+        
+        # The entries, provided by the caller, are copied once, so that they are not modified
+        if not self._owns_entries:
+            self.entries = list(self.entries)
+            self._owns_entries = True
+        
+        num_consumed_entries = self._num_processed_entries + (self.unprocessed_entry_from_last_run is not None)
+        
+        self.entries.extend(new_entries)
+        self.entries_iter = map(self.entries.__getitem__, range(num_consumed_entries, len(self.entries)))
+        
+    @staticmethod
+    def _check_appended_entries(new_entries: Iterable, min_date: datetime.date) -> Iterator:
+        """
+        Yields the new entries (see extend) and raises ValueError if they are not sorted or are before the min_date
+        """
+        for entry in new_entries:
+            if entry.date < min_date:
+                raise ValueError(f'Entry dated {entry.date} cannot be appended, as it is before {min_date}, the date of '
+                                 f'the last processed or the last already known entry')
+            min_date = entry.date
+            yield entry
+    
+    def _get_config(self) -> dict:
+        """
+        Returns the parameters, which define, what is summed. A state (see get_state) can only be restored by a 
+        summator with the same config
+        """
+        return {'accounts_re': self.accounts_re,
+                'num_acc_components_from_root': self.num_acc_components_from_root,
+                'posting_filter': self.posting_filter}
+        
+    def get_state(self) -> dict:
+        """
+        Returns the state of the summation as a dictionary, which can be pickled and restored later with set_state. 
+        
+        The state includes the current sum, the last processed date and the entry, which has been read, but is after 
+        the last processed date. It does not include the entries, which have not been read yet (and the checkpoints). 
+        The number of entries, which have been read (incl. the pending one) is stored under the key 'num_consumed_entries', 
+        so the entries to continue with are entries[state['num_consumed_entries']:]
+        """
+        return {'config': self._get_config(),
+                'current_sum': self._copy_sum(self.current_sum),
+                'last_processed_date': self.last_processed_date,
+                'unprocessed_entry_from_last_run': self.unprocessed_entry_from_last_run,
+                'num_consumed_entries': self._num_processed_entries + (self.unprocessed_entry_from_last_run is not None)}
+        
+    def set_state(self, state: dict):
+        """
+        Restores the state, returned by get_state, so that the summation continues from it. The summator must be 
+        created with the same parameters as the one, which returned the state, and with the entries, which follow the 
+        consumed ones (see get_state). The state must be set before any sum is requested.
+        
+        Raises:
+            ValueError: If the state is not compatible with this summator, if the summator has already been used or 
+                        if it uses a snapshot_cache
+        """
+        if state['config'] != self._get_config():
+            raise ValueError(f'The state is created by a summator with the config {state["config"]}, which is '
+                             f'different from this one {self._get_config()}')
+            
+        if not isinstance(state['current_sum'], self.aggregator_class):
+            raise ValueError(f'The state holds a sum of the class {type(state["current_sum"]).__name__}, but this '
+                             f'summator uses {self.aggregator_class.__name__}')
+        
+        if self._num_processed_entries or self.unprocessed_entry_from_last_run is not None:
+            raise ValueError('The state can only be set before any sum is requested')
+        
+        # The keys of the snapshot cache identify the entries by their index from the first entry of the ledger 
+        if self.snapshot_cache is not None:
+            raise ValueError('The state cannot be set for a summator with a snapshot_cache')
+        
+        self.current_sum = self._copy_sum(state['current_sum'])
+        self.last_processed_date = state['last_processed_date']
+        self._last_read_date = self.last_processed_date
+        self._reset_undo_log()
+        
+        # The pending entry is put back in front of the entries, so the entries can still be indexed from a checkpoint
+        pending_entries = []
+        if state['unprocessed_entry_from_last_run'] is not None:
+            pending_entries.append(state['unprocessed_entry_from_last_run'])
+        
+        if isinstance(self.entries, Sequence):
+            self.entries = pending_entries + list(self.entries)
+            self._owns_entries = True
+            self.entries_iter = iter(self.entries)
+        else:
+            self.entries_iter = itertools.chain(pending_entries, self.entries_iter)
+        
+        self._checkpoint_dates = [self.last_processed_date]
+        self._checkpoints = [(0, self._copy_sum(self.current_sum))]
+            
+    def _advance_to(self, date: datetime.date):
+        """
+        Processes all not yet processed entries up to and including the date, so that the current_sum becomes the sum 
+        for that date
+        """
+        if self.stats is None:
+            self._process_entries_till(date)
+            return
+        
+        start_time = time.perf_counter()
+        try:
+            self._process_entries_till(date)
+        finally:
+            self.stats.advance_calls += 1
+            self.stats.elapsed_seconds += time.perf_counter() - start_time
+            
+    def _process_entries_till(self, date: datetime.date):
+        """
+        Implementation of _advance_to, which is timed by it, if the stats are collected
+        """
+        assert isinstance(date, datetime.date)
+        
+        if self.snapshot_cache is not None and not self._is_resumed_from_snapshot_cache:
+            self._resume_from_snapshot_cache(date)
+        
+        if self._undo_log is not None and date < self.last_processed_date and self._can_rewind_to(date):
+            self.rewind_to(date)
+        
+        if self.checkpoint_every is not None:
+            self._restore_checkpoint_if_beneficial(date)
+        
+        if date < self.last_processed_date:
+            raise ValueError(f'Date {date} is in the past of the last date the summation was requested for {self.last_processed_date}')
+        
+        if self.unprocessed_entry_from_last_run:
+            # If there is an unprocessed entry from the last run, we must process it first
+            # but only if it is before or equal to the requested date
+            if self.unprocessed_entry_from_last_run.date <= date:
+                logger.debug(f'Processing unprocessed entry from the last run')
+                self._process_and_count_entry(self.unprocessed_entry_from_last_run)
+                self.unprocessed_entry_from_last_run = None
+                
+            else:
                 # If the unprocessed entry is after the requested date, that means, that the new date is after or equal to the 
                 # last processed date, but before the unprocessed entry. In another words there are no entries between last processed date
-                # and a new requested date. In this case, we can return the current sum.
-                result = self._get_copy_current_sum()
-                logger.debug(f'No new sum is calculated. Returned result is \n {pformat(result)}')
-                return result
+                # and a new requested date. In this case, the current sum is already the sum for the requested date.
+                logger.debug(f'No new sum is calculated')
+                if self.stats is not None:
+                    self.stats.early_returns += 1
+                return
     
         while True:
             try:
                 entry = next(self.entries_iter)
-                logger.debug(f'Looking at the entry \n {pformat(entry)}')
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f'Looking at the entry \n {pformat(entry)}')
+                if entry.date < self._last_read_date:
+                    raise ValueError(f'Entries must be sorted by date, but the entry dated {entry.date} follows the '
+                                     f'entry dated {self._last_read_date}')
+                self._last_read_date = entry.date
+                if self.snapshot_cache is not None:
+                    self._store_month_end_sum_if_needed(entry)
                 if entry.date > date:
                     # Knowing that all beancount entries must be sorted by date, if this situation occurs, it means that we have
                     # all ready processed all entries untill including the requested date and have already passed it
@@ -339,29 +1749,565 @@ class BeanSummator():
                     logger.debug(f'Unprocessed entry is saved for the next run')
                     break
                 # Otherwise just process the entry
-                self._process_entry(entry)
+                self._process_and_count_entry(entry)
             except StopIteration:
                 break
         
         self.last_processed_date = date
+            
+    def _process_and_count_entry(self, entry):
+        """
+        Processes the entry, counts it as processed, adds it to the undo log and stores a checkpoint if it is time to do so
+        """
+        if self._undo_log is not None:
+            # If the log is full, the oldest entry is dropped and the summation cannot be rewound before it anymore
+            if len(self._undo_log) == self._undo_log.maxlen:
+                self._undo_log_base_date = max(self._undo_log_base_date, self._undo_log[0][0].date)
+            self._undo_log.append((entry, len(self.current_sum)))
         
-        result = self._get_copy_current_sum()
-        logger.debug(f'Calculated sum is \n {pformat(result)}')
-        return result
+        self._process_entry(entry)
+        self._num_processed_entries += 1
+        
+        if self.stats is not None:
+            self._count_entry(entry)
+        
+        if self.checkpoint_every is None or self._num_processed_entries % self.checkpoint_every:
+            return
+        
+        # After restoring a checkpoint the entries are processed again, the checkpoints for them are already stored
+        if self._num_processed_entries <= self._checkpoints[-1][0]:
+            return
+        
+        logger.debug(f'Storing checkpoint after {self._num_processed_entries} entries (date {entry.date})')
+        self._checkpoint_dates.append(entry.date)
+        self._checkpoints.append((self._num_processed_entries, self._copy_sum(self.current_sum)))
+    
+    def _count_entry(self, entry):
+        """
+        Adds the processed entry and its postings to the stats. This is done after the entry is processed, so that the 
+        accounts of all postings are already resolved. The hot path (_process_entry) is not slowed down by the stats
+        """
+        self.stats.entries_scanned += 1
+        
+        if not isinstance(entry, Transaction):
+            return
+        
+        if self.posting_filter is not None and not self.posting_filter.matches_entry(entry):
+            self.stats.postings_skipped += len(entry.postings)
+            return
+        
+        # The resolved account is None (or no view keys for the MultiViewBeanSummator) for the skipped postings
+        num_matched = sum(1 for posting in entry.postings if self._resolved_accounts[posting.account])
+        self.stats.postings_matched += num_matched
+        self.stats.postings_skipped += len(entry.postings) - num_matched
+        
+    def _can_rewind_to(self, date: datetime.date) -> bool:
+        """
+        Returns True if all processed entries after the date are in the undo log
+        """
+        return self._undo_log is not None and date >= self._undo_log_base_date
+    
+    def _reset_undo_log(self):
+        """
+        Clears the undo log after the current_sum has been replaced (e.g. by a checkpoint), so the summation can only be 
+        rewound to the date of the new current_sum
+        """
+        if self._undo_log is not None:
+            self._undo_log.clear()
+            self._undo_log_base_date = self.last_processed_date
+        
+    def rewind_to(self, date: datetime.date):
+        """
+        Moves the summation back to the date by subtracting the postings of the processed entries after the date, which 
+        are taken from the undo log (see undo_log_size). The subtracted entries are processed again, when a later date 
+        is requested. The cost is proportional to the number of subtracted entries.
+        
+        Raises:
+            ValueError: If the undo log is disabled or it does not contain all processed entries after the date
+        """
+        if self._undo_log is None:
+            raise ValueError('rewind_to requires the undo log, see undo_log_size')
+        
+        if date >= self.last_processed_date:
+            return
+        
+        if not self._can_rewind_to(date):
+            raise ValueError(f'Cannot rewind to {date}, the undo log does not reach back to this date')
+        
+        logger.debug(f'Rewinding from {self.last_processed_date} to {date}')
+        
+        rewound_entries = []
+        num_keys = len(self.current_sum)
+        
+        while self._undo_log and self._undo_log[-1][0].date > date:
+            entry, num_keys = self._undo_log.pop()
+            self._unprocess_entry(entry)
+            rewound_entries.append(entry)
+        
+        # The keys, created by the rewound entries, are removed, so that the sum is the same as if the summation stopped 
+        # at the date
+        for key in list(itertools.islice(self.current_sum, num_keys, None)):
+            del self.current_sum[key]
+            
+        self._num_processed_entries -= len(rewound_entries)
+        
+        # The rewound entries and the pending one are read again before the rest of the entries
+        rewound_entries.reverse()
+        if self.unprocessed_entry_from_last_run is not None:
+            rewound_entries.append(self.unprocessed_entry_from_last_run)
+            self.unprocessed_entry_from_last_run = None
+            
+        self.entries_iter = itertools.chain(rewound_entries, self.entries_iter)
+        self.last_processed_date = date
+        self._last_read_date = date
+        
+    def _hash_next_entry(self, entry):
+        """
+        Adds the entry, which must be the next not yet hashed one, to the rolling hash of the entries. If the entry is the
+        first one of a month, the hash of the entries before it becomes the cache key of the month end sum.
+        
+        All entries are hashed (as the key identifies the entries by their index), but only the dates and the postings 
+        of the transactions are hashed, as only they influence the sums. With a posting_filter also the fields of the 
+        transactions, which the filter can inspect, are hashed (see _get_filtered_content)
+        """
+        if self._last_hashed_date is not None and (entry.date.year, entry.date.month) != (self._last_hashed_date.year, self._last_hashed_date.month):
+            month_end_date = entry.date.replace(day=1) - datetime.timedelta(days=1)
+            self._month_end_keys[self._num_hashed_entries] = (self._prefix_hash.hexdigest(), month_end_date)
+            
+        if isinstance(entry, Transaction):
+            content = repr((entry.date, [(posting.account, posting.units, posting.cost) for posting in entry.postings]))
+            if self.posting_filter is not None:
+                content += self._get_filtered_content(entry)
+        else:
+            content = repr((type(entry).__name__, entry.date))
+        
+        self._prefix_hash.update(content.encode())
+        self._num_hashed_entries += 1
+        self._last_hashed_date = entry.date
+        
+    def _get_filtered_content(self, entry: Transaction) -> str:
+        """
+        Returns the fields of the transaction, which the posting_filter can inspect, for the hash of the entries. The 
+        location of the entry (the filename and the lineno meta) is left out, so that moving the entries in the file 
+        does not invalidate the cache, unless an entry_predicate, which can inspect any field, is used
+        """
+        if self.posting_filter.entry_predicate is not None:
+            return repr(entry)
+        
+        meta = sorted((key, repr(value)) for key, value in (entry.meta or {}).items() if key not in ('filename', 'lineno'))
+        
+        return repr((entry.flag, entry.payee, entry.narration, sorted(entry.tags or ()), sorted(entry.links or ()), meta))
+        
+    def _resume_from_snapshot_cache(self, date: datetime.date):
+        """
+        Hashes the entries up to and including the date and resumes the summation from the latest month end sum, which 
+        is found in the snapshot_cache. This is done once, before the first sum is calculated
+        """
+        self._is_resumed_from_snapshot_cache = True
+        
+        if self._num_processed_entries or self.unprocessed_entry_from_last_run is not None:
+            return
+        
+        while self._num_hashed_entries < len(self.entries) and self.entries[self._num_hashed_entries].date <= date:
+            self._hash_next_entry(self.entries[self._num_hashed_entries])
+            
+        for num_entries in sorted(self._month_end_keys, reverse=True):
+            key, month_end_date = self._month_end_keys[num_entries]
+            month_end_sum = self.snapshot_cache.load(key)
+            
+            if isinstance(month_end_sum, self.aggregator_class):
+                logger.debug(f'Resuming from the sum at {month_end_date} after {num_entries} entries from the snapshot cache')
+                
+                self.current_sum = month_end_sum
+                self.last_processed_date = month_end_date
+                self._last_read_date = month_end_date
+                self._reset_undo_log()
+                self._num_processed_entries = num_entries
+                self.entries_iter = map(self.entries.__getitem__, range(num_entries, len(self.entries)))
+                
+                # The month end sums before the resumed one are already in the cache
+                self._month_end_keys = {index: value for index, value in self._month_end_keys.items() if index > num_entries}
+                return
+        
+    def _store_month_end_sum_if_needed(self, entry):
+        """
+        Called when the entry is read, before it is processed. Hashes the entry (if it has not been hashed yet) and if it
+        is the first entry of a month, stores the current sum (which is then the month end sum) in the snapshot_cache
+        """
+        num_entries = self._num_processed_entries
+        
+        # After restoring a checkpoint the entries are read again, they are already hashed
+        if num_entries == self._num_hashed_entries:
+            self._hash_next_entry(entry)
+            
+        if num_entries in self._month_end_keys:
+            key, month_end_date = self._month_end_keys.pop(num_entries)
+            if key not in self.snapshot_cache:
+                logger.debug(f'Storing the sum at {month_end_date} after {num_entries} entries in the snapshot cache')
+                self.snapshot_cache.save(key, self.current_sum)
+        
+    def _restore_checkpoint_if_beneficial(self, date: datetime.date):
+        """
+        Restores the latest checkpoint, which does not include entries after the date, if this is needed to calculate 
+        the sum for the date (the date is in the past) or if it saves processing of entries (the checkpoint is ahead of 
+        the current position)
+        """
+        checkpoint_num = bisect.bisect_right(self._checkpoint_dates, date) - 1
+        
+        # This is possible only after set_state, which drops the checkpoints before the restored state 
+        if checkpoint_num < 0:
+            return
+        
+        num_processed_entries, checkpoint_sum = self._checkpoints[checkpoint_num]
+        
+        if date >= self.last_processed_date and num_processed_entries <= self._num_processed_entries:
+            return
+        
+        # Skipping forward would leave the skipped entries out of the deltas (see deltas_since_last)
+        if date >= self.last_processed_date and self._delta_sum is not None:
+            return
+        
+        logger.debug(f'Restoring checkpoint after {num_processed_entries} entries (date {self._checkpoint_dates[checkpoint_num]})')
+        
+        self.current_sum = self._copy_sum(checkpoint_sum)
+        self.last_processed_date = self._checkpoint_dates[checkpoint_num]
+        self._last_read_date = self.last_processed_date
+        self._reset_undo_log()
+        self.unprocessed_entry_from_last_run = None
+        self._num_processed_entries = num_processed_entries
+        self.entries_iter = map(self.entries.__getitem__, range(num_processed_entries, len(self.entries)))
             
     def _process_entry(self, entry):
         """
         Process the entry and update the current_sum
         """
         
-        logger.debug(f'Processing entry \n {pformat(entry)}')
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'Processing entry \n {pformat(entry)}')
+        
+        if isinstance(entry, Transaction):
+            if self.posting_filter is not None and not self.posting_filter.matches_entry(entry):
+                return
+            
+            resolved_accounts = self._resolved_accounts
+            for posting in entry.postings:
+                # This is a hot path, therefore the cache is looked up directly and _resolve_account is called only 
+                # the first time the account is seen
+                try:
+                    shortened_account = resolved_accounts[posting.account]
+                except KeyError:
+                    shortened_account = self._resolve_account(posting.account)
+                    
+                if shortened_account is not None:
+                    self.current_sum.add_amount(shortened_account, posting.units, posting.cost)
+                    if self._delta_sum is not None:
+                        self._delta_sum.add_amount(shortened_account, posting.units, posting.cost)
+                    
+    def _unprocess_entry(self, entry):
+        """
+        Reverts _process_entry for an already processed entry (see rewind_to)
+        """
+        if isinstance(entry, Transaction):
+            if self.posting_filter is not None and not self.posting_filter.matches_entry(entry):
+                return
+            
+            for posting in entry.postings:
+                shortened_account = self._resolved_accounts[posting.account]
+                if shortened_account is not None:
+                    self.current_sum.add_amount(shortened_account, -posting.units, posting.cost)
+                    if self._delta_sum is not None:
+                        self._delta_sum.add_amount(shortened_account, -posting.units, posting.cost)
+                    
+    def _matches_posting_filter_account(self, account: Account) -> bool:
+        return self.posting_filter is None or self.posting_filter.matches_account(account)
+    
+    def _resolve_account(self, account: Account) -> Account | None:
+        """
+        Returns the shortened account (see num_acc_components_from_root), to which postings to the account are summed
+        or None, if the account does not match accounts_re (or the account checks of the posting_filter). The result 
+        is cached, so that the regular expression and the root function are evaluated only once per account
+        """
+        if account not in self._resolved_accounts:
+            shortened_account = None
+            if self._accounts_re_compiled.search(account) and self._matches_posting_filter_account(account):
+                shortened_account = root(self.num_acc_components_from_root, account)
+            self._resolved_accounts[account] = shortened_account
+            
+        return self._resolved_accounts[account]
+
         
+        
+class MultiViewBeanSummator(BeanSummator):
+    """
+    Calculates the sums of the BeanSummator for several views in a single pass over the entries. A view is a pair of
+    accounts_re and num_acc_components_from_root, e.g. assets and liabilities at the full depth and income, expenses 
+    and equity at the depth 2.
+    
+    The decision, to which views and shortened accounts the postings to an account are added, is made once per account
+    and is shared by all views. 
+    
+    The sums are returned as dictionaries, which map the view names to the InventoryAggregator objects. Otherwise the 
+    class behaves as the BeanSummator (incl. checkpoints and deltas).
+    """
+    def __init__(self, entries, options, views: dict[str, tuple[str, int]], checkpoint_every: int | None = None,
+                 aggregator_class: type[InventoryAggregator | CompactInventoryAggregator] = InventoryAggregator,
+                 snapshot_cache: SnapshotCache | None = None, undo_log_size: int | None = None,
+                 posting_filter: PostingFilter | None = None, stats: SummatorStats | None = None):
+        """
+        Parameters:
+            entries (Iterable): See BeanSummator
+            options (dict): Options from the beancount file for processing.
+            views (dict[str, tuple[str, int]]): Maps the name of a view to a tuple (accounts_re, num_acc_components_from_root),
+                                                see BeanSummator for the meaning of these parameters.
+            checkpoint_every (int | None): See BeanSummator
+            aggregator_class (type): See BeanSummator
+            snapshot_cache (SnapshotCache | None): See BeanSummator
+            undo_log_size (int | None): See BeanSummator
+            posting_filter (PostingFilter | None): See BeanSummator. It applies to all views.
+            stats (SummatorStats | None): See BeanSummator
+        """
+        if not views:
+            raise ValueError('At least one view must be provided')
+        
+        self.views = views
+        self._views_re_compiled = {view_name: re.compile(accounts_re) for view_name, (accounts_re, _) in views.items()}
+        
+        combined_accounts_re = '|'.join(f'(?:{accounts_re})' for accounts_re, _ in views.values())
+        
+        super().__init__(entries, options, accounts_re=combined_accounts_re, checkpoint_every=checkpoint_every,
+                         aggregator_class=aggregator_class, snapshot_cache=snapshot_cache, 
+                         undo_log_size=undo_log_size, posting_filter=posting_filter, stats=stats)
+        
+    def sum_till_date(self, date: datetime.date) -> dict[str, InventoryAggregator]:
+        """
+        Same as BeanSummator.sum_till_date, but returns the sums per view
+        """
+        return self._split_views(super().sum_till_date(date))
+    
+    def deltas_since_last(self, date: datetime.date) -> dict[str, InventoryAggregator]:
+        """
+        Same as BeanSummator.deltas_since_last, but returns the changes per view
+        """
+        return self._split_views(super().deltas_since_last(date))
+        
+    def _split_views(self, combined_sum: InventoryAggregator) -> dict[str, InventoryAggregator]:
+        """
+        Internally the sums of all views are held in a single InventoryAggregator with (view name, shortened account) 
+        keys. This splits it into an InventoryAggregator per view (the Inventories are not copied)
+        """
+        result = {view_name: InventoryAggregator() for view_name in self.views}
+        
+        for (view_name, account), inv in combined_sum.items():
+            result[view_name][account] = inv
+        
+        return result
+        
+    def _process_entry(self, entry):
+        """
+        Process the entry and update the current_sum for all views
+        """
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'Processing entry \n {pformat(entry)}')
+            
         if isinstance(entry, Transaction):
+            if self.posting_filter is not None and not self.posting_filter.matches_entry(entry):
+                return
+            
+            resolved_accounts = self._resolved_accounts
+            for posting in entry.postings:
+                try:
+                    view_keys = resolved_accounts[posting.account]
+                except KeyError:
+                    view_keys = self._resolve_account(posting.account)
+                
+                for view_key in view_keys:
+                    self.current_sum.add_amount(view_key, posting.units, posting.cost)
+                    if self._delta_sum is not None:
+                        self._delta_sum.add_amount(view_key, posting.units, posting.cost)
+                        
+    def _unprocess_entry(self, entry):
+        """
+        Reverts _process_entry for an already processed entry for all views (see BeanSummator.rewind_to)
+        """
+        if isinstance(entry, Transaction):
+            if self.posting_filter is not None and not self.posting_filter.matches_entry(entry):
+                return
+            
             for posting in entry.postings:
-                if re.search(self.accounts_re, posting.account):
-                    shortened_account = root(self.num_acc_components_from_root, posting.account)
-                    self.current_sum[shortened_account].add_amount(posting.units, posting.cost)
+                for view_key in self._resolved_accounts[posting.account]:
+                    self.current_sum.add_amount(view_key, -posting.units, posting.cost)
+                    if self._delta_sum is not None:
+                        self._delta_sum.add_amount(view_key, -posting.units, posting.cost)
+                        
+    def _resolve_account(self, account: Account) -> tuple[tuple[str, Account], ...]:
+        """
+        Returns the (view name, shortened account) keys, to which postings to the account are added. The result is 
+        cached, so that it is calculated only once per account for all views
+        """
+        if account not in self._resolved_accounts:
+            self._resolved_accounts[account] = tuple((view_name, root(num_acc_components_from_root, account))
+                                                     for view_name, (_, num_acc_components_from_root) in self.views.items()
+                                                     if self._views_re_compiled[view_name].search(account) 
+                                                     and self._matches_posting_filter_account(account))
+            
+        return self._resolved_accounts[account]
+    
+    def _get_config(self) -> dict:
+        """
+        Same as BeanSummator._get_config, but includes the views
+        """
+        return {'views': self.views, 'posting_filter': self.posting_filter}
+        
+
+# Entries of the ParallelBeanSummator, which chunks are summed by the worker process (see _init_worker)
+_worker_entries: Sequence | None = None
 
+
+def _init_worker(entries: Sequence):
+    """
+    Initializer of a worker process of the ParallelBeanSummator. With the fork start method the entries are inherited
+    from the parent process and are not pickled at all, otherwise they are pickled once per worker (not per chunk)
+    """
+    global _worker_entries
+    _worker_entries = entries
+    
+    
+def _sum_worker_chunk(chunk_start: int, chunk_end: int, *args) -> InventoryAggregator:
+    """
+    Same as _sum_chunk for the chunk _worker_entries[chunk_start:chunk_end]. Runs in a worker process
+    """
+    return _sum_chunk(_worker_entries[chunk_start:chunk_end], *args)
+
+
+def _sum_chunk(entries: Sequence, options, accounts_re: str, num_acc_components_from_root: int, 
+               aggregator_class: type[InventoryAggregator], posting_filter: PostingFilter | None) -> InventoryAggregator:
+    """
+    Returns the sum of all entries of a chunk (see ParallelBeanSummator)
+    """
+    bean_summator = BeanSummator(entries, options, accounts_re, num_acc_components_from_root, 
+                                 aggregator_class=aggregator_class, posting_filter=posting_filter)
+    bean_summator._advance_to(datetime.date.max)
+    
+    return bean_summator.current_sum
+
+
+class ParallelBeanSummator(BeanSummator):
+    """
+    BeanSummator, which calculates its checkpoints (see checkpoint_every) in parallel. The entries are split into 
+    chunks of checkpoint_every entries, the sum of each chunk is calculated in a pool of worker processes and the 
+    checkpoints are the prefix sums of these partial sums. The sum for a date is then the latest checkpoint, which is 
+    not after the date, plus the entries of at most one chunk, which are processed serially. 
+    
+    All checkpoints are calculated, when the first sum is requested (and again for the chunks, added by extend), so the 
+    mode pays off for very large ledgers, where most of the entries are summed anyway. The results are identical to 
+    the ones of the BeanSummator and sums can be requested in any order (as with the checkpoints).
+    
+    Where the fork start method is available (e.g. on Linux), the worker processes inherit the entries, otherwise the 
+    entries are pickled once per worker. The posting_filter is always pickled, so its predicates must not be lambdas.
+    """
+    def __init__(self, entries: Sequence, options, accounts_re: str, num_acc_components_from_root: int = 100,
+                 checkpoint_every: int | None = None, 
+                 aggregator_class: type[InventoryAggregator] = InventoryAggregator,
+                 undo_log_size: int | None = None, posting_filter: PostingFilter | None = None, 
+                 num_workers: int | None = None, snapshot_cache: None = None, stats: SummatorStats | None = None):
+        """
+        Parameters:
+            entries (Sequence): beancount entries, sorted by date. Must be a sequence (e.g. a list).
+            options, accounts_re, num_acc_components_from_root: See BeanSummator
+            checkpoint_every (int | None): Number of entries in a chunk. By default the entries are split into 4 
+                                           chunks per worker.
+            aggregator_class (type): InventoryAggregator or its subclass, see BeanSummator
+            undo_log_size, posting_filter: See BeanSummator. Note, that restoring a checkpoint clears the undo log.
+            num_workers (int | None): Number of worker processes. By default the number of CPUs. With 1 the chunks 
+                                      are summed in the current process.
+            snapshot_cache (None): Not supported, as the month end sums are only stored by the serial summation. 
+                                   The parameter exists for the compatibility with the BeanSummator.
+            stats (SummatorStats | None): See BeanSummator. The work of the worker processes is only included in 
+                                          the elapsed time.
+        """
+        if not isinstance(entries, Sequence):
+            raise ValueError('ParallelBeanSummator requires entries to be a sequence (e.g. a list)')
+        
+        if not issubclass(aggregator_class, InventoryAggregator):
+            raise ValueError(f'ParallelBeanSummator requires aggregator_class to be InventoryAggregator or its subclass, '
+                             f'got {aggregator_class.__name__}')
+        
+        # The month end sums are stored, when the entries are read serially, which the parallel chunks skip
+        if snapshot_cache is not None:
+            raise ValueError('ParallelBeanSummator does not support snapshot_cache')
+        
+        if num_workers is None:
+            num_workers = os.cpu_count() or 1
+            
+        if num_workers < 1:
+            raise ValueError(f'num_workers must be a positive integer, got {num_workers}')
+        
+        self.num_workers = num_workers
+        
+        if checkpoint_every is None:
+            checkpoint_every = max(1, math.ceil(len(entries) / (4 * num_workers)))
+        
+        super().__init__(entries, options, accounts_re, num_acc_components_from_root, checkpoint_every=checkpoint_every,
+                         aggregator_class=aggregator_class, snapshot_cache=snapshot_cache, 
+                         undo_log_size=undo_log_size, posting_filter=posting_filter, stats=stats)
+        
+    def _process_entries_till(self, date: datetime.date):
+        """
+        Same as BeanSummator._process_entries_till, but first calculates the checkpoints, which are missing
+        """
+        self._build_checkpoints()
+        
+        super()._process_entries_till(date)
+        
+    def _build_checkpoints(self):
+        """
+        Calculates the checkpoints for all complete chunks of the entries after the last checkpoint. The chunks are 
+        summed in parallel, the checkpoints are their prefix sums
+        """
+        num_base_entries, base_sum = self._checkpoints[-1]
+        
+        # The ends of the chunks are at the multiples of checkpoint_every, same as the serially stored checkpoints
+        chunk_ends = list(range(num_base_entries - num_base_entries % self.checkpoint_every + self.checkpoint_every, 
+                                len(self.entries) + 1, self.checkpoint_every))
+        if not chunk_ends:
+            return
+        
+        chunk_starts = [num_base_entries] + chunk_ends[:-1]
+        
+        # The order of the entries within a chunk is checked by the worker, here only the order between the chunks
+        for chunk_start in chunk_starts:
+            if chunk_start and self.entries[chunk_start].date < self.entries[chunk_start - 1].date:
+                raise ValueError(f'Entries must be sorted by date, but the entry dated {self.entries[chunk_start].date} '
+                                 f'follows the entry dated {self.entries[chunk_start - 1].date}')
+        
+        logger.debug(f'Summing {len(chunk_ends)} chunks of {self.checkpoint_every} entries with {self.num_workers} workers')
+        
+        sum_chunk_args = (itertools.repeat(self.options), itertools.repeat(self.accounts_re), 
+                          itertools.repeat(self.num_acc_components_from_root), itertools.repeat(self.aggregator_class),
+                          itertools.repeat(self.posting_filter))
+        
+        if self.num_workers == 1 or len(chunk_ends) == 1:
+            chunks = [self.entries[chunk_start:chunk_end] for chunk_start, chunk_end in zip(chunk_starts, chunk_ends)]
+            chunk_sums = list(map(_sum_chunk, chunks, *sum_chunk_args))
+        else:
+            # Only the bounds of the chunks are sent to the workers, the entries are passed to the initializer
+            mp_context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+            with ProcessPoolExecutor(max_workers=min(self.num_workers, len(chunk_ends)), mp_context=mp_context,
+                                     initializer=_init_worker, initargs=(self.entries,)) as executor:
+                chunk_sums = list(executor.map(_sum_worker_chunk, chunk_starts, chunk_ends, *sum_chunk_args))
+            
+        prefix_sum = self._copy_sum(base_sum)
+        
+        for chunk_end, chunk_sum in zip(chunk_ends, chunk_sums):
+            prefix_sum += chunk_sum
+            
+            # The serial summation keeps the accounts, which balances have become zero, so does the prefix sum
+            for account in chunk_sum:
+                if account not in prefix_sum:
+                    prefix_sum[account] = inventory.Inventory()
+                    
+            self._checkpoint_dates.append(self.entries[chunk_end - 1].date)
+            self._checkpoints.append((chunk_end, self._copy_sum(prefix_sum)))
         
         
 if __name__ == '__main__':
@@ -0,0 +1,71 @@
+"""
+Implementation of the SummatorStats class, which collects counters and timings of the work done by the BeanSummator
+(see the stats parameter of the BeanSummator)
+"""
+from __future__ import annotations
+
+
+class SummatorStats():
+    """
+    Counters and the cumulative wall time of a BeanSummator (or of several ones, sharing the same object):
+        - entries_scanned: entries, which have been processed (incl. the ones, processed again after a checkpoint
+          has been restored or the summation has been rewound)
+        - postings_matched: postings of the processed transactions, which have been summed
+        - postings_skipped: postings, which have not been summed, as their account does not match accounts_re or
+          they do not pass the posting_filter
+        - snapshots_copied: copies of the running sum, i.e. returned sums and stored checkpoints
+        - bytes_copied: estimate of the memory, allocated by these copies. As the snapshots are copy-on-write (see
+          InventoryAggregator.snapshot), only the containers are counted (sys.getsizeof) and not the shared Inventories
+        - early_returns: calls, which have returned without reading any entry, as the pending entry (see
+          unprocessed_entry_from_last_run) is after the requested date
+        - advance_calls: calls, which moved the summation to a date (sum_till_date, deltas_since_last, etc.)
+        - elapsed_seconds: cumulative wall time of these calls
+
+    The stats are collected only if the object is passed to the BeanSummator, otherwise the summation does not pay for
+    them. Entries, summed by the worker processes of the ParallelBeanSummator, are only included in elapsed_seconds.
+    """
+    COUNTERS = ('entries_scanned', 'postings_matched', 'postings_skipped', 'snapshots_copied', 'bytes_copied',
+                'early_returns', 'advance_calls')
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """
+        Sets all counters and the elapsed time to zero
+        """
+        self.entries_scanned = 0
+        self.postings_matched = 0
+        self.postings_skipped = 0
+        self.snapshots_copied = 0
+        self.bytes_copied = 0
+        self.early_returns = 0
+        self.advance_calls = 0
+        self.elapsed_seconds = 0.0
+
+    def as_dict(self) -> dict[str, int | float]:
+        """
+        Returns the counters and the elapsed time as a dictionary
+        """
+        result: dict[str, int | float] = {name: getattr(self, name) for name in self.COUNTERS}
+        result['elapsed_seconds'] = self.elapsed_seconds
+
+        return result
+
+    def format(self) -> str:
+        """
+        Returns the stats as a human readable table with a line per counter
+        """
+        lines = ['BeanSummator stats:']
+        for name, value in self.as_dict().items():
+            formatted_value = f'{value:.3f}' if isinstance(value, float) else f'{value:,}'
+            lines.append(f'    {name:<20}{formatted_value:>15}')
+
+        return '\n'.join(lines)
+
+    def __str__(self) -> str:
+        return self.format()
+
+    def __repr__(self) -> str:
+        params = ', '.join(f'{name}={value!r}' for name, value in self.as_dict().items())
+        return f'{self.__class__.__name__}({params})'
@@ -0,0 +1,266 @@
+import unittest
+import datetime
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from beancount import loader
+from beancount.core.number import D
+
+from evbeantools.summator import InventoryAggregator, BeanSummator
+from evbeantools.columnar_summator import ColumnarBeanSummator, DailyBalanceCube
+
+
+class TestColumnarBeanSummator(unittest.TestCase):
+    
+    @loader.load_doc()
+    def test_same_as_bean_summator(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank1
+        2020-01-01 open Assets:Bank2:Checking
+        2020-01-01 open Assets:Investments
+        2020-01-01 open Equity:Opening-Balances
+        2020-01-01 open Income:Salary
+        
+        2020-01-02 * "Initial Balance"
+          Assets:Bank1  100.00 USD
+          Equity:Opening-Balances -100.00 USD
+        
+        2020-01-04 * "Salary"
+          Assets:Bank1  500 USD
+          Assets:Bank2:Checking  10.5 EUR
+          Income:Salary -500.00 USD
+          Income:Salary -10.5 EUR
+          
+        2020-01-04 * "Buying at cost"
+          Assets:Bank1  -200.00 USD
+          Assets:Investments  2 IVV {100 USD}
+          
+        2020-01-06 * "Buying without cost"
+          Assets:Bank1  -100.001 USD
+          Assets:Investments  1 IVV @ 100.001 USD
+          
+        2020-01-08 * "Spending all EUR"
+          Assets:Bank2:Checking  -10.5 EUR
+          Income:Salary 10.5 EUR
+        """
+        
+        test_dates = [datetime.date(2020,1,6),
+                      datetime.date(2019,12,31),
+                      datetime.date(2020,1,2),
+                      datetime.date(2020,1,9),
+                      datetime.date(2020,1,4),
+                      datetime.date(2020,1,8),
+                      datetime.date(2020,1,5)]
+        
+        for accounts_re, num_acc_components_from_root in [("Assets", 100), ("Assets", 1), ("Income|Equity", 100)]:
+            columnar_summator = ColumnarBeanSummator(entries, options, accounts_re, num_acc_components_from_root)
+            
+            for test_date in test_dates:
+                with self.subTest(accounts_re=accounts_re, 
+                                  num_acc_components_from_root=num_acc_components_from_root,
+                                  test_date=test_date):
+                    
+                    expected = BeanSummator(entries, options, accounts_re, num_acc_components_from_root).sum_till_date(test_date)
+                    result = columnar_summator.sum_till_date(test_date)
+                    self.assertEqual(result, expected.clean_empty())
+                    
+    @loader.load_doc()
+    def test_balances_and_totals_at_dates(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank1
+        2020-01-01 open Assets:Bank2
+        2020-01-01 open Income:Salary
+        
+        2020-01-02 * "Salary"
+          Assets:Bank1  100.00 USD
+          Assets:Bank2  1.5 USD
+          Income:Salary
+        
+        2020-01-04 * "Salary"
+          Assets:Bank2  10 EUR
+          Income:Salary
+        """
+        columnar_summator = ColumnarBeanSummator(entries, options, "Assets")
+        
+        dates = [datetime.date(2020,1,1), datetime.date(2020,1,3), datetime.date(2020,1,4)]
+        
+        balances = columnar_summator.balances_at_dates(dates)
+        self.assertEqual(balances.shape, (3, 3))
+        self.assertEqual(balances.dtype, np.int64)
+        
+        totals = columnar_summator.totals_at_dates(dates)
+        
+        usd_lot_id = columnar_summator.lots.index(("USD", None))
+        eur_lot_id = columnar_summator.lots.index(("EUR", None))
+        
+        # USD amounts are scaled with the exponent 2, EUR with 0
+        self.assertEqual(totals[:, usd_lot_id].tolist(), [0, 10150, 10150])
+        self.assertEqual(totals[:, eur_lot_id].tolist(), [0, 0, 10])
+        
+    @loader.load_doc()
+    def test_amounts_not_fitting_int64(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank1
+        2020-01-01 open Income:Salary
+        
+        2020-01-02 * "Salary"
+          Assets:Bank1  100000000000.000000000001 USD
+          Income:Salary
+        
+        2020-01-04 * "Salary"
+          Assets:Bank1  100000000000.000000000001 USD
+          Income:Salary
+        """
+        columnar_summator = ColumnarBeanSummator(entries, options, "Assets")
+        
+        self.assertEqual(columnar_summator.amounts.dtype, object)
+        
+        result = columnar_summator.sum_till_date(datetime.date(2020,1,4))
+        self.assertEqual(result["Assets:Bank1"].get_currency_units("USD").number, D("200000000000.000000000002"))
+        
+    @loader.load_doc()
+    def test_daily_balance_cube(self, entries, errors, options):
+        """
+        2019-12-31 open Assets:Bank1
+        2019-12-31 open Assets:Investments
+        2019-12-31 open Income:Salary
+        2019-12-31 open Equity:Opening-Balances
+        
+        2019-12-31 * "Initial Balance"
+          Assets:Bank1  50.00 USD
+          Equity:Opening-Balances
+        
+        2020-01-02 * "Salary"
+          Assets:Bank1  500.5 USD
+          Income:Salary
+          
+        2020-01-04 * "Buying at cost"
+          Assets:Bank1  -200.00 USD
+          Assets:Investments  2 IVV {100 USD}
+          
+        2020-01-06 * "Buying at another cost"
+          Assets:Bank1  -110.00 USD
+          Assets:Investments  1 IVV {110 USD}
+          
+        2020-01-09 * "Salary after the end of the cube"
+          Assets:Bank1  500 USD
+          Income:Salary
+        """
+        start_date = datetime.date(2020,1,1)
+        end_date = datetime.date(2020,1,7)
+        
+        cube = ColumnarBeanSummator(entries, options, "Assets").daily_balance_cube(start_date, end_date)
+        
+        self.assertEqual(cube.balances.shape, (7, 2, 2))
+        self.assertEqual(cube.end_date, end_date)
+        
+        bean_summator = BeanSummator(entries, options, "Assets")
+        
+        for day in range(7):
+            date = start_date + datetime.timedelta(days=day)
+            with self.subTest(date=date):
+                # The cube ignores the cost, so lots are compared by units
+                expected = InventoryAggregator()
+                for account, inventory in bean_summator.sum_till_date(date).items():
+                    for position in inventory:
+                        expected.add_amount(account, position.units)
+                
+                self.assertEqual(cube.at_date(date), expected.clean_empty())
+        
+        self.assertEqual(cube.get_balance(datetime.date(2020,1,6), "Assets:Investments", "IVV"), D("3"))
+        self.assertEqual(cube.get_balance(datetime.date(2020,1,6), "Assets:Bank1", "USD"), D("240.50"))
+        self.assertEqual(cube.get_balance(datetime.date(2020,1,6), "Assets:Bank2", "USD"), D("0"))
+        
+        with self.assertRaises(ValueError):
+            cube.at_date(datetime.date(2020,1,8))
+        
+        with self.assertRaises(ValueError):
+            ColumnarBeanSummator(entries, options, "Assets").daily_balance_cube(end_date, start_date)
+            
+    @loader.load_doc()
+    def test_daily_balance_cube_save_and_load(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank1
+        2020-01-01 open Income:Salary
+        
+        2020-01-02 * "Salary"
+          Assets:Bank1  100.00 USD
+          Income:Salary
+        
+        2020-01-04 * "Salary"
+          Assets:Bank1  10 EUR
+          Income:Salary
+        """
+        cube = ColumnarBeanSummator(entries, options, "Assets").daily_balance_cube(datetime.date(2020,1,1),
+                                                                                  datetime.date(2020,1,5))
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            npz_path = Path(temp_dir) / "cube.npz"
+            cube.save_npz(npz_path)
+            
+            cube.save_memmap(Path(temp_dir) / "cube")
+            
+            for loaded_cube in [DailyBalanceCube.load_npz(npz_path), 
+                                DailyBalanceCube.load_memmap(Path(temp_dir) / "cube")]:
+                with self.subTest(loaded_cube=type(loaded_cube.balances)):
+                    self.assertEqual(loaded_cube.start_date, cube.start_date)
+                    self.assertEqual(loaded_cube.accounts, cube.accounts)
+                    self.assertEqual(loaded_cube.currencies, cube.currencies)
+                    np.testing.assert_array_equal(loaded_cube.balances, cube.balances)
+                    self.assertEqual(loaded_cube.at_date(datetime.date(2020,1,4)), cube.at_date(datetime.date(2020,1,4)))
+                
+                # Releasing the memory-mapped file before the directory is removed
+                del loaded_cube
+                
+    @loader.load_doc()
+    def test_daily_balance_cube_npz_without_pickle(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank1
+        2020-01-01 open Income:Salary
+        
+        2020-01-02 * "Salary"
+          Assets:Bank1  100.00 USD
+          Income:Salary
+        
+        2020-01-04 * "Salary"
+          Assets:Bank1  0.1234567890123456789012345 BTC
+          Income:Salary
+        """
+        cube = ColumnarBeanSummator(entries, options, "Assets").daily_balance_cube(datetime.date(2020,1,1),
+                                                                                  datetime.date(2020,1,5))
+        # The scaled BTC amount does not fit into int64
+        self.assertEqual(cube.balances.dtype, object)
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            npz_path = Path(temp_dir) / "cube.npz"
+            cube.save_npz(npz_path)
+            
+            with np.load(npz_path, allow_pickle=False) as npz_file:
+                self.assertFalse(any(npz_file[name].dtype == object for name in npz_file.files))
+            
+            loaded_cube = DailyBalanceCube.load_npz(npz_path)
+            
+            self.assertEqual(loaded_cube.balances.dtype, object)
+            np.testing.assert_array_equal(loaded_cube.balances, cube.balances)
+            self.assertEqual(loaded_cube.at_date(datetime.date(2020,1,4)), cube.at_date(datetime.date(2020,1,4)))
+            
+            with self.subTest("Pickled arrays are not loaded"):
+                pickled_path = Path(temp_dir) / "pickled.npz"
+                np.savez(pickled_path, balances=cube.balances, start_date=np.array("2020-01-01"), 
+                         accounts=np.array(cube.accounts), currencies=np.array(cube.currencies),
+                         currency_exponents=cube.currency_exponents)
+                
+                with self.assertRaises(ValueError):
+                    DailyBalanceCube.load_npz(pickled_path)
+        
+    def test_no_entries(self):
+        columnar_summator = ColumnarBeanSummator([], {}, "Assets")
+        
+        self.assertEqual(columnar_summator.sum_till_date(datetime.date(2020,1,4)), InventoryAggregator())
+        self.assertEqual(columnar_summator.totals_at_dates([datetime.date(2020,1,4)]).shape, (1, 0))
+        
+
+if __name__ == "__main__":
+    unittest.main()
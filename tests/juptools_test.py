@@ -0,0 +1,95 @@
+import unittest
+import datetime
+
+import numpy as np
+
+from beancount import loader
+from beancount.core import inventory
+from beancount.core.amount import Amount
+from beancount.core.number import D
+
+from evbeantools.summator import BeanSummator, InventoryAggregator
+from evbeantools.juptools import inventory_aggregators_to_df, balances_at_dates_df
+
+
+class TestInventoryAggregatorsToDf(unittest.TestCase):
+    
+    @loader.load_doc()
+    def test_same_as_snapshots(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank1
+        2020-01-01 open Assets:Bank2
+        2020-01-01 open Assets:Investments
+        2020-01-01 open Income:Salary
+        
+        2020-01-02 * "Salary"
+          Assets:Bank1  100.00 USD
+          Income:Salary
+        
+        2020-01-04 * "Salary"
+          Assets:Bank2  10.5 EUR
+          Income:Salary
+          
+        2020-01-04 * "Buying at cost"
+          Assets:Bank1  -50.00 USD
+          Assets:Investments  1 IVV {20 USD}
+          Assets:Investments  1 IVV {30 USD}
+          
+        2020-01-06 * "Spending all EUR"
+          Assets:Bank2  -10.5 EUR
+          Income:Salary
+        """
+        dates = [datetime.date(2020,1,1) + datetime.timedelta(days=day) for day in range(8)]
+        
+        df = balances_at_dates_df(entries, options, "Assets", dates)
+        
+        self.assertEqual(list(df.columns), [("Assets:Bank1", "USD"), ("Assets:Bank2", "EUR"), ("Assets:Investments", "IVV")])
+        self.assertTrue(all(dtype == np.float64 for dtype in df.dtypes))
+        
+        # The expected values are calculated from each snapshot separately
+        for date, inv_agg in BeanSummator(entries, options, "Assets").sum_at_dates(dates):
+            for (account, currency), value in df.loc[str(date)].items():
+                with self.subTest(date=date, account=account, currency=currency):
+                    expected = inv_agg.get(account, inventory.Inventory()).get_currency_units(currency).number
+                    self.assertEqual(value, float(expected))
+        
+        # The same frame is built from the snapshots
+        snapshots = BeanSummator(entries, options, "Assets").sum_at_dates(dates)
+        self.assertTrue(inventory_aggregators_to_df(snapshots).equals(df))
+                    
+    def test_scaled(self):
+        snapshots = [(datetime.date(2020,1,1), InventoryAggregator({"Assets:Bank1": "100.5 USD"})),
+                     (datetime.date(2020,1,2), InventoryAggregator({"Assets:Bank1": "100.25 USD, 1 EUR"})),
+                     (datetime.date(2020,1,3), InventoryAggregator({"Assets:Bank2": "2 EUR"}))]
+        
+        df = inventory_aggregators_to_df(snapshots, scaled=True)
+        
+        self.assertEqual(df.attrs["exponents"], {"USD": 2, "EUR": 0})
+        self.assertTrue(all(dtype == np.int64 for dtype in df.dtypes))
+        self.assertEqual(df[("Assets:Bank1", "USD")].tolist(), [10050, 10025, 0])
+        self.assertEqual(df[("Assets:Bank1", "EUR")].tolist(), [0, 1, 0])
+        self.assertEqual(df[("Assets:Bank2", "EUR")].tolist(), [0, 0, 2])
+        
+    def test_modified_in_place(self):
+        running_sum = InventoryAggregator()
+        
+        def running_sums(take_snapshot):
+            for day in range(1, 4):
+                running_sum.add_amount("Assets:Bank1", Amount(D("1"), "USD"))
+                yield datetime.date(2020,1,day), running_sum.snapshot() if take_snapshot else running_sum
+        
+        df = inventory_aggregators_to_df(running_sums(take_snapshot=True))
+        self.assertEqual(df[("Assets:Bank1", "USD")].tolist(), [1, 2, 3])
+        
+        # The unchanged Inventories are detected by their identity, which the running sum does not change
+        with self.assertRaises(ValueError):
+            inventory_aggregators_to_df(running_sums(take_snapshot=False))
+        
+    def test_no_snapshots(self):
+        df = inventory_aggregators_to_df([])
+        
+        self.assertEqual(df.shape, (0, 0))
+        
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import pickle
+
+from beancount import loader
+
+from evbeantools.posting_filter import PostingFilter
+
+
+def is_not_old_account(account):
+    return "Old" not in account
+
+
+class TestPostingFilter(unittest.TestCase):
+    
+    @loader.load_doc()
+    def test_matches_entry(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank
+        2020-01-01 open Expenses:Travel
+        
+        2020-01-02 * "Airline" "Flight" #trip ^booking-1
+          category: "travel"
+          Assets:Bank  -100.00 USD
+          Expenses:Travel
+          
+        2020-01-03 ! "Hotel" #trip #business
+          Assets:Bank  -50.00 USD
+          Expenses:Travel
+          
+        2020-01-04 * "Groceries"
+          Assets:Bank  -10.00 USD
+          Expenses:Travel
+        """
+        flight, hotel, groceries = entries[2:]
+        
+        test_cases = [(PostingFilter(), [flight, hotel, groceries]),
+                      (PostingFilter(tags={"trip"}), [flight, hotel]),
+                      (PostingFilter(exclude_tags={"business"}), [flight, groceries]),
+                      (PostingFilter(tags={"trip"}, exclude_tags={"business"}), [flight]),
+                      (PostingFilter(links={"booking-1"}), [flight]),
+                      (PostingFilter(payee_re="^Air"), [flight]),
+                      (PostingFilter(narration_re="Hotel|Groceries"), [hotel, groceries]),
+                      (PostingFilter(flags={"!"}), [hotel]),
+                      (PostingFilter(meta={"category": "travel"}), [flight]),
+                      (PostingFilter(meta={"category": "food"}), []),
+                      (PostingFilter(entry_predicate=lambda entry: len(entry.tags) == 2), [hotel])]
+        
+        for posting_filter, expected in test_cases:
+            with self.subTest(posting_filter=posting_filter):
+                self.assertEqual([entry for entry in entries[2:] if posting_filter.matches_entry(entry)], expected)
+                
+    def test_matches_account(self):
+        posting_filter = PostingFilter(account_re="^Assets", exclude_account_re=":Savings$", 
+                                       account_predicate=lambda account: "Old" not in account)
+        
+        self.assertTrue(posting_filter.matches_account("Assets:Bank:Checking"))
+        self.assertFalse(posting_filter.matches_account("Assets:Bank:Savings"))
+        self.assertFalse(posting_filter.matches_account("Assets:OldBank"))
+        self.assertFalse(posting_filter.matches_account("Expenses:Food"))
+        
+    def test_equality(self):
+        self.assertEqual(PostingFilter(tags=["a", "b"], meta={"x": 1}), PostingFilter(tags={"b", "a"}, meta={"x": 1}))
+        self.assertNotEqual(PostingFilter(tags=["a"]), PostingFilter(links=["a"]))
+        self.assertEqual(repr(PostingFilter(tags=["a", "b"])), repr(PostingFilter(tags=["b", "a"])))
+        
+    def test_pickle(self):
+        posting_filter = PostingFilter(tags={"trip"}, payee_re="^Air", account_re="^Assets", 
+                                       account_predicate=is_not_old_account)
+        
+        unpickled_filter = pickle.loads(pickle.dumps(posting_filter))
+        
+        self.assertEqual(unpickled_filter, posting_filter)
+        
+        # The checks are compiled again
+        self.assertTrue(unpickled_filter.matches_account("Assets:Bank"))
+        self.assertFalse(unpickled_filter.matches_account("Assets:OldBank"))
+        self.assertFalse(unpickled_filter.matches_account("Expenses:Food"))
+        
+
+if __name__ == "__main__":
+    unittest.main()
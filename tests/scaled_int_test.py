@@ -0,0 +1,40 @@
+import unittest
+from decimal import Decimal
+
+from evbeantools.scaled_int import get_exponent, to_scaled_int, from_scaled_int
+
+
+class TestScaledInt(unittest.TestCase):
+    
+    def test_get_exponent(self):
+        self.assertEqual(get_exponent(Decimal("12.34")), 2)
+        self.assertEqual(get_exponent(Decimal("12")), 0)
+        self.assertEqual(get_exponent(Decimal("1E+2")), 0)
+        self.assertEqual(get_exponent(Decimal("-0.001")), 3)
+        
+        with self.assertRaises(ValueError):
+            get_exponent(Decimal("NaN"))
+            
+    def test_to_scaled_int(self):
+        self.assertEqual(to_scaled_int(Decimal("12.34"), 2), 1234)
+        self.assertEqual(to_scaled_int(Decimal("-12.3"), 3), -12300)
+        self.assertEqual(to_scaled_int(Decimal("1E+2"), 1), 1000)
+        self.assertEqual(to_scaled_int(Decimal("0"), 5), 0)
+        
+        # More digits than the context precision are still converted exactly
+        self.assertEqual(to_scaled_int(Decimal("123456789012345678901234567890.123"), 3), 
+                         123456789012345678901234567890123)
+        
+        with self.assertRaises(ValueError):
+            to_scaled_int(Decimal("12.345"), 2)
+            
+    def test_from_scaled_int(self):
+        self.assertEqual(from_scaled_int(1234, 2), Decimal("12.34"))
+        self.assertEqual(str(from_scaled_int(-1200, 2)), "-12.00")
+        self.assertEqual(from_scaled_int(0, 2), Decimal("0"))
+        self.assertEqual(from_scaled_int(123456789012345678901234567890123, 3), 
+                         Decimal("123456789012345678901234567890.123"))
+        
+
+if __name__ == "__main__":
+    unittest.main()
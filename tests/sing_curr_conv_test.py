@@ -4,6 +4,7 @@ import datetime
 import logging
 import re
 import io
+import contextlib
 from pprint import pprint, pformat
 from pathlib import Path
 import textwrap
@@ -22,11 +23,11 @@ from beancount.loader import load_string, load_file
 from beanquery import query
 
 from evbeantools.sing_curr_conv import get_equiv_sing_curr_entries, build_currency_introduction_map, get_fist_date_of_price, print_entries_to_string, print_errors_to_string
-from evbeantools.sing_curr_conv import parse_conf_string, UNREAL_GAINES_P_AND_L_ACC, GAINS_SUFFIX
+from evbeantools.sing_curr_conv import parse_conf_string, UNREAL_GAINES_P_AND_L_ACC, GAINS_SUFFIX, SINGLE_CURENCY_CONVERTER_MSG_META
 from evbeantools.sing_curr_conv import UnconvertableCommBecomesConvertibleErr, TransferFundsToFromUnconvertableCommErr
 from evbeantools.summator import InventoryAggregator
 from evbeantools.sing_curr_conv_utils import get_net_worth_via_beanq_as_ia, get_statement_of_change_in_net_worth_beanq_as_ia
-from evbeantools.sing_curr_conv_utils import beanq_2_invent_agg, format_entries
+from evbeantools.sing_curr_conv_utils import beanq_2_invent_agg, format_entries, EntriesUnchangedChecker
 
 # wexpect is only for windows
 if os.name == 'nt':
@@ -2064,6 +2065,75 @@ class TestSingCurrConv(unittest.TestCase):
         # verify_unrealized_gains(entries_eqv, options_eqv, expected_unreal_gains)   
 
 
+    @loader.load_doc()
+    def test_print_stats(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank:Checking 
+        2020-01-01 open Equity:Opening-Balances
+        
+        2020-01-01 price EUR 1 USD
+        
+        2020-01-01 * "Opening Balances"
+            Assets:Bank:Checking      100 USD
+            Equity:Opening-Balances  -100 USD
+            
+        2020-01-03 price EUR 2 USD
+        """
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            get_equiv_sing_curr_entries(entries, options, "EUR", print_stats=True)
+            
+        self.assertIn("BeanSummator stats", output.getvalue())
+        self.assertIn("entries_scanned", output.getvalue())
+        
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            get_equiv_sing_curr_entries(entries, options, "EUR")
+            
+        self.assertNotIn("BeanSummator stats", output.getvalue())
+
+
+    @loader.load_doc()
+    def test_original_entries_unchanged(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank:Checking USD
+        2020-01-01 open Assets:Bank:Checking-EUR EUR
+        2020-01-01 open Assets:Investments
+        2020-01-01 open Equity:Opening-Balances
+        
+        2020-01-01 price EUR 1 USD
+        2020-01-01 price HOO 10 USD
+        
+        2020-01-01 * "Opening Balances"
+            Assets:Bank:Checking      1000 USD
+                note: "posting meta"
+            Equity:Opening-Balances  -1000 USD
+            
+        2020-01-02 * "Exchange not at the price directive rate"
+            Assets:Bank:Checking-EUR  250 EUR @ 2 USD
+                note: "posting meta"
+            Assets:Bank:Checking     -500 USD
+            
+        2020-01-02 * "Buying some HOO"
+            Assets:Investments        10 HOO {15 USD}
+                note: "posting meta"
+            Assets:Bank:Checking     -150 USD
+            
+        2020-01-03 price EUR 2 USD
+        """
+        # The entries are not copied anymore, so the conversion must not modify them (incl. the meta of the postings)
+        entries_unchanged_checker = EntriesUnchangedChecker()
+        entries_unchanged_checker.load_original_entries(entries)
+        
+        entries_eqv, errors_eqv, options_eqv = get_equiv_sing_curr_entries(entries, options, "USD")
+        
+        self.assertEqual(errors_eqv, [])
+        entries_unchanged_checker.confirm_entries_unchanged(entries)
+        
+        for entry in entries:
+            self.assertNotIn(SINGLE_CURENCY_CONVERTER_MSG_META, entry.meta)
+            for posting in getattr(entry, "postings", []):
+                self.assertNotIn(SINGLE_CURENCY_CONVERTER_MSG_META, posting.meta)
+        
+        
 class TestSingCurrConvMultCurrSameAcc(unittest.TestCase):
     """
     Selection of tests, mainly from the TestSingCurrConv, but modifyed for the case to have 
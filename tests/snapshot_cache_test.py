@@ -0,0 +1,81 @@
+import unittest
+import datetime
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from evbeantools.snapshot_cache import SnapshotCache
+
+
+class TestSnapshotCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self.temp_dir.name) / "cache"
+        
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        
+    def _set_last_use_time(self, cache: SnapshotCache, key: str, seconds_ago: float):
+        last_use_time = time.time() - seconds_ago
+        os.utime(cache._get_path(key), (last_use_time, last_use_time))
+        
+    def test_save_and_load(self):
+        cache = SnapshotCache(self.cache_dir)
+        
+        self.assertNotIn("key1", cache)
+        self.assertIsNone(cache.load("key1"))
+        
+        cache.save("key1", {"a": [1, 2, 3]})
+        
+        self.assertIn("key1", cache)
+        self.assertEqual(cache.load("key1"), {"a": [1, 2, 3]})
+        
+        # A new cache object on the same directory sees the saved snapshots
+        self.assertEqual(SnapshotCache(self.cache_dir).load("key1"), {"a": [1, 2, 3]})
+        
+    def test_corrupted_snapshot_is_ignored(self):
+        cache = SnapshotCache(self.cache_dir)
+        
+        cache._get_path("key1").write_bytes(b"not a pickle")
+        
+        with self.assertLogs("evbeantools.snapshot_cache", level="WARNING"):
+            self.assertIsNone(cache.load("key1"))
+        
+    def test_eviction_by_age(self):
+        cache = SnapshotCache(self.cache_dir, max_age=datetime.timedelta(days=1))
+        
+        cache.save("old", "old snapshot")
+        cache.save("used", "used snapshot")
+        self._set_last_use_time(cache, "old", 2 * 24 * 3600)
+        self._set_last_use_time(cache, "used", 2 * 24 * 3600)
+        
+        # Loading marks the snapshot as recently used
+        cache.load("used")
+        
+        cache.save("new", "new snapshot")
+        
+        self.assertNotIn("old", cache)
+        self.assertIn("used", cache)
+        self.assertIn("new", cache)
+        
+    def test_eviction_by_size(self):
+        cache = SnapshotCache(self.cache_dir)
+        
+        for seconds_ago, key in enumerate(["key3", "key2", "key1"]):
+            cache.save(key, "x" * 1000)
+            self._set_last_use_time(cache, key, seconds_ago * 10)
+            
+        snapshot_size = cache._get_path("key1").stat().st_size
+        
+        cache.max_size = 2 * snapshot_size
+        cache.evict()
+        
+        # The least recently used snapshot is evicted
+        self.assertNotIn("key1", cache)
+        self.assertIn("key2", cache)
+        self.assertIn("key3", cache)
+        
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,10 @@
 import unittest
 import copy
+import mmap
+import pickle
+import tempfile
+from unittest import mock
+from concurrent.futures import ProcessPoolExecutor
 import textwrap
 import datetime
 from pprint import pprint
@@ -10,16 +15,23 @@ from beancount.core.amount import Amount as A
 from beancount.core.account import Account
 from beancount.core import inventory
 from beancount.core.number import D
+from beancount.core.data import Transaction
 
 from beancount.loader import load_string
 from beancount.core.prices import build_price_map, PriceMap
+from beancount.core.convert import convert_position
 from beancount import loader
 
 from beancount.parser import printer
 
 
 
-from evbeantools.summator import InventoryAggregator, BeanSummator
+from evbeantools.summator import InventoryAggregator, BeanSummator, MultiViewBeanSummator, ConversionRateCache
+from evbeantools.summator import CompactInventoryAggregator, AccountTreeAggregator, CostBasisAggregator
+from evbeantools.summator import ParallelBeanSummator, Tolerance
+from evbeantools.snapshot_cache import SnapshotCache
+from evbeantools.posting_filter import PostingFilter
+from evbeantools.summator_stats import SummatorStats
 
 I = inventory.from_string
 
@@ -113,6 +125,55 @@ class TestInventoryAggregator(unittest.TestCase):
         
         self.assertEqual(result_agg, inv_agg_expected)
 
+    def test_inplace_addition_and_subtraction(self):
+        inv_agg1 = InventoryAggregator({"Assets:Bank1": "100.00 USD", 
+                                        "Assets:Bank2": "200.00 USD, 2 IVV {100 USD}"})
+        
+        inv_agg2 = InventoryAggregator({"Assets:Bank1": "50.00 USD", 
+                                        "Assets:Bank2": "1 IVV {100 USD}",
+                                        "Assets:Bank3": "300.00 EUR"})
+        
+        snapshot = inv_agg1.snapshot()
+        inv_agg1_id = id(inv_agg1)
+        
+        inv_agg1 += inv_agg2
+        
+        self.assertEqual(id(inv_agg1), inv_agg1_id)
+        self.assertEqual(inv_agg1, InventoryAggregator({"Assets:Bank1": "150.00 USD", 
+                                                        "Assets:Bank2": "200.00 USD, 3 IVV {100 USD}",
+                                                        "Assets:Bank3": "300.00 EUR"}))
+        
+        inv_agg1 -= inv_agg2
+        
+        self.assertEqual(id(inv_agg1), inv_agg1_id)
+        self.assertEqual(inv_agg1.clean_empty(), snapshot)
+        
+        # The snapshot, taken before the in place operations, is not changed
+        self.assertEqual(snapshot, InventoryAggregator({"Assets:Bank1": "100.00 USD", 
+                                                        "Assets:Bank2": "200.00 USD, 2 IVV {100 USD}"}))
+        
+    def test_diff_clean(self):
+        inv_agg1 = InventoryAggregator({"Assets:Bank3": "100.00 USD", 
+                                        "Assets:Bank2": "200.00 USD",
+                                        "Assets:Bank1": "300.00 EUR"})
+        
+        inv_agg2 = InventoryAggregator({"Assets:Bank3": "50.00 USD", 
+                                        "Assets:Bank2": "200.00 USD",
+                                        "Assets:Bank4": "1.00 EUR"})
+        
+        result_agg = inv_agg1.diff_clean(inv_agg2)
+        
+        self.assertEqual(list(result_agg.items()), list((inv_agg1 - inv_agg2).clean_empty().get_sorted().items()))
+        self.assertEqual(list(result_agg), ["Assets:Bank1", "Assets:Bank3", "Assets:Bank4"])
+        
+        # Unlike the __sub__, the diff_clean does not add the missing accounts to the operands
+        inv_agg1 = InventoryAggregator({"Assets:Bank1": "1 USD"})
+        inv_agg2 = InventoryAggregator({"Assets:Bank2": "1 USD"})
+        inv_agg1.diff_clean(inv_agg2)
+        
+        self.assertEqual(set(inv_agg1), {"Assets:Bank1"})
+        self.assertEqual(set(inv_agg2), {"Assets:Bank2"})
+        
     def test_copy(self):
         inv_agg = InventoryAggregator({"Assets:Bank1": "100.00 USD", 
                                             "Assets:Bank2": "200.00 USD",
@@ -243,6 +304,53 @@ class TestInventoryAggregator(unittest.TestCase):
         
         self.assertEqual(inv_agg_converted, inv_agg_expected)
         
+    def test_convert_with_rate_cache(self):
+        bean_str = """
+        2020-01-01 price EUR 1.1 USD
+        2020-01-02 price EUR 1.2 USD
+        2020-01-02 price IVV 100 USD
+        2020-01-02 price USD 0.9 CHF
+        """
+        bean_str = textwrap.dedent(bean_str)
+        
+        price_map = build_price_map_from_bean_string(bean_str)
+        
+        inv_agg = InventoryAggregator({"Assets:Bank1": "100.00 EUR, 3 IVV {90 USD}, 5 HOO", 
+                                       "Assets:Bank2": "33.33 EUR, 2 IVV",
+                                       "Assets:Bank3": "10 USD"})
+        
+        rate_cache = ConversionRateCache(price_map)
+        
+        for date in [datetime.date(2020, 1, 1), datetime.date(2020, 1, 2), None]:
+            for target_currency in ["USD", "CHF", "EUR"]:
+                with self.subTest(date=date, target_currency=target_currency):
+                    
+                    converted_inv_agg = inv_agg.convert(target_currency, price_map, date, rate_cache)
+                    
+                    # Expected result is calculated position by position with the beancount convert_position
+                    inv_agg_expected = InventoryAggregator()
+                    for acc, inv in inv_agg.items():
+                        for pos in inv:
+                            dummy_cost = None if pos.cost is None else inventory.Cost(D("1"), "REMOVEDCOST", None, None)
+                            inv_agg_expected.add_amount(acc, convert_position(pos, target_currency, price_map, date), dummy_cost)
+                    
+                    self.assertEqual(converted_inv_agg, inv_agg_expected)
+                    self.assertEqual(converted_inv_agg, inv_agg.convert(target_currency, price_map, date))
+                    
+        with self.subTest("Rates are looked up once per currency, target currency, date and via currency"):
+            
+            # 5 distinct (currency, via currency) combinations, 3 target currencies and 3 dates
+            self.assertEqual(len(rate_cache._rates), 5 * 3 * 3)
+            
+        with self.subTest("IVV with the cost in USD is converted to CHF via USD"):
+            self.assertEqual(rate_cache.get_rates("IVV", "CHF", datetime.date(2020, 1, 2), "USD"), (D("100"), D("0.9")))
+            self.assertEqual(inv_agg.convert("CHF", price_map, datetime.date(2020, 1, 2), rate_cache)["Assets:Bank1"],
+                             I("270.0 CHF {1 REMOVEDCOST}, 100.00 EUR, 5 HOO"))
+            
+        with self.subTest("Rate cache for another price map is not accepted"):
+            with self.assertRaises(AssertionError):
+                inv_agg.convert("USD", build_price_map_from_bean_string(bean_str), None, rate_cache)
+        
     def test_get_sorted(self):
         inv_agg = InventoryAggregator({"Assets:Bank1": "100.00 USD, 50 EUR", 
                                     "Assets:Aank2": "200.00 USD",
@@ -279,7 +387,500 @@ class TestInventoryAggregator(unittest.TestCase):
         expected = InventoryAggregator({"Assets:Bank3": "1.0 USD"})
         
         self.assertEqual(cleaned_inv_agg, expected)
+        
+    def test_tolerance(self):
+        inventories = [I("0.01 USD, -0.01 EUR"), I("-0.02 USD"), I("0.001 CHF"), I(""), I("1 IVV {10 USD}, 0 GBP")]
+        
+        for tolerance in [D("0.01"), D("0.001"), D("0"), D("-0.01"), 
+                          {"USD": D("0.02"), "EUR": D("0.01")}, {"USD": D("0.01"), "CHF": D("0.001")}, {}]:
+            with self.subTest(tolerance=tolerance):
+                prepared_tolerance = Tolerance(tolerance)
+                
+                # Same as Inventory.is_small
+                for inv in inventories:
+                    self.assertEqual(prepared_tolerance.is_small(inv), inv.is_small(tolerance))
+                    
+                inv_agg = InventoryAggregator({f"Assets:Bank{i}": inv.to_string(parens=False) 
+                                               for i, inv in enumerate(inventories)})
+                
+                self.assertEqual(inv_agg.is_small(prepared_tolerance), 
+                                 all(inv.is_small(tolerance) for inv in inv_agg.values()))
+                self.assertEqual(inv_agg.clean_small(prepared_tolerance), inv_agg.clean_small(tolerance))
+                self.assertEqual(inv_agg.clean_small(tolerance), 
+                                 {account: inv for account, inv in inv_agg.items() if not inv.is_small(tolerance)})
+                
+        self.assertIs(Tolerance.prepare(prepared_tolerance), prepared_tolerance)
+        
+    def test_snapshot(self):
+        inv_agg = InventoryAggregator({"Assets:Bank1": "100.00 USD", 
+                                       "Assets:Bank2": "200.00 USD"})
+        
+        snapshot = inv_agg.snapshot()
+        self.assertEqual(snapshot, inv_agg)
+        
+        # Inventories are shared until they are modified
+        self.assertIs(snapshot["Assets:Bank1"], inv_agg["Assets:Bank1"])
+        
+        inv_agg.add_amount("Assets:Bank1", A(D("50.00"), "USD"))
+        inv_agg.add_amount("Assets:Bank3", A(D("1.00"), "EUR"))
+        
+        self.assertEqual(snapshot, InventoryAggregator({"Assets:Bank1": "100.00 USD", 
+                                                        "Assets:Bank2": "200.00 USD"}))
+        
+        self.assertEqual(inv_agg, InventoryAggregator({"Assets:Bank1": "150.00 USD", 
+                                                       "Assets:Bank2": "200.00 USD",
+                                                       "Assets:Bank3": "1.00 EUR"}))
+        
+        self.assertIsNot(snapshot["Assets:Bank1"], inv_agg["Assets:Bank1"])
+        self.assertIs(snapshot["Assets:Bank2"], inv_agg["Assets:Bank2"])
+        
+        # Modifying the snapshot via add_amount does not modify the original
+        snapshot.add_amount("Assets:Bank2", A(D("-200.00"), "USD"))
+        self.assertTrue(snapshot["Assets:Bank2"].is_empty())
+        self.assertEqual(inv_agg["Assets:Bank2"], I("200.00 USD"))
+        
+    def test_snapshot_after_dict_modifications(self):
+        # Inventories, which are assigned, popped or updated, are not owned any more, so a later add_amount does not 
+        # modify them in place
+        for modification in ["setitem", "pop", "popitem", "update", "clear"]:
+            with self.subTest(modification=modification):
+                inv_agg = InventoryAggregator()
+                inv_agg.add_amount("Assets:Bank1", A(D("1"), "USD"))
+                snapshot = inv_agg.snapshot()
+                inv_agg.add_amount("Assets:Bank1", A(D("1"), "USD"))
+                
+                if modification == "setitem":
+                    inv_agg["Assets:Bank1"] = snapshot["Assets:Bank1"]
+                elif modification == "update":
+                    inv_agg.update({"Assets:Bank1": snapshot["Assets:Bank1"]})
+                else:
+                    if modification == "pop":
+                        inv_agg.pop("Assets:Bank1")
+                    elif modification == "popitem":
+                        inv_agg.popitem()
+                    else:
+                        inv_agg.clear()
+                    dict.__setitem__(inv_agg, "Assets:Bank1", snapshot["Assets:Bank1"])
+                    
+                inv_agg.add_amount("Assets:Bank1", A(D("5"), "USD"))
+                
+                self.assertEqual(snapshot["Assets:Bank1"], I("1 USD"))
+                self.assertEqual(inv_agg["Assets:Bank1"], I("6 USD"))
+        
+    def test_add_amount(self):
+        inv_agg = InventoryAggregator()
+        
+        inv_agg.add_amount("Assets:Bank1", A(D("2"), "IVV"), inventory.Cost(D("100"), "USD", None, None))
+        inv_agg.add_amount("Assets:Bank1", A(D("1"), "IVV"), inventory.Cost(D("100"), "USD", None, None))
+        inv_agg.add_amount("Assets:Bank1", A(D("10"), "USD"))
+        
+        self.assertEqual(inv_agg, InventoryAggregator({"Assets:Bank1": "3 IVV {100 USD}, 10 USD"}))
+        
+    def test_currency_index(self):
+        inv_agg = InventoryAggregator({"Assets:Bank1": "100.00 USD, 2 IVV {100 USD}", 
+                                       "Assets:Bank2": "200.00 EUR"})
+        
+        self.assertEqual(inv_agg.currencies(), {"USD", "IVV", "EUR"})
+        self.assertEqual(inv_agg.get_currency_positions("EUR"), InventoryAggregator({"Assets:Bank2": "200.00 EUR"}))
+        
+        with self.subTest("Index is updated by add_amount"):
+            inv_agg.add_amount("Assets:Bank3", A(D("1.00"), "EUR"))
+            inv_agg.add_amount("Assets:Bank2", A(D("-200.00"), "EUR"))
+            
+            self.assertEqual(inv_agg._currency_index["EUR"], {"Assets:Bank3"})
+            self.assertEqual(inv_agg.get_currency_positions("EUR"), InventoryAggregator({"Assets:Bank3": "1.00 EUR"}))
+            
+        with self.subTest("Index of the snapshot is not changed by the changes of the original"):
+            snapshot = inv_agg.snapshot()
+            
+            inv_agg.add_amount("Assets:Bank1", A(D("-100.00"), "USD"))
+            inv_agg.add_amount("Assets:Bank1", A(D("5"), "GBP"))
+            
+            self.assertEqual(inv_agg.currencies(), {"IVV", "EUR", "GBP"})
+            self.assertEqual(snapshot.currencies(), {"USD", "IVV", "EUR"})
+            self.assertEqual(snapshot.get_currency_positions("USD"), InventoryAggregator({"Assets:Bank1": "100.00 USD"}))
+            
+        with self.subTest("Index is updated by __setitem__ and __delitem__"):
+            inv_agg["Assets:Bank4"] = I("3 CHF")
+            del inv_agg["Assets:Bank3"]
+            
+            self.assertEqual(inv_agg.currencies(), {"IVV", "GBP", "CHF"})
+            
+        with self.subTest("Index is rebuilt after other dict modifications"):
+            inv_agg.pop("Assets:Bank4")
+            inv_agg.update({"Assets:Bank5": I("7 JPY")})
+            
+            self.assertEqual(inv_agg.currencies(), {"IVV", "GBP", "JPY"})
+            
+        with self.subTest("Index is built by the snapshot, not by the not queried original"):
+            running_sum = InventoryAggregator({"Assets:Bank1": "100.00 USD"})
+            snapshot = running_sum.snapshot()
+            running_sum.add_amount("Assets:Bank2", A(D("1.00"), "EUR"))
+            
+            self.assertEqual(snapshot.currencies(), {"USD"})
+            self.assertEqual(snapshot.get_currency_positions("EUR"), InventoryAggregator())
+            self.assertIsNone(running_sum._currency_index)
+            
+            running_sum.snapshot()
+            running_sum.add_amount("Assets:Bank3", A(D("1.00"), "CHF"))
+            self.assertIsNone(running_sum._currency_index)
+        
+    def test_to_bytes_and_from_bytes(self):
+        inv_agg = InventoryAggregator({"Assets:Bank1": "100.00 USD, 5.0 EUR",
+                                       "Assets:Broker": '2 IVV {100.5 USD, 2020-01-01}, 1 IVV {110 USD, 2020-01-02, "lot2"}, -1E+2 GBP',
+                                       "Liabilities:CreditCard": "-50.00 USD"})
+        inv_agg["Assets:Empty"] = inventory.Inventory()
+        
+        loaded_inv_agg = InventoryAggregator.from_bytes(inv_agg.to_bytes())
+        
+        self.assertEqual(loaded_inv_agg, inv_agg)
+        self.assertEqual(list(loaded_inv_agg), list(inv_agg))
+        # The numbers are restored with the same number of digits after the decimal point
+        self.assertEqual([str(inv) for inv in loaded_inv_agg.values()], [str(inv) for inv in inv_agg.values()])
+        
+        # The loaded Inventories are owned by the loaded object
+        loaded_inv_agg.add_amount("Assets:Bank1", A(D("1.00"), "USD"))
+        self.assertEqual(loaded_inv_agg["Assets:Bank1"], I("101.00 USD, 5.0 EUR"))
+        
+        with self.subTest("Empty InventoryAggregator"):
+            self.assertEqual(InventoryAggregator.from_bytes(InventoryAggregator().to_bytes()), InventoryAggregator())
+            
+        with self.subTest("Numbers not fitting into int64"):
+            big_inv_agg = InventoryAggregator({"Assets:Bank1": "100000000000.000000000001 USD"})
+            self.assertEqual(InventoryAggregator.from_bytes(big_inv_agg.to_bytes()), big_inv_agg)
+            
+        with self.subTest("Exponents fitting into int16"):
+            for number in [D("1E+32767"), D("1E-32767")]:
+                extreme_inv_agg = InventoryAggregator()
+                extreme_inv_agg.add_amount("Assets:Bank1", A(number, "USD"))
+                self.assertEqual(str(InventoryAggregator.from_bytes(extreme_inv_agg.to_bytes())["Assets:Bank1"]), 
+                                 str(extreme_inv_agg["Assets:Bank1"]))
+            
+        with self.subTest("Exponents not fitting into int16"):
+            for number in [D("1E+32768"), D("1E-40000")]:
+                extreme_inv_agg = InventoryAggregator()
+                extreme_inv_agg.add_amount("Assets:Bank1", A(number, "USD"))
+                with self.assertRaises(ValueError):
+                    extreme_inv_agg.to_bytes()
+                    
+        with self.subTest("Subclass and memory-mapped file"):
+            with tempfile.TemporaryDirectory() as temp_dir:
+                path = Path(temp_dir) / "inv_agg.bin"
+                path.write_bytes(inv_agg.to_bytes())
+                
+                with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+                    loaded_inv_agg = CostBasisAggregator.from_bytes(mapped_file)
+                    
+                self.assertIsInstance(loaded_inv_agg, CostBasisAggregator)
+                self.assertEqual(loaded_inv_agg, inv_agg)
+                self.assertEqual(loaded_inv_agg.get_cost_basis()["Assets:Broker"], I("311.0 USD, -1E+2 GBP"))
+                
+        with self.assertRaises(ValueError):
+            InventoryAggregator.from_bytes(b"not an InventoryAggregator")
+            
+    def test_pickle_and_deepcopy(self):
+        inv_agg = InventoryAggregator({"Assets:Bank1": "100.00 USD, 2 IVV {100 USD}", 
+                                       "Assets:Bank2": "200.00 EUR"})
+        
+        for copy_function in [lambda obj: pickle.loads(pickle.dumps(obj)), copy.deepcopy]:
+            inv_agg_copy = copy_function(inv_agg)
+            
+            self.assertIsInstance(inv_agg_copy, InventoryAggregator)
+            self.assertEqual(inv_agg_copy, inv_agg)
+            self.assertIsNot(inv_agg_copy["Assets:Bank1"], inv_agg["Assets:Bank1"])
+            
+            inv_agg_copy.add_amount("Assets:Bank3", A(D("1"), "CHF"))
+            self.assertEqual(inv_agg_copy.currencies(), {"USD", "IVV", "EUR", "CHF"})
+        
+class TestCompactInventoryAggregator(unittest.TestCase):
+    def test_add_amount_and_snapshot(self):
+        compact_inv_agg = CompactInventoryAggregator()
+        inv_agg = InventoryAggregator()
+        
+        amounts = [("Assets:Bank1", A(D("100"), "USD"), None),
+                   ("Assets:Bank1", A(D("0.25"), "USD"), None),
+                   ("Assets:Bank2", A(D("1.5"), "USD"), None),
+                   ("Assets:Bank1", A(D("2"), "IVV"), inventory.Cost(D("100"), "USD", None, None)),
+                   ("Assets:Bank1", A(D("-0.125"), "IVV"), inventory.Cost(D("100"), "USD", None, None)),
+                   ("Assets:Bank2", A(D("1E+3"), "EUR"), None),
+                   ("Assets:Bank2", A(D("-1.5"), "USD"), None),
+                   ("Assets:Bank3", A(D("0.1234567890123456789012345678901"), "BTC"), None)]
+        
+        for account, units, cost in amounts:
+            compact_inv_agg.add_amount(account, units, cost)
+            inv_agg.add_amount(account, units, cost)
+            
+            with self.subTest(account=account, units=units, cost=cost):
+                self.assertEqual(compact_inv_agg.snapshot(), inv_agg)
+                
+        # Assets:Bank2 has a zero USD balance, but still has a non zero EUR balance
+        self.assertEqual(compact_inv_agg.snapshot()["Assets:Bank2"], I("1000 EUR"))
+        
+        with self.subTest("Numbers have the number of digits after the decimal point of the currency"):
+            self.assertEqual(str(compact_inv_agg.snapshot()["Assets:Bank1"]), "(100.25 USD, 1.875 IVV {100 USD})")
+        
+    def test_zero_balance(self):
+        compact_inv_agg = CompactInventoryAggregator()
+        
+        compact_inv_agg.add_amount("Assets:Bank1", A(D("100.00"), "USD"))
+        compact_inv_agg.add_amount("Assets:Bank1", A(D("-100.00"), "USD"))
+        
+        # Same as in the InventoryAggregator, the account is kept with an empty Inventory
+        self.assertEqual(compact_inv_agg.snapshot(), InventoryAggregator({"Assets:Bank1": ""}))
+        self.assertTrue(compact_inv_agg.snapshot().is_empty())
+        
+    def test_copy(self):
+        compact_inv_agg = CompactInventoryAggregator()
+        compact_inv_agg.add_amount("Assets:Bank1", A(D("1"), "USD"))
+        
+        compact_inv_agg_copy = copy.copy(compact_inv_agg)
+        compact_inv_agg_copy.add_amount("Assets:Bank1", A(D("0.01"), "USD"))
+        
+        self.assertEqual(compact_inv_agg.snapshot(), InventoryAggregator({"Assets:Bank1": "1 USD"}))
+        self.assertEqual(compact_inv_agg_copy.snapshot(), InventoryAggregator({"Assets:Bank1": "1.01 USD"}))
+        
+        
+class TestAccountTreeAggregator(unittest.TestCase):
+    def test_totals(self):
+        tree_agg = AccountTreeAggregator()
+        
+        tree_agg.add_amount("Assets:Bank:Checking", A(D("100.00"), "USD"))
+        tree_agg.add_amount("Assets:Bank:Savings", A(D("200.00"), "USD"))
+        tree_agg.add_amount("Assets:Bank", A(D("1.00"), "EUR"))
+        tree_agg.add_amount("Assets:Broker", A(D("2"), "IVV"), inventory.Cost(D("100"), "USD", None, None))
+        tree_agg.add_amount("Liabilities:CreditCard", A(D("-50.00"), "USD"))
+        
+        self.assertEqual(tree_agg, InventoryAggregator({"Assets:Bank:Checking": "100.00 USD",
+                                                        "Assets:Bank:Savings": "200.00 USD",
+                                                        "Assets:Bank": "1.00 EUR",
+                                                        "Assets:Broker": "2 IVV {100 USD}",
+                                                        "Liabilities:CreditCard": "-50.00 USD"}))
+        
+        self.assertEqual(tree_agg.total("Assets:Bank"), I("300.00 USD, 1.00 EUR"))
+        self.assertEqual(tree_agg.total("Assets"), I("300.00 USD, 1.00 EUR, 2 IVV {100 USD}"))
+        self.assertEqual(tree_agg.total("Assets:Bank:Checking"), I("100.00 USD"))
+        self.assertEqual(tree_agg.total("Income"), I(""))
+        
+        self.assertEqual(tree_agg.sum_all(), InventoryAggregator.sum_all(tree_agg))
+        
+        self.assertEqual(tree_agg.at_depth(1), InventoryAggregator({"Assets": "300.00 USD, 1.00 EUR, 2 IVV {100 USD}",
+                                                                    "Liabilities": "-50.00 USD"}))
+        
+        # Assets:Bank has own Inventory and Assets:Bank:Checking and Assets:Bank:Savings are at the depth 3
+        self.assertEqual(tree_agg.at_depth(3), tree_agg)
+        
+        self.assertEqual(tree_agg.subtree("Assets:Bank"), InventoryAggregator({"Assets:Bank:Checking": "100.00 USD",
+                                                                              "Assets:Bank:Savings": "200.00 USD",
+                                                                              "Assets:Bank": "1.00 EUR"}))
+        
+        with self.assertRaises(ValueError):
+            tree_agg.at_depth(0)
+        
+    def test_snapshot_and_modifications(self):
+        tree_agg = AccountTreeAggregator({"Assets:Bank:Checking": "100.00 USD", 
+                                          "Assets:Bank:Savings": "200.00 USD"})
+        
+        self.assertEqual(tree_agg.total("Assets"), I("300.00 USD"))
+        
+        snapshot = tree_agg.snapshot()
+        self.assertIsInstance(snapshot, AccountTreeAggregator)
+        
+        tree_agg.add_amount("Assets:Bank:Checking", A(D("50.00"), "USD"))
+        tree_agg.add_amount("Assets:Cash", A(D("5.00"), "USD"))
+        
+        self.assertEqual(tree_agg.total("Assets"), I("355.00 USD"))
+        self.assertEqual(snapshot.total("Assets"), I("300.00 USD"))
+        self.assertEqual(snapshot.at_depth(2), InventoryAggregator({"Assets:Bank": "300.00 USD"}))
+        
+        with self.subTest("__setitem__ and __delitem__ update the totals"):
+            tree_agg["Assets:Bank:Savings"] = I("20.00 USD")
+            del tree_agg["Assets:Cash"]
+            
+            self.assertEqual(tree_agg.total("Assets"), I("170.00 USD"))
+            
+        with self.subTest("Totals are rebuilt after other dict modifications"):
+            tree_agg.pop("Assets:Bank:Savings")
+            
+            self.assertEqual(tree_agg.total("Assets"), I("150.00 USD"))
+            
+        with self.subTest("Copies and unpickled objects hold the totals"):
+            for tree_agg_copy in [copy.copy(tree_agg), pickle.loads(pickle.dumps(tree_agg))]:
+                self.assertIsInstance(tree_agg_copy, AccountTreeAggregator)
+                self.assertEqual(tree_agg_copy.total("Assets"), I("150.00 USD"))
+                
+    @loader.load_doc()
+    def test_same_as_bean_summator_at_each_depth(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank1:Checking
+        2020-01-01 open Assets:Bank1
+        2020-01-01 open Assets:Bank2:Savings:Deposit
+        2020-01-01 open Liabilities:CreditCard
+        2020-01-01 open Equity:Opening-Balances
+        
+        2020-01-02 * "Initial Balance"
+          Assets:Bank1:Checking  100.00 USD
+          Assets:Bank1  10.00 USD
+          Assets:Bank2:Savings:Deposit  500.00 EUR
+          Liabilities:CreditCard  -50.00 USD
+          Equity:Opening-Balances -60.00 USD
+          Equity:Opening-Balances -500.00 EUR
+        """
+        test_date = datetime.date(2020,1,2)
+        
+        tree_agg = BeanSummator(entries, options, accounts_re="Assets|Liabilities", 
+                                aggregator_class=AccountTreeAggregator).sum_till_date(test_date)
+        
+        self.assertIsInstance(tree_agg, AccountTreeAggregator)
+        
+        for depth in range(1, 5):
+            with self.subTest(depth=depth):
+                expected = BeanSummator(entries, options, accounts_re="Assets|Liabilities", 
+                                        num_acc_components_from_root=depth).sum_till_date(test_date)
+                self.assertEqual(tree_agg.at_depth(depth), expected)
+        
+    @loader.load_doc()
+    def test_at_depth_after_rewind(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank1:Checking
+        2020-01-01 open Assets:Bank2:Savings
+        2020-01-01 open Liabilities:CreditCard
+        2020-01-01 open Income:Salary
+        
+        2020-01-02 * "Salary"
+          Assets:Bank1:Checking  100.00 USD
+          Income:Salary
+        
+        2020-01-04 * "Salary"
+          Assets:Bank2:Savings  10.00 EUR
+          Income:Salary
+          
+        2020-01-05 * "Card"
+          Liabilities:CreditCard  -20.00 USD
+          Assets:Bank1:Checking  20.00 USD
+        """
+        # The nodes, which only hold the removed accounts (Assets:Bank2, Liabilities), have no totals after the rewind
+        bean_summator = BeanSummator(entries, options, accounts_re="Assets|Liabilities", 
+                                     aggregator_class=AccountTreeAggregator, undo_log_size=10)
+        bean_summator.sum_till_date(datetime.date(2020,1,5))
+        
+        for test_date in [datetime.date(2020,1,4), datetime.date(2020,1,3)]:
+            tree_agg = bean_summator.sum_till_date(test_date)
+            expected = BeanSummator(entries, options, accounts_re="Assets|Liabilities", 
+                                    aggregator_class=AccountTreeAggregator).sum_till_date(test_date)
+            
+            for depth in range(1, 4):
+                with self.subTest(test_date=test_date, depth=depth):
+                    self.assertEqual(tree_agg.at_depth(depth), expected.at_depth(depth))
+                    
+            self.assertEqual(tree_agg._get_totals(), expected._get_totals())
+            
+        self.assertEqual(tree_agg.at_depth(1), InventoryAggregator({"Assets": "100.00 USD"}))
+        self.assertEqual(tree_agg.total("Liabilities"), I(""))
+        
+        
+class TestCostBasisAggregator(unittest.TestCase):
+    def test_cost_basis(self):
+        cost_basis_agg = CostBasisAggregator()
+        
+        cost_basis_agg.add_amount("Assets:Broker", A(D("2"), "IVV"), inventory.Cost(D("100"), "USD", None, None))
+        cost_basis_agg.add_amount("Assets:Broker", A(D("1"), "IVV"), inventory.Cost(D("110"), "USD", None, None))
+        cost_basis_agg.add_amount("Assets:Broker", A(D("5.00"), "USD"))
+        cost_basis_agg.add_amount("Assets:Bank", A(D("100.00"), "EUR"))
+        
+        self.assertEqual(cost_basis_agg.get_cost_basis(), InventoryAggregator({"Assets:Broker": "315.00 USD",
+                                                                             "Assets:Bank": "100.00 EUR"}))
+        
+        snapshot = cost_basis_agg.snapshot()
+        self.assertIsInstance(snapshot, CostBasisAggregator)
+        
+        # Selling 1 IVV from the 1st lot
+        cost_basis_agg.add_amount("Assets:Broker", A(D("-1"), "IVV"), inventory.Cost(D("100"), "USD", None, None))
+        
+        self.assertEqual(cost_basis_agg.get_cost_basis()["Assets:Broker"], I("215.00 USD"))
+        self.assertEqual(snapshot.get_cost_basis()["Assets:Broker"], I("315.00 USD"))
+        
+        with self.subTest("__setitem__ and __delitem__ update the cost basis"):
+            cost_basis_agg["Assets:Bank"] = I("3 IVV {120 USD}")
+            del cost_basis_agg["Assets:Broker"]
+            
+            self.assertEqual(cost_basis_agg.get_cost_basis(), InventoryAggregator({"Assets:Bank": "360 USD"}))
+            
+        with self.subTest("Cost basis is rebuilt after other dict modifications"):
+            cost_basis_agg.update({"Assets:Cash": I("1.00 USD")})
+            
+            self.assertEqual(cost_basis_agg.get_cost_basis(), InventoryAggregator({"Assets:Bank": "360 USD",
+                                                                                 "Assets:Cash": "1.00 USD"}))
+            
+        with self.subTest("Copies and unpickled objects hold the cost basis"):
+            for cost_basis_agg_copy in [copy.copy(snapshot), pickle.loads(pickle.dumps(snapshot))]:
+                self.assertIsInstance(cost_basis_agg_copy, CostBasisAggregator)
+                self.assertEqual(cost_basis_agg_copy.get_cost_basis(), snapshot.get_cost_basis())
+                
+    @loader.load_doc()
+    def test_book_and_market_value_in_one_pass(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank
+        2020-01-01 open Assets:Broker
+        2020-01-01 open Income:Gains
+        2020-01-01 open Equity:Opening-Balances
+        
+        2020-01-02 * "Initial Balance"
+          Assets:Bank  1000.00 USD
+          Equity:Opening-Balances
+        
+        2020-01-03 * "Buying"
+          Assets:Bank  -200.00 USD
+          Assets:Broker  2 IVV {100 USD}
+        
+        2020-01-04 price IVV 120 USD
+        
+        2020-01-05 * "Buying more"
+          Assets:Bank  -130.00 USD
+          Assets:Broker  1 IVV {130 USD}
+          
+        2020-01-06 price IVV 125 USD
+          
+        2020-01-07 * "Selling the 1st lot"
+          Assets:Bank  250.00 USD
+          Assets:Broker  -2 IVV {100 USD} @ 125 USD
+          Income:Gains  -50.00 USD
+        """
+        price_map = build_price_map(entries)
+        
+        bean_summator = BeanSummator(entries, options, accounts_re="Assets", aggregator_class=CostBasisAggregator, 
+                                     undo_log_size=10)
+        
+        result = bean_summator.sum_till_date(datetime.date(2020,1,6))
+        
+        self.assertIsInstance(result, CostBasisAggregator)
+        self.assertEqual(result.get_cost_basis(), InventoryAggregator({"Assets:Bank": "670.00 USD",
+                                                                     "Assets:Broker": "330 USD"}))
+        
+        # Market value of IVV is 3 * 125 USD, the book value is 330 USD
+        self.assertEqual(result.unrealized_gains("USD", price_map, datetime.date(2020,1,6)), 
+                         InventoryAggregator({"Assets:Broker": "45 USD"}))
+        
+        result = bean_summator.sum_till_date(datetime.date(2020,1,7))
+        self.assertEqual(result.get_cost_basis(), InventoryAggregator({"Assets:Bank": "920.00 USD",
+                                                                     "Assets:Broker": "130 USD"}))
+        self.assertEqual(result.unrealized_gains("USD", price_map, datetime.date(2020,1,7)), 
+                         InventoryAggregator({"Assets:Broker": "-5 USD"}))
+        
+        with self.subTest("Cost basis is reverted by rewinding"):
+            result = bean_summator.sum_till_date(datetime.date(2020,1,3))
+            
+            self.assertEqual(result.get_cost_basis(), InventoryAggregator({"Assets:Bank": "800.00 USD",
+                                                                         "Assets:Broker": "200 USD"}))
+            self.assertEqual(result.unrealized_gains("USD", price_map, datetime.date(2020,1,4)), 
+                             InventoryAggregator({"Assets:Broker": "40 USD"}))
+        
+        
 class TestBeanSummator(unittest.TestCase):
+    # Types of the entries and classes of the running sum, which the tested summator supports 
+    # (see TestParallelBeanSummator)
+    input_types = [list, iter]
+    aggregator_classes = [InventoryAggregator, CompactInventoryAggregator]
+    
     @loader.load_doc()
     def test_normal_cases(self, entries, errors, options):
         """
@@ -488,6 +1089,1072 @@ class TestBeanSummator(unittest.TestCase):
         self.assertEqual(result,expected)
         pprint(result)
         
+    @loader.load_doc()
+    def test_random_access_with_checkpoints(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank1
+        2020-01-01 open Equity:Opening-Balances
+        2020-01-01 open Income:Salary
+        
+        2020-01-02 * "Initial Balance"
+          Assets:Bank1  100.00 USD
+          Equity:Opening-Balances -100.00 USD
+        
+        2020-01-04 * "Salary"
+          Assets:Bank1  500.00 USD
+          Income:Salary -500.00 USD
+          
+        2020-01-04 * "Salary"
+          Assets:Bank1  10.00 EUR
+          Income:Salary -10.00 EUR
+          
+        2020-01-06 * "Salary"
+          Assets:Bank1  300.00 USD
+          Income:Salary -300.00 USD
+        
+        2020-01-08 * "Salary"
+          Assets:Bank1  1.00 USD
+          Income:Salary -1.00 USD
+        """
+        
+        test_dates = [datetime.date(2020,1,6),
+                      datetime.date(2020,1,2),
+                      datetime.date(2020,1,9),
+                      datetime.date(2020,1,4),
+                      datetime.date(2019,12,31),
+                      datetime.date(2020,1,5),
+                      datetime.date(2020,1,4),
+                      datetime.date(2020,1,8)]
+        
+        for checkpoint_every in [1, 2, 3, 100]:
+            bean_summator = BeanSummator(entries, 
+                                         options,
+                                         accounts_re ="Assets:Bank1",
+                                         checkpoint_every=checkpoint_every)
+            
+            for test_date in test_dates:
+                with self.subTest(checkpoint_every=checkpoint_every, test_date=test_date):
+                    # A new summator, which is only moving forward, is used as a reference
+                    expected = BeanSummator(entries, options, accounts_re ="Assets:Bank1").sum_till_date(test_date)
+                    result = bean_summator.sum_till_date(test_date)
+                    self.assertEqual(result, expected)
+                    
+    @loader.load_doc()
+    def test_compact_aggregator_class(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank1
+        2020-01-01 open Assets:Broker
+        2020-01-01 open Equity:Opening-Balances
+        2020-01-01 open Income:Salary
+        
+        2020-01-02 * "Initial Balance"
+          Assets:Bank1  100.00 USD
+          Equity:Opening-Balances
+        
+        2020-01-04 * "Salary"
+          Assets:Bank1  501.0005 USD
+          Income:Salary -500.50 EUR @ 1.001 USD
+          
+        2020-01-05 * "Buy"
+          Assets:Broker  3 IVV {100.123 USD}
+          Assets:Bank1  -300.369 USD
+          
+        2020-01-06 * "Salary"
+          Assets:Bank1  -300.131 USD
+          Income:Salary 300.131 USD
+        """
+        
+        test_dates = [datetime.date(2020,1,1),
+                      datetime.date(2020,1,4),
+                      datetime.date(2020,1,2),
+                      datetime.date(2020,1,5),
+                      datetime.date(2020,1,7)]
+        
+        for checkpoint_every in [1, 3]:
+            bean_summator = BeanSummator(entries, 
+                                         options,
+                                         accounts_re ="Assets|Income",
+                                         checkpoint_every=checkpoint_every,
+                                         aggregator_class=CompactInventoryAggregator)
+            
+            for test_date in test_dates:
+                with self.subTest(checkpoint_every=checkpoint_every, test_date=test_date):
+                    expected = BeanSummator(entries, options, accounts_re ="Assets|Income").sum_till_date(test_date)
+                    result = bean_summator.sum_till_date(test_date)
+                    self.assertIsInstance(result, InventoryAggregator)
+                    self.assertEqual(result, expected)
+                    
+    @loader.load_doc()
+    def test_extend(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank1
+        2020-01-01 open Income:Salary
+        
+        2020-01-02 * "Salary"
+          Assets:Bank1  100.00 USD
+          Income:Salary
+        
+        2020-01-04 * "Salary"
+          Assets:Bank1  200.00 USD
+          Income:Salary
+          
+        2020-01-06 * "Salary"
+          Assets:Bank1  300.00 USD
+          Income:Salary
+        
+        2020-01-06 * "Salary"
+          Assets:Bank1  400.00 EUR
+          Income:Salary
+        
+        2020-01-08 * "Salary"
+          Assets:Bank1  500.00 USD
+          Income:Salary
+        """
+        
+        transactions = [entry for entry in entries if isinstance(entry, Transaction)]
+        
+        test_dates = [datetime.date(2020,1,6), datetime.date(2020,1,8), datetime.date(2020,1,9)]
+        
+        for input_type in self.input_types:
+            for checkpoint_every in [None, 1]:
+                if input_type is iter and checkpoint_every is not None:
+                    continue
+                
+                with self.subTest(input_type=input_type, checkpoint_every=checkpoint_every):
+                    initial_entries = transactions[:2]
+                    bean_summator = BeanSummator(input_type(initial_entries), options, accounts_re="Assets", 
+                                                 checkpoint_every=checkpoint_every)
+                    
+                    self.assertEqual(bean_summator.sum_till_date(datetime.date(2020,1,5)), 
+                                     InventoryAggregator({"Assets:Bank1": "300.00 USD"}))
+                    
+                    bean_summator.extend(input_type(transactions[2:4]))
+                    bean_summator.extend(input_type(transactions[4:]))
+                    
+                    # The entries, provided by the caller, are not modified
+                    self.assertEqual(initial_entries, transactions[:2])
+                    
+                    for test_date in test_dates:
+                        expected = BeanSummator(transactions, options, accounts_re="Assets").sum_till_date(test_date)
+                        self.assertEqual(bean_summator.sum_till_date(test_date), expected)
+                        
+        with self.subTest("Extending with entries, dated before the last processed date, is refused"):
+            bean_summator = BeanSummator(transactions[:2], options, accounts_re="Assets")
+            bean_summator.sum_till_date(datetime.date(2020,1,7))
+            
+            with self.assertRaises(ValueError):
+                bean_summator.extend(transactions[2:])
+                
+            # The refused call has no effect
+            bean_summator.extend(transactions[4:])
+            self.assertEqual(bean_summator.sum_till_date(datetime.date(2020,1,8)), 
+                             InventoryAggregator({"Assets:Bank1": "800.00 USD"}))
+            
+        with self.subTest("Extending with entries, dated before the last known entry, is refused"):
+            bean_summator = BeanSummator(transactions[:4], options, accounts_re="Assets")
+            
+            with self.assertRaises(ValueError):
+                bean_summator.extend(transactions[1:2])
+                
+    @loader.load_doc()
+    def test_get_and_set_state(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank1
+        2020-01-01 open Assets:Bank2
+        2020-01-01 open Income:Salary
+        
+        2020-01-02 * "Salary"
+          Assets:Bank1  100.00 USD
+          Income:Salary
+        
+        2020-01-04 * "Salary"
+          Assets:Bank2  200.00 USD
+          Income:Salary
+          
+        2020-01-06 * "Salary"
+          Assets:Bank1  300.00 USD
+          Income:Salary
+        
+        2020-01-08 * "Salary"
+          Assets:Bank1  500.00 USD
+          Income:Salary
+        """
+        
+        test_dates = [datetime.date(2020,1,4), datetime.date(2020,1,6), datetime.date(2020,1,9)]
+        
+        for aggregator_class in self.aggregator_classes:
+            for checkpoint_every in [None, 1]:
+                with self.subTest(aggregator_class=aggregator_class, checkpoint_every=checkpoint_every):
+                    bean_summator = BeanSummator(entries, options, accounts_re="Assets", 
+                                                 aggregator_class=aggregator_class)
+                    
+                    # The entry on 2020-01-04 is read, but not processed
+                    bean_summator.sum_till_date(datetime.date(2020,1,3))
+                    state = pickle.loads(pickle.dumps(bean_summator.get_state()))
+                    
+                    restored_bean_summator = BeanSummator(entries[state['num_consumed_entries']:], options, 
+                                                          accounts_re="Assets", checkpoint_every=checkpoint_every,
+                                                          aggregator_class=aggregator_class)
+                    restored_bean_summator.set_state(state)
+                    
+                    # With checkpoints the first date is requested again after the last one
+                    for test_date in test_dates + test_dates[:bool(checkpoint_every)]:
+                        expected = BeanSummator(entries, options, accounts_re="Assets").sum_till_date(test_date)
+                        self.assertEqual(restored_bean_summator.sum_till_date(test_date), expected)
+                        
+                    # Dates before the restored state cannot be requested
+                    with self.assertRaises(ValueError):
+                        restored_bean_summator.sum_till_date(datetime.date(2020,1,2))
+        
+        with self.subTest("State of a summator with a different config is refused"):
+            bean_summator = BeanSummator(entries, options, accounts_re="Assets")
+            bean_summator.sum_till_date(datetime.date(2020,1,3))
+            
+            with self.assertRaises(ValueError):
+                BeanSummator(entries, options, accounts_re="Assets", num_acc_components_from_root=1).set_state(bean_summator.get_state())
+                
+            with self.assertRaises(ValueError):
+                BeanSummator(entries, options, accounts_re="Assets", 
+                             aggregator_class=CompactInventoryAggregator).set_state(bean_summator.get_state())
+                
+        with self.subTest("State cannot be set after a sum is requested"):
+            used_bean_summator = BeanSummator(entries, options, accounts_re="Assets")
+            used_bean_summator.sum_till_date(datetime.date(2020,1,3))
+            
+            with self.assertRaises(ValueError):
+                used_bean_summator.set_state(bean_summator.get_state())
+                
+    @loader.load_doc()
+    def test_iterator_input(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank1
+        2020-01-01 open Income:Salary
+        
+        2020-01-02 * "Salary"
+          Assets:Bank1  100.00 USD
+          Income:Salary
+        
+        2020-01-04 * "Salary"
+          Assets:Bank1  200.00 USD
+          Income:Salary
+          
+        2020-01-06 * "Salary"
+          Assets:Bank1  300.00 USD
+          Income:Salary
+        """
+        
+        def read_entries():
+            # Simulates reading of entries, e.g. from disk, one by one
+            for entry in entries:
+                yield entry
+        
+        bean_summator = BeanSummator(read_entries(), options, accounts_re="Assets")
+        
+        # No reference to the entries is kept
+        self.assertIsNone(bean_summator.entries)
+        
+        for test_date in [datetime.date(2020,1,1), datetime.date(2020,1,4), datetime.date(2020,1,5), datetime.date(2020,1,7)]:
+            with self.subTest(test_date=test_date):
+                expected = BeanSummator(entries, options, accounts_re="Assets").sum_till_date(test_date)
+                self.assertEqual(bean_summator.sum_till_date(test_date), expected)
+                
+        with self.subTest("Checkpoints require a sequence"):
+            with self.assertRaises(ValueError):
+                BeanSummator(read_entries(), options, accounts_re="Assets", checkpoint_every=1)
+                
+        with self.subTest("Entries, which are not sorted by date, are detected"):
+            transactions = [entry for entry in entries if isinstance(entry, Transaction)]
+            bean_summator = BeanSummator(iter([transactions[1], transactions[0], transactions[2]]), options, 
+                                         accounts_re="Assets")
+            
+            with self.assertRaises(ValueError):
+                bean_summator.sum_till_date(datetime.date(2020,1,7))
+                
+    @loader.load_doc()
+    def test_snapshot_cache(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank1
+        2020-01-01 open Income:Salary
+        
+        2020-01-15 * "Salary"
+          Assets:Bank1  100.00 USD
+          Income:Salary
+        
+        2020-02-15 * "Salary"
+          Assets:Bank1  200.00 USD
+          Income:Salary
+          
+        2020-03-15 * "Salary"
+          Assets:Bank1  300.00 USD
+          Income:Salary
+        
+        2020-04-15 * "Salary"
+          Assets:Bank1  400.00 USD
+          Income:Salary
+          
+        2020-05-15 * "Salary"
+          Assets:Bank1  500.00 USD
+          Income:Salary
+        """
+        
+        class CountingBeanSummator(BeanSummator):
+            def _process_entry(self, entry):
+                self.num_process_entry_calls = getattr(self, 'num_process_entry_calls', 0) + 1
+                super()._process_entry(entry)
+        
+        test_date = datetime.date(2020,4,30)
+        expected = BeanSummator(entries, options, accounts_re="Assets").sum_till_date(test_date)
+        
+        with tempfile.TemporaryDirectory() as cache_dir:
+            snapshot_cache = SnapshotCache(cache_dir)
+            
+            with self.subTest("1st run stores the month end sums"):
+                bean_summator = CountingBeanSummator(entries, options, accounts_re="Assets", snapshot_cache=snapshot_cache)
+                self.assertEqual(bean_summator.sum_till_date(test_date), expected)
+                self.assertEqual(bean_summator.num_process_entry_calls, 6)
+                
+                # Month ends 2020-01-31, 2020-02-29, 2020-03-31 and 2020-04-30 (stored, when the May entry is read)
+                self.assertEqual(len(list(Path(cache_dir).iterdir())), 4)
+                
+            with self.subTest("2nd run over the same ledger resumes from the latest month end before the date"):
+                bean_summator = CountingBeanSummator(entries, options, accounts_re="Assets", snapshot_cache=snapshot_cache)
+                self.assertEqual(bean_summator.sum_till_date(test_date), expected)
+                self.assertEqual(bean_summator.num_process_entry_calls, 1)
+                
+            with self.subTest("Run over an extended ledger resumes and stores new month ends"):
+                extended_entries = entries + [entry._replace(date=datetime.date(2020,6,15)) for entry in entries[-1:]]
+                bean_summator = CountingBeanSummator(extended_entries, options, accounts_re="Assets", snapshot_cache=snapshot_cache)
+                self.assertEqual(bean_summator.sum_till_date(datetime.date(2020,6,30)), 
+                                 InventoryAggregator({"Assets:Bank1": "2000.00 USD"}))
+                self.assertEqual(bean_summator.num_process_entry_calls, 2)
+                self.assertEqual(len(list(Path(cache_dir).iterdir())), 5)
+                
+            with self.subTest("Run over a changed ledger does not use the stale month ends"):
+                changed_entries = list(entries)
+                changed_entries[3] = changed_entries[3]._replace(narration="Changed salary", postings=[
+                    changed_entries[3].postings[0]._replace(units=A(D("150.00"), "USD"))])
+                
+                bean_summator = CountingBeanSummator(changed_entries, options, accounts_re="Assets", snapshot_cache=snapshot_cache)
+                
+                self.assertEqual(bean_summator.sum_till_date(test_date), InventoryAggregator({"Assets:Bank1": "950.00 USD"}))
+                # The January month end is still valid
+                self.assertEqual(bean_summator.num_process_entry_calls, 3)
+                
+            with self.subTest("Summator with another config does not use the month ends"):
+                bean_summator = CountingBeanSummator(entries, options, accounts_re="Assets", num_acc_components_from_root=1,
+                                                     snapshot_cache=snapshot_cache)
+                self.assertEqual(bean_summator.sum_till_date(test_date), InventoryAggregator({"Assets": "1000.00 USD"}))
+                self.assertEqual(bean_summator.num_process_entry_calls, 6)
+                
+            with self.subTest("Changed tags do not use the stale month ends of a summator with a posting filter"):
+                posting_filter = PostingFilter(tags={"trip"})
+                tagged_entries = [entry._replace(tags=frozenset({"trip"})) if isinstance(entry, Transaction) else entry 
+                                  for entry in entries]
+                
+                bean_summator = CountingBeanSummator(tagged_entries, options, accounts_re="Assets", 
+                                                     snapshot_cache=snapshot_cache, posting_filter=posting_filter)
+                self.assertEqual(bean_summator.sum_till_date(test_date), expected)
+                
+                # The tag of the February salary is removed
+                changed_entries = list(tagged_entries)
+                changed_entries[3] = changed_entries[3]._replace(tags=frozenset())
+                
+                bean_summator = CountingBeanSummator(changed_entries, options, accounts_re="Assets", 
+                                                     snapshot_cache=snapshot_cache, posting_filter=posting_filter)
+                self.assertEqual(bean_summator.sum_till_date(test_date), InventoryAggregator({"Assets:Bank1": "800.00 USD"}))
+                # The January month end is still valid
+                self.assertEqual(bean_summator.num_process_entry_calls, 3)
+                
+            with self.subTest("Snapshot cache requires a sequence"):
+                with self.assertRaises(ValueError):
+                    BeanSummator(iter(entries), options, accounts_re="Assets", snapshot_cache=snapshot_cache)
+                
+    @loader.load_doc()
+    def test_rewind_to(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank1
+        2020-01-01 open Assets:Bank2
+        2020-01-01 open Income:Salary
+        
+        2020-01-02 * "Salary"
+          Assets:Bank1  100.00 USD
+          Income:Salary
+        
+        2020-01-04 * "Salary"
+          Assets:Bank1  200.00 USD
+          Income:Salary
+          
+        2020-01-04 * "Salary"
+          Assets:Bank2  10.00 EUR
+          Income:Salary
+          
+        2020-01-06 * "Salary"
+          Assets:Bank1  300.00 USD
+          Income:Salary
+        
+        2020-01-08 * "Salary"
+          Assets:Bank1  -600.00 USD
+          Income:Salary
+        """
+        
+        test_dates = [datetime.date(2020,1,9),
+                      datetime.date(2020,1,7),
+                      datetime.date(2020,1,8),
+                      datetime.date(2020,1,3),
+                      datetime.date(2020,1,6),
+                      datetime.date(2020,1,1),
+                      datetime.date(2020,1,4)]
+        
+        for checkpoint_every in [None, 2]:
+            bean_summator = BeanSummator(entries, options, accounts_re="Assets", undo_log_size=100, 
+                                         checkpoint_every=checkpoint_every)
+            
+            for test_date in test_dates:
+                with self.subTest(checkpoint_every=checkpoint_every, test_date=test_date):
+                    expected = BeanSummator(entries, options, accounts_re="Assets").sum_till_date(test_date)
+                    result = bean_summator.sum_till_date(test_date)
+                    
+                    # Assets:Bank2 is not in the sum before 2020-01-04 and Assets:Bank1 is empty after 2020-01-08
+                    self.assertEqual(list(result.items()), list(expected.items()))
+                    
+        with self.subTest("Rewinding is limited by the size of the undo log"):
+            bean_summator = BeanSummator(entries, options, accounts_re="Assets", undo_log_size=2)
+            bean_summator.sum_till_date(datetime.date(2020,1,9))
+            
+            # The last 2 entries are on 2020-01-06 and 2020-01-08
+            bean_summator.rewind_to(datetime.date(2020,1,4))
+            self.assertEqual(bean_summator.sum_till_date(datetime.date(2020,1,4)), 
+                             InventoryAggregator({"Assets:Bank1": "300.00 USD", "Assets:Bank2": "10.00 EUR"}))
+            
+            bean_summator.sum_till_date(datetime.date(2020,1,9))
+            
+            with self.assertRaises(ValueError):
+                bean_summator.rewind_to(datetime.date(2020,1,3))
+                
+            with self.assertRaises(ValueError):
+                bean_summator.sum_till_date(datetime.date(2020,1,3))
+                
+        with self.subTest("Rewinding is reflected in the deltas"):
+            bean_summator = BeanSummator(entries, options, accounts_re="Assets", undo_log_size=100)
+            bean_summator.sum_till_date(datetime.date(2020,1,6))
+            
+            self.assertEqual(bean_summator.deltas_since_last(datetime.date(2020,1,3)), 
+                             InventoryAggregator({"Assets:Bank1": "-500.00 USD", "Assets:Bank2": "-10.00 EUR"}))
+                
+        with self.subTest("Undo log requires InventoryAggregator"):
+            with self.assertRaises(ValueError):
+                BeanSummator(entries, options, accounts_re="Assets", undo_log_size=100, 
+                             aggregator_class=CompactInventoryAggregator)
+                
+        with self.subTest("Rewinding requires the undo log"):
+            with self.assertRaises(ValueError):
+                BeanSummator(entries, options, accounts_re="Assets").rewind_to(datetime.date(2020,1,3))
+                
+    @loader.load_doc()
+    def test_rewind_to_with_aggregator_classes(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank1:Checking
+        2020-01-01 open Assets:Bank2:Savings
+        2020-01-01 open Assets:Broker
+        2020-01-01 open Income:Salary
+        
+        2020-01-02 * "Salary"
+          Assets:Bank1:Checking  1000.00 USD
+          Income:Salary
+        
+        2020-01-03 * "Buy"
+          Assets:Broker  2 IVV {100 USD}
+          Assets:Bank1:Checking  -200.00 USD
+          
+        2020-01-05 * "Salary"
+          Assets:Bank2:Savings  10.00 EUR
+          Income:Salary
+          
+        2020-01-06 * "Buy"
+          Assets:Broker  1 IVV {110 USD}
+          Assets:Bank1:Checking  -110.00 USD
+          
+        2020-01-08 * "Sell"
+          Assets:Broker  -2 IVV {100 USD}
+          Assets:Bank1:Checking  220.00 USD
+          Income:Salary
+        """
+        # The aggregators, which override __delitem__, maintain additional sums, which must be rewound as well
+        test_dates = [datetime.date(2020,1,9),
+                      datetime.date(2020,1,7),
+                      datetime.date(2020,1,4),
+                      datetime.date(2020,1,6),
+                      datetime.date(2020,1,2),
+                      datetime.date(2020,1,1),
+                      datetime.date(2020,1,8),
+                      datetime.date(2020,1,5)]
+        
+        for aggregator_class in [InventoryAggregator, AccountTreeAggregator, CostBasisAggregator]:
+            for checkpoint_every in [None, 2]:
+                bean_summator = BeanSummator(entries, options, accounts_re="Assets", undo_log_size=100, 
+                                             checkpoint_every=checkpoint_every, aggregator_class=aggregator_class)
+                
+                for test_date in test_dates:
+                    with self.subTest(aggregator_class=aggregator_class.__name__, checkpoint_every=checkpoint_every, 
+                                      test_date=test_date):
+                        expected = BeanSummator(entries, options, accounts_re="Assets", 
+                                                aggregator_class=aggregator_class).sum_till_date(test_date)
+                        result = bean_summator.sum_till_date(test_date)
+                        
+                        self.assertIsInstance(result, aggregator_class)
+                        self.assertEqual(list(result.items()), list(expected.items()))
+                        
+                        if aggregator_class is AccountTreeAggregator:
+                            self.assertEqual(result._get_totals(), expected._get_totals())
+                            for depth in range(1, 4):
+                                self.assertEqual(result.at_depth(depth), expected.at_depth(depth))
+                                
+                        if aggregator_class is CostBasisAggregator:
+                            self.assertEqual(result.get_cost_basis(), expected.get_cost_basis())
+                            
+    @loader.load_doc()
+    def test_stats(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank
+        2020-01-01 open Expenses:Food
+        2020-01-01 open Expenses:Travel
+        
+        2020-01-02 * "Groceries"
+          Assets:Bank  -10.00 USD
+          Expenses:Food
+          
+        2020-01-03 * "Flight" #trip
+          Assets:Bank  -100.00 USD
+          Expenses:Travel
+          
+        2020-01-05 * "Restaurant"
+          Assets:Bank  -20.00 USD
+          Expenses:Food
+        """
+        stats = SummatorStats()
+        bean_summator = BeanSummator(entries, options, accounts_re="Assets", 
+                                     posting_filter=PostingFilter(exclude_tags={"trip"}), stats=stats)
+        
+        bean_summator.sum_till_date(datetime.date(2020,1,2))
+        
+        self.assertEqual((stats.entries_scanned, stats.postings_matched, stats.postings_skipped), (4, 1, 1))
+        
+        # The pending entry of 2020-01-03 is after the date, so no entry is read
+        bean_summator.sum_till_date(datetime.date(2020,1,2))
+        bean_summator.sum_till_date(datetime.date(2020,1,5))
+        
+        expected = {'entries_scanned': 6, 'postings_matched': 2, 'postings_skipped': 4, 'snapshots_copied': 3, 
+                    'early_returns': 1, 'advance_calls': 3}
+        
+        self.assertEqual({name: value for name, value in stats.as_dict().items() if name in expected}, expected)
+        self.assertGreater(stats.bytes_copied, 0)
+        self.assertGreater(stats.elapsed_seconds, 0)
+        self.assertIn('entries_scanned', str(stats))
+        
+        stats.reset()
+        self.assertEqual(set(stats.as_dict().values()), {0})
+        
+        # The stats are not collected by default
+        self.assertIsNone(BeanSummator(entries, options, accounts_re="Assets").stats)
+                
+    @loader.load_doc()
+    def test_posting_filter(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank
+        2020-01-01 open Assets:Bank:Savings
+        2020-01-01 open Expenses:Travel
+        2020-01-01 open Expenses:Food
+        
+        2020-01-02 * "Airline" "Flight" #trip
+          Assets:Bank  -100.00 USD
+          Expenses:Travel
+          
+        2020-01-03 * "Hotel" #trip
+          category: "hotel"
+          Assets:Bank:Savings  -50.00 USD
+          Expenses:Travel
+          
+        2020-01-04 * "Groceries"
+          Assets:Bank  -10.00 USD
+          Expenses:Food
+          
+        2020-01-05 * "Restaurant" #trip
+          Assets:Bank  -20.00 USD
+          Expenses:Food
+        """
+        test_dates = [datetime.date(2020,1,2), datetime.date(2020,1,4), datetime.date(2020,1,5)]
+        
+        for posting_filter in [PostingFilter(tags={"trip"}), 
+                               PostingFilter(tags={"trip"}, exclude_account_re="Savings"),
+                               PostingFilter(payee_re="Hotel|Restaurant", meta={"category": "hotel"})]:
+            with self.subTest(posting_filter=posting_filter):
+                # The same result as summing the pre-filtered copy of the entries
+                filtered_entries = [entry for entry in entries 
+                                    if not isinstance(entry, Transaction) or posting_filter.matches_entry(entry)]
+                
+                for accounts_re in ["Assets", "Expenses"]:
+                    bean_summator = BeanSummator(entries, options, accounts_re, posting_filter=posting_filter, 
+                                                 undo_log_size=10)
+                    
+                    for test_date in test_dates:
+                        expected = BeanSummator(filtered_entries, options, accounts_re).sum_till_date(test_date)
+                        for account in [account for account in expected if not posting_filter.matches_account(account)]:
+                            del expected[account]
+                            
+                        self.assertEqual(bean_summator.sum_till_date(test_date), expected)
+                        
+                    # The posting filter is also applied, when the entries are subtracted by rewinding
+                    self.assertEqual(bean_summator.sum_till_date(datetime.date(2020,1,2)), 
+                                     BeanSummator(filtered_entries, options, accounts_re, 
+                                                  posting_filter=posting_filter).sum_till_date(datetime.date(2020,1,2)))
+                    
+                    # The state, which includes the posting filter, can be pickled
+                    state = pickle.loads(pickle.dumps(bean_summator.get_state()))
+                    restored_bean_summator = BeanSummator(entries[state['num_consumed_entries']:], options, accounts_re, 
+                                                          posting_filter=posting_filter)
+                    restored_bean_summator.set_state(state)
+                    self.assertEqual(restored_bean_summator.sum_till_date(datetime.date(2020,1,5)), 
+                                     bean_summator.sum_till_date(datetime.date(2020,1,5)))
+                    
+        multi_view_summator = MultiViewBeanSummator(entries, options, views={"assets": ("Assets", 100), 
+                                                                             "expenses": ("Expenses", 100)},
+                                                    posting_filter=PostingFilter(tags={"trip"}))
+        
+        self.assertEqual(multi_view_summator.sum_till_date(datetime.date(2020,1,5)), 
+                         {"assets": InventoryAggregator({"Assets:Bank": "-120.00 USD", 
+                                                         "Assets:Bank:Savings": "-50.00 USD"}),
+                          "expenses": InventoryAggregator({"Expenses:Travel": "150.00 USD", 
+                                                           "Expenses:Food": "20.00 USD"})})
+        
+    def test_wrong_checkpoint_every(self):
+        with self.assertRaises(ValueError):
+            BeanSummator([], {}, accounts_re="Assets", checkpoint_every=0)
+        
+    @loader.load_doc()
+    def test_resolved_accounts_cache(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank1:Checking
+        2020-01-01 open Assets:Bank2
+        2020-01-01 open Income:Salary
+        
+        2020-01-02 * "Salary"
+          Assets:Bank1:Checking  100.00 USD
+          Income:Salary -100.00 USD
+        
+        2020-01-04 * "Salary"
+          Assets:Bank1:Checking  100.00 USD
+          Assets:Bank2  100.00 USD
+          Income:Salary -200.00 USD
+        """
+        
+        bean_summator = BeanSummator(entries, 
+                                     options,
+                                     accounts_re ="Assets",
+                                     num_acc_components_from_root = 2)
+        
+        result = bean_summator.sum_till_date(datetime.date(2020,1,4))
+        expected = InventoryAggregator({'Assets:Bank1': "200.00 USD",
+                                        'Assets:Bank2': "100.00 USD"})
+        self.assertEqual(result, expected)
+        
+        # Each account is resolved only once, the not matching accounts are cached as None
+        self.assertEqual(bean_summator._resolved_accounts, {'Assets:Bank1:Checking': 'Assets:Bank1',
+                                                            'Assets:Bank2': 'Assets:Bank2',
+                                                            'Income:Salary': None})
+        
+    @loader.load_doc()
+    def test_results_not_changed_by_later_calls(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank1
+        2020-01-01 open Assets:Bank2
+        2020-01-01 open Income:Salary
+        
+        2020-01-02 * "Salary"
+          Assets:Bank1  100.00 USD
+          Assets:Bank2  100.00 USD
+          Income:Salary -200.00 USD
+        
+        2020-01-04 * "Salary"
+          Assets:Bank1  100.00 USD
+          Income:Salary -100.00 USD
+        """
+        
+        bean_summator = BeanSummator(entries, options, accounts_re ="Assets")
+        
+        result_2 = bean_summator.sum_till_date(datetime.date(2020,1,2))
+        result_4 = bean_summator.sum_till_date(datetime.date(2020,1,4))
+        
+        self.assertEqual(result_2, InventoryAggregator({'Assets:Bank1': "100.00 USD", 'Assets:Bank2': "100.00 USD"}))
+        self.assertEqual(result_4, InventoryAggregator({'Assets:Bank1': "200.00 USD", 'Assets:Bank2': "100.00 USD"}))
+        
+        # The not changed account shares the Inventory between the results
+        self.assertIs(result_2['Assets:Bank2'], result_4['Assets:Bank2'])
+        
+        with self.subTest("Result modified via add_amount"):
+            result_4.add_amount('Assets:Bank2', A(D("5.00"), "USD"))
+            result_4['Assets:Bank3'] = I("1.00 EUR")
+            
+            self.assertEqual(result_2['Assets:Bank2'], I("100.00 USD"))
+            self.assertEqual(bean_summator.sum_till_date(datetime.date(2020,1,4)), 
+                             InventoryAggregator({'Assets:Bank1': "200.00 USD", 'Assets:Bank2': "100.00 USD"}))
+            
+        with self.subTest("Copy of the result modified directly"):
+            result_copy = copy.copy(bean_summator.sum_till_date(datetime.date(2020,1,4)))
+            result_copy['Assets:Bank1'].add_amount(A(D("5.00"), "USD"))
+            
+            self.assertEqual(bean_summator.sum_till_date(datetime.date(2020,1,4)), 
+                             InventoryAggregator({'Assets:Bank1': "200.00 USD", 'Assets:Bank2': "100.00 USD"}))
+        
+    @loader.load_doc()
+    def test_sum_between_and_deltas_since_last(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank1
+        2020-01-01 open Assets:Bank2
+        2020-01-01 open Income:Salary
+        
+        2020-01-02 * "Salary"
+          Assets:Bank1  100.00 USD
+          Assets:Bank2  100.00 USD
+          Income:Salary -200.00 USD
+        
+        2020-01-04 * "Salary"
+          Assets:Bank1  100.00 USD
+          Income:Salary -100.00 USD
+          
+        2020-01-05 * "Salary"
+          Assets:Bank2  10.00 EUR
+          Income:Salary -10.00 EUR
+        
+        2020-01-06 * "Salary"
+          Assets:Bank1  50.00 USD
+          Income:Salary -50.00 USD
+        """
+        
+        with self.subTest("sum_between"):
+            bean_summator = BeanSummator(entries, options, accounts_re ="Assets")
+            
+            result = bean_summator.sum_between(datetime.date(2020,1,2), datetime.date(2020,1,5))
+            self.assertEqual(result, InventoryAggregator({'Assets:Bank1': "100.00 USD", 'Assets:Bank2': "10.00 EUR"}))
+            
+            # Only the touched account is returned
+            result = bean_summator.sum_between(datetime.date(2020,1,5), datetime.date(2020,1,6))
+            self.assertEqual(result, InventoryAggregator({'Assets:Bank1': "50.00 USD"}))
+            
+            # The running sum is still correct
+            result = bean_summator.sum_till_date(datetime.date(2020,1,6))
+            self.assertEqual(result, InventoryAggregator({'Assets:Bank1': "250.00 USD", 'Assets:Bank2': "100.00 USD, 10.00 EUR"}))
+            
+            with self.assertRaises(ValueError):
+                bean_summator.sum_between(datetime.date(2020,1,6), datetime.date(2020,1,5))
+                
+        with self.subTest("deltas_since_last"):
+            bean_summator = BeanSummator(entries, options, accounts_re ="Assets")
+            
+            result = bean_summator.deltas_since_last(datetime.date(2020,1,2))
+            self.assertEqual(result, InventoryAggregator({'Assets:Bank1': "100.00 USD", 'Assets:Bank2': "100.00 USD"}))
+            
+            result = bean_summator.deltas_since_last(datetime.date(2020,1,3))
+            self.assertEqual(result, InventoryAggregator())
+            
+            result = bean_summator.deltas_since_last(datetime.date(2020,1,5))
+            self.assertEqual(result, InventoryAggregator({'Assets:Bank1': "100.00 USD", 'Assets:Bank2': "10.00 EUR"}))
+            
+            with self.assertRaises(ValueError):
+                bean_summator.deltas_since_last(datetime.date(2020,1,4))
+                
+            result = bean_summator.sum_till_date(datetime.date(2020,1,6))
+            self.assertEqual(result, InventoryAggregator({'Assets:Bank1': "250.00 USD", 'Assets:Bank2': "100.00 USD, 10.00 EUR"}))
+        
+    @loader.load_doc()
+    def test_sum_at_dates(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank1
+        2020-01-01 open Income:Salary
+        
+        2020-01-02 * "Salary"
+          Assets:Bank1  100.00 USD
+          Income:Salary -100.00 USD
+        
+        2020-01-04 * "Salary"
+          Assets:Bank1  100.00 USD
+          Income:Salary -100.00 USD
+        """
+        
+        dates = [datetime.date(2020,1,1), datetime.date(2020,1,2), datetime.date(2020,1,2), datetime.date(2020,1,5)]
+        
+        bean_summator = BeanSummator(entries, options, accounts_re ="Assets")
+        
+        # Also checking, that a generator of dates is accepted
+        result = list(bean_summator.sum_at_dates(date for date in dates))
+        
+        expected = [(datetime.date(2020,1,1), InventoryAggregator()),
+                    (datetime.date(2020,1,2), InventoryAggregator({'Assets:Bank1': "100.00 USD"})),
+                    (datetime.date(2020,1,2), InventoryAggregator({'Assets:Bank1': "100.00 USD"})),
+                    (datetime.date(2020,1,5), InventoryAggregator({'Assets:Bank1': "200.00 USD"}))]
+        
+        self.assertEqual(result, expected)
+        
+        bean_summator = BeanSummator(entries, options, accounts_re ="Assets")
+        with self.assertRaises(ValueError):
+            list(bean_summator.sum_at_dates([datetime.date(2020,1,4), datetime.date(2020,1,2)]))
+        
+class _InProcessParallelBeanSummator(ParallelBeanSummator):
+    """
+    ParallelBeanSummator with small chunks, summed in the current process, so that the chunks and the prefix sums are
+    exercised by the small ledgers of the TestBeanSummator cases
+    """
+    def __init__(self, entries, options, accounts_re, num_acc_components_from_root=100, checkpoint_every=None, **kwargs):
+        super().__init__(entries, options, accounts_re, num_acc_components_from_root, 
+                         checkpoint_every=2 if checkpoint_every is None else checkpoint_every, num_workers=1, **kwargs)
+        
+        
+class TestParallelBeanSummator(TestBeanSummator):
+    """
+    Runs the TestBeanSummator cases with the ParallelBeanSummator in place of the BeanSummator, the serial summator is 
+    the correctness oracle
+    """
+    input_types = [list]
+    aggregator_classes = [InventoryAggregator]
+    
+    def setUp(self):
+        self.serial_bean_summator_class = BeanSummator
+        
+        patcher = mock.patch(f'{__name__}.BeanSummator', _InProcessParallelBeanSummator)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        
+    def test_calling_dates_in_wrong_sequence(self):
+        self.skipTest('Dates can be requested in any order, as with checkpoints')
+        
+    def test_compact_aggregator_class(self):
+        self.skipTest('CompactInventoryAggregator is not supported')
+        
+    def test_iterator_input(self):
+        self.skipTest('Entries must be a sequence')
+        
+    def test_snapshot_cache(self):
+        self.skipTest('snapshot_cache is not supported')
+        
+    def test_rewind_to(self):
+        self.skipTest('Restoring a checkpoint clears the undo log, so the size of the undo log does not limit the dates')
+        
+    def test_stats(self):
+        self.skipTest('The entries of the chunks are summed without the stats')
+        
+    @loader.load_doc()
+    def test_process_pool(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank1
+        2020-01-01 open Assets:Bank2
+        2020-01-01 open Income:Salary
+        
+        2020-01-02 * "Salary"
+          Assets:Bank1  100.00 USD
+          Income:Salary
+        
+        2020-01-02 * "Salary"
+          Assets:Bank2  10.00 EUR
+          Income:Salary
+          
+        2020-01-03 * "Transfer"
+          Assets:Bank1  -100.00 USD
+          Assets:Bank2  100.00 USD
+          
+        2020-01-05 * "Salary"
+          Assets:Bank1  50.00 USD
+          Income:Salary
+          
+        2020-01-06 * "Salary"
+          Assets:Bank2  -10.00 EUR
+          Income:Salary
+          
+        2020-01-08 * "Salary"
+          Assets:Bank1  20.00 USD
+          Income:Salary
+        """
+        serial_bean_summator = self.serial_bean_summator_class(entries, options, accounts_re="Assets")
+        
+        parallel_bean_summator = ParallelBeanSummator(entries[:-1], options, accounts_re="Assets", checkpoint_every=2, 
+                                                      num_workers=2)
+        
+        for test_date in [datetime.date(2020,1,6), datetime.date(2020,1,1), datetime.date(2020,1,2), 
+                          datetime.date(2020,1,3)]:
+            with self.subTest(test_date=test_date):
+                expected = self.serial_bean_summator_class(entries, options, accounts_re="Assets").sum_till_date(test_date)
+                self.assertEqual(parallel_bean_summator.sum_till_date(test_date), expected)
+        
+        # The chunks of the appended entries are summed in parallel as well
+        parallel_bean_summator.extend(entries[-1:])
+        
+        self.assertEqual(parallel_bean_summator.sum_till_date(datetime.date(2020,1,9)), 
+                         serial_bean_summator.sum_till_date(datetime.date(2020,1,9)))
+        self.assertEqual(len(parallel_bean_summator._checkpoints), 1 + len(entries) // 2)
+        
+    @loader.load_doc()
+    def test_default_process_pool(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank1
+        2020-01-01 open Assets:Bank2
+        2020-01-01 open Income:Salary
+        
+        2020-01-02 * "Salary"
+          Assets:Bank1  100.00 USD
+          Income:Salary
+        
+        2020-01-02 * "Salary"
+          Assets:Bank2  10.00 EUR
+          Income:Salary
+          
+        2020-01-03 * "Transfer"
+          Assets:Bank1  -100.00 USD
+          Assets:Bank2  100.00 USD
+          
+        2020-01-05 * "Salary"
+          Assets:Bank1  50.00 USD
+          Income:Salary
+          
+        2020-01-06 * "Salary"
+          Assets:Bank2  -10.00 EUR
+          Income:Salary
+        """
+        # With the default chunk size (4 chunks per worker) the chunks are summed by a ProcessPoolExecutor with 2 workers
+        with mock.patch('evbeantools.summator.ProcessPoolExecutor', wraps=ProcessPoolExecutor) as executor_class:
+            parallel_bean_summator = ParallelBeanSummator(entries, options, accounts_re="Assets", num_workers=2)
+            
+            for test_date in [datetime.date(2020,1,6), datetime.date(2020,1,2), datetime.date(2020,1,4)]:
+                with self.subTest(test_date=test_date):
+                    expected = self.serial_bean_summator_class(entries, options, accounts_re="Assets").sum_till_date(test_date)
+                    self.assertEqual(parallel_bean_summator.sum_till_date(test_date), expected)
+                    
+        executor_class.assert_called_once()
+        self.assertEqual(executor_class.call_args.kwargs['max_workers'], 2)
+        self.assertEqual(len(parallel_bean_summator._checkpoints), 1 + len(entries))
+        
+    @loader.load_doc()
+    def test_process_pool_with_posting_filter(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank1
+        2020-01-01 open Assets:Bank2
+        2020-01-01 open Income:Salary
+        
+        2020-01-02 * "Salary" #trip
+          Assets:Bank1  100.00 USD
+          Income:Salary
+        
+        2020-01-02 * "Salary"
+          Assets:Bank2  10.00 EUR
+          Income:Salary
+          
+        2020-01-03 * "Transfer" #trip
+          Assets:Bank1  -100.00 USD
+          Assets:Bank2  100.00 USD
+          
+        2020-01-05 * "Salary" #trip
+          Assets:Bank1  50.00 USD
+          Income:Salary
+          
+        2020-01-06 * "Salary"
+          Assets:Bank2  -10.00 EUR
+          Income:Salary
+        """
+        # The posting filter is pickled to the worker processes
+        posting_filter = PostingFilter(tags={"trip"}, exclude_account_re="Bank2")
+        
+        parallel_bean_summator = ParallelBeanSummator(entries, options, accounts_re="Assets", checkpoint_every=2, 
+                                                      num_workers=2, posting_filter=posting_filter)
+        
+        for test_date in [datetime.date(2020,1,6), datetime.date(2020,1,2), datetime.date(2020,1,3)]:
+            with self.subTest(test_date=test_date):
+                expected = self.serial_bean_summator_class(entries, options, accounts_re="Assets", 
+                                                           posting_filter=posting_filter).sum_till_date(test_date)
+                self.assertEqual(parallel_bean_summator.sum_till_date(test_date), expected)
+        
+        
+class TestMultiViewBeanSummator(unittest.TestCase):
+    @loader.load_doc()
+    def test_same_as_separate_summators(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank1:Checking
+        2020-01-01 open Assets:Bank2
+        2020-01-01 open Liabilities:CreditCard
+        2020-01-01 open Equity:Opening-Balances
+        2020-01-01 open Expenses:Food:Restaurant
+        2020-01-01 open Income:Salary
+        
+        2020-01-02 * "Initial Balance"
+          Assets:Bank1:Checking  100.00 USD
+          Equity:Opening-Balances -100.00 USD
+        
+        2020-01-04 * "Salary"
+          Assets:Bank2  500.00 EUR
+          Income:Salary -500.00 EUR
+          
+        2020-01-05 * "Restaurant"
+          Liabilities:CreditCard  -50.00 USD
+          Expenses:Food:Restaurant  50.00 USD
+        """
+        
+        views = {"bal_sheet": ("Assets|Liabilities", 100),
+                 "bal_sheet_short": ("Assets|Liabilities", 1),
+                 "p_and_l": ("Income|Expenses|Equity", 2)}
+        
+        multi_view_summator = MultiViewBeanSummator(entries, options, views)
+        separate_summators = {view_name: BeanSummator(entries, options, accounts_re, num_acc_components_from_root)
+                              for view_name, (accounts_re, num_acc_components_from_root) in views.items()}
+        
+        for test_date in [datetime.date(2020,1,1), datetime.date(2020,1,4), datetime.date(2020,1,6)]:
+            with self.subTest(test_date=test_date):
+                result = multi_view_summator.sum_till_date(test_date)
+                expected = {view_name: summator.sum_till_date(test_date) 
+                            for view_name, summator in separate_summators.items()}
+                self.assertEqual(result, expected)
+                
+        self.assertEqual(result["bal_sheet_short"], InventoryAggregator({'Assets': "100.00 USD, 500.00 EUR",
+                                                                         'Liabilities': "-50.00 USD"}))
+        
+        # The routing is decided once per account for all views
+        self.assertEqual(multi_view_summator._resolved_accounts['Expenses:Food:Restaurant'], 
+                         (("p_and_l", "Expenses:Food"),))
+        
+    @loader.load_doc()
+    def test_deltas_since_last(self, entries, errors, options):
+        """
+        2020-01-01 open Assets:Bank1
+        2020-01-01 open Income:Salary
+        
+        2020-01-02 * "Salary"
+          Assets:Bank1  100.00 USD
+          Income:Salary -100.00 USD
+        
+        2020-01-04 * "Salary"
+          Assets:Bank1  100.00 USD
+          Income:Salary -100.00 USD
+        """
+        multi_view_summator = MultiViewBeanSummator(entries, options, {"assets": ("Assets", 100), 
+                                                                       "income": ("Income", 100)})
+        
+        multi_view_summator.sum_till_date(datetime.date(2020,1,2))
+        
+        result = multi_view_summator.deltas_since_last(datetime.date(2020,1,4))
+        
+        self.assertEqual(result, {"assets": InventoryAggregator({'Assets:Bank1': "100.00 USD"}),
+                                  "income": InventoryAggregator({'Income:Salary': "-100.00 USD"})})
+        
+        with self.subTest("State can only be restored by a summator with the same views"):
+            state = multi_view_summator.get_state()
+            
+            restored_summator = MultiViewBeanSummator([], options, {"assets": ("Assets", 100), "income": ("Income", 100)})
+            restored_summator.set_state(state)
+            self.assertEqual(restored_summator.sum_till_date(datetime.date(2020,1,5))["income"], 
+                             InventoryAggregator({'Income:Salary': "-200.00 USD"}))
+            
+            with self.assertRaises(ValueError):
+                MultiViewBeanSummator([], options, {"assets": ("Assets", 1), "income": ("Income", 100)}).set_state(state)
+        
+    def test_no_views(self):
+        with self.assertRaises(ValueError):
+            MultiViewBeanSummator([], {}, {})
+        
 if __name__ == "__main__":
     
     # inv_agg1 = InventoryAggregator({"Assets:Bank1": "100.00 USD, 50 EUR", 